@@ -1,27 +1,53 @@
-from sentence_transformers import SentenceTransformer, util
 import imaplib
 import email
 from email.header import decode_header
-import re
-from flask import Flask, request, jsonify
+from email.utils import parseaddr, parsedate_to_datetime
+from flask import Flask, Response, request, jsonify
 from textblob import TextBlob
 import numpy as np
 import torch
-import spacy
 from flask_cors import CORS
 from datetime import datetime, timedelta
-from dataclasses import dataclass
-from typing import List, Optional, Tuple, Set
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Set
 import os
+from functools import lru_cache, partial, wraps
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest
 from google_auth_oauthlib.flow import Flow
 import json
 import pickle
-from dateutil.parser import parse
+import base64
+import hashlib
 import logging
+import atexit
+import threading
+import time
+import uuid
+from imap_pool import IMAPConnectionPool
+from imap_idle import IdleWatcher
+from body_extract import BodyExtractor
+from imap_fetch import FetchedMessage, fetch_raw, highest_uid, search_senders, split_by_sender, uids_since
+from sync_state import SYNC_STATE_PATH, SyncStateStore
+from score_cache import ResultCache, content_key
+from date_normalize import DateNormalizer
+from model_registry import ModelRegistry
+from jobs import Job, JobQueue, job_key
+from dedup import DuplicateIndex, collapse, simhash, thread_root
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, family, registry as metrics_registry
+from profiler import PROFILING_ENABLED, SamplingProfiler
+from pipeline import PipelineMetrics, StagedPipeline
+from scoring_pool import ScoringPool
+from template_index import TemplateIndex, load_templates, template_hash
+from embedding_backends import EMBEDDING_BACKEND, configure_threads, model_key, register_backends
+from priority_index import TaskPriorityIndex, priority_key, top_k
+from patterns import CRITICAL_FAMILY, DATE_FAMILY, PATTERN_SET_VERSION, URGENCY_FAMILY
 
 # Configure logging
 logging.basicConfig(
@@ -32,8 +58,78 @@ logging.basicConfig(
 # Constants
 SCOPES = ['https://www.googleapis.com/auth/calendar.events']
 MODEL_NAME = 'all-MiniLM-L6-v2'
+SPACY_MODEL = 'en_core_web_sm'
+# Only doc.ents is used; en_core_web_sm's NER has its own tok2vec
+SPACY_EXCLUDED_COMPONENTS = ['tok2vec', 'tagger', 'parser', 'senter', 'attribute_ruler', 'lemmatizer']
+SPACY_BATCH_SIZE = int(os.getenv('SPACY_BATCH_SIZE', 64))
+SPACY_N_PROCESS = int(os.getenv('SPACY_N_PROCESS', 1))
+SPACY_CHUNK_CHARS = 10000  # Longer texts are split into chunks of this size for NER
+SPACY_MAX_CHARS = 100000   # and truncated beyond this many characters
+SCORE_CACHE_PATH = os.getenv('SCORE_CACHE_PATH')  # Optional on-disk cache tier
+PRIORITY_TIERS = ('critical', 'high', 'medium')
+EMBEDDING_BATCH_SIZE = 64
+# Past this many templates, single emails use the batched matmul path instead of per-tier cos_sim
+TEMPLATE_TOP1_THRESHOLD = int(os.getenv('TEMPLATE_TOP1_THRESHOLD', 256))
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+STREAM_HEARTBEAT_SECONDS = 15
+WATCH_PAGE_SIZE = 50  # Tasks returned per /api/watch poll, highest priority first
+WATCH_REKEY_SECONDS = 60  # Deadline urgency of pending watcher tasks is recomputed at most this often
+PIPELINE_FETCH_CHUNK = 100  # UIDs per FETCH, so parsing starts before the whole list arrives
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', 4))
+ACCOUNT_CONCURRENCY = int(os.getenv('ACCOUNT_CONCURRENCY', 8))  # Mailboxes synced at once
+CALENDAR_BATCH_SIZE = 50  # Event inserts per HTTP batch request
+HEADER_CACHE_SIZE = int(os.getenv('HEADER_CACHE_SIZE', 4096))  # Distinct encoded headers memoized
+CRITICAL_THRESHOLD = 8  # Priority score buckets used for scheduling
+HIGH_THRESHOLD = 6
+CASCADE_SCORING = os.getenv('CASCADE_SCORING', '1') == '1'
+# Upper bound assumed for the semantic score (0-10). 10 is exact; lower values let
+# plainly unimportant mail skip the model too, at the risk of under-scoring it
+CASCADE_SEMANTIC_CEILING = float(os.getenv('CASCADE_SEMANTIC_CEILING', 10))
+# Score repeated alerts, reply chains and near-identical mail once and return one task per group
+COLLAPSE_DUPLICATES = os.getenv('COLLAPSE_DUPLICATES', '1') == '1'
 app = Flask(__name__)
 
+# Authenticated IMAP sessions shared by every EmailProcessor and request thread
+imap_pool = IMAPConnectionPool()
+atexit.register(imap_pool.close_all)
+
+# Priority scores and deadlines are pure functions of the email text
+score_cache = ResultCache('priority_scores', path=SCORE_CACHE_PATH)
+date_cache = ResultCache('deadlines', path=SCORE_CACHE_PATH)
+date_normalizer = DateNormalizer()
+# Incremental MIME parsing for the pipeline; BODY_CHAR_BUDGET bounds the text kept per message
+body_extractor = BodyExtractor()
+
+# Throughput and queue depth of the fetch/parse/inference stages, across all runs
+pipeline_metrics = PipelineMetrics()
+
+# Prometheus metrics served on /metrics; cache, model and queue state is read at scrape time
+STAGE_SECONDS = metrics_registry.histogram('email_stage_seconds', 'Time spent in each processing stage', ['stage'])
+STAGE_ERRORS = metrics_registry.counter('email_stage_errors', 'Exceptions raised per processing stage', ['stage'])
+EMAILS_PROCESSED = metrics_registry.counter('emails_processed', 'Emails parsed and scored into tasks')
+DUPLICATES = metrics_registry.counter('email_duplicates', 'Emails that reused the score of an earlier email in their group')
+EVALUATIONS = metrics_registry.counter('priority_evaluations', 'Priority scores computed, by whether the embedding model ran', ['path'])
+
+@contextmanager
+def _stage(name: str):
+    """Time a processing stage for /metrics and count the exceptions it raises"""
+    with STAGE_SECONDS.time(stage=name):
+        try:
+            yield
+        except Exception:
+            STAGE_ERRORS.inc(stage=name)
+            raise
+
+def _load_spacy_model():
+    import spacy
+    return spacy.load(SPACY_MODEL, exclude=SPACY_EXCLUDED_COMPONENTS)
+
+# Models are loaded once per process, on first use or by warm_up()
+model_registry = ModelRegistry()
+register_backends(model_registry, MODEL_NAME)
+model_registry.register(SPACY_MODEL, _load_spacy_model)
+configure_threads()
+
 @dataclass
 class Task:
     subject: str
@@ -42,6 +138,51 @@ class Task:
     deadline: Optional[datetime]
     sender: str
     critical_matches: Set[str]
+    uid: Optional[int] = None
+    account: Optional[str] = None
+    message_id: Optional[str] = None
+    sent_at: Optional[datetime] = None
+    thread_id: Optional[str] = None
+    fingerprint: Optional[int] = None  # SimHash of the body
+    duplicates: int = 0  # Other emails collapsed into this task
+    group_id: Optional[str] = None  # Thread root or Message-ID of the first email of its group
+
+    def to_dict(self) -> dict:
+        return {
+            'subject': self.subject,
+            'body': self.body,
+            'priority_score': self.priority_score,
+            'deadline': self.deadline.isoformat() if self.deadline else None,
+            'sender': self.sender,
+            'critical_matches': sorted(self.critical_matches),
+            'uid': self.uid,
+            'account': self.account,
+            'message_id': self.message_id,
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None,
+            'thread_id': self.thread_id,
+            'fingerprint': self.fingerprint,
+            'duplicates': self.duplicates,
+            'group_id': self.group_id,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Task':
+        return cls(
+            subject=data['subject'],
+            body=data['body'],
+            priority_score=data['priority_score'],
+            deadline=datetime.fromisoformat(data['deadline']) if data.get('deadline') else None,
+            sender=data['sender'],
+            critical_matches=set(data.get('critical_matches', [])),
+            uid=data.get('uid'),
+            account=data.get('account'),
+            message_id=data.get('message_id'),
+            sent_at=datetime.fromisoformat(data['sent_at']) if data.get('sent_at') else None,
+            thread_id=data.get('thread_id'),
+            fingerprint=data.get('fingerprint'),
+            duplicates=data.get('duplicates', 0),
+            group_id=data.get('group_id'),
+        )
 
 class EmailParser:
     @staticmethod
@@ -49,7 +190,20 @@ class EmailParser:
         """Decode email header with proper encoding"""
         if not header:
             return ""
-        
+        if isinstance(header, str):
+            if '=?' not in header:
+                return header  # No encoded words: decode_header would hand it back unchanged
+            return EmailParser._decode_encoded_header(header)
+        return EmailParser._decode_header_parts(header)
+
+    @staticmethod
+    @lru_cache(maxsize=HEADER_CACHE_SIZE)
+    def _decode_encoded_header(header: str) -> str:
+        # Subjects and senders recur across polls and threads
+        return EmailParser._decode_header_parts(header)
+
+    @staticmethod
+    def _decode_header_parts(header) -> str:
         decoded_parts = []
         for part, encoding in decode_header(header):
             if isinstance(part, bytes):
@@ -63,135 +217,305 @@ class EmailParser:
         return " ".join(decoded_parts)
 
     @staticmethod
-    def extract_email_body(email_message: email.message.Message) -> str:
-        """Extract email body with proper handling of multipart messages"""
-        body = ""
-        if email_message.is_multipart():
-            for part in email_message.walk():
-                if part.get_content_type() == "text/plain":
-                    try:
-                        payload = part.get_payload(decode=True)
-                        if payload:
-                            body += payload.decode(errors='replace')
-                    except Exception as e:
-                        logging.warning(f"Error extracting multipart body: {e}")
-        else:
-            try:
-                payload = email_message.get_payload(decode=True)
-                if payload:
-                    body = payload.decode(errors='replace')
-            except Exception as e:
-                logging.warning(f"Error extracting simple body: {e}")
-        return body
+    @lru_cache(maxsize=HEADER_CACHE_SIZE)
+    def parse_from(header: str) -> str:
+        """Lowercased address of a From header, or '' when it has none"""
+        _, address = parseaddr(header)
+        return address.lower()
+
+    @staticmethod
+    def parse_date(header: str) -> Optional[datetime]:
+        """Datetime of a Date header, or None when it is missing or malformed"""
+        if not header:
+            return None
+        try:
+            return parsedate_to_datetime(str(header))
+        except (TypeError, ValueError, IndexError):
+            return None
+
+    @staticmethod
+    def parse_message(chunks: Iterable[bytes]) -> Tuple[email.message.Message, str]:
+        """Parse raw message bytes incrementally into headers and a size-bounded, reply-stripped body"""
+        return body_extractor.parse(chunks)
 
 class DateExtractor:
-    def __init__(self):
-        self.nlp = spacy.load("en_core_web_sm")
+    def __init__(self, cache: ResultCache = date_cache, batch_size: int = SPACY_BATCH_SIZE,
+                 n_process: int = SPACY_N_PROCESS, chunk_chars: int = SPACY_CHUNK_CHARS,
+                 max_chars: int = SPACY_MAX_CHARS, normalizer: DateNormalizer = date_normalizer,
+                 registry: ModelRegistry = model_registry):
+        self.registry = registry
+        self.cache = cache
+        self.normalizer = normalizer
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.chunk_chars = chunk_chars
+        self.max_chars = max_chars
+
+    @property
+    def nlp(self):
+        return self.registry.get(SPACY_MODEL)
 
-    def extract_dates(self, text: str) -> List[datetime]:
+    @staticmethod
+    def _cache_key(text: str, now: datetime) -> str:
+        # Relative phrases resolve against the reference day, so it is part of the key
+        return content_key(text, SPACY_MODEL, PATTERN_SET_VERSION, now.date().isoformat())
+
+    def extract_dates(self, text: str, now: Optional[datetime] = None) -> List[datetime]:
         """Extract dates from text using multiple approaches"""
-        dates = set()
-        
-        # Use spaCy for initial date extraction
-        doc = self.nlp(text)
-        for ent in doc.ents:
-            if ent.label_ in ['DATE', 'TIME']:
-                try:
-                    parsed_date = parse(ent.text, fuzzy=True)
-                    dates.add(parsed_date)
-                except:
-                    continue
+        return self.extract_dates_many([text], now)[0]
+
+    def extract_dates_many(self, texts: List[str], now: Optional[datetime] = None) -> List[List[datetime]]:
+        """Extract dates from many texts, running NER over all cache misses with nlp.pipe"""
+        now = now or datetime.now()
+        keys = [self._cache_key(text, now) for text in texts]
+        results = []
+        for key in keys:
+            cached = self.cache.get(key)
+            results.append([datetime.fromisoformat(value) for value in cached] if cached is not None else None)
         
-        # Regular expression patterns for common date formats
-        date_patterns = [
-            r'\b\d{1,2}[-/]\d{1,2}[-/]\d{2,4}\b',
-            r'\b\d{4}[-/]\d{1,2}[-/]\d{1,2}\b',
-            r'\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]* \d{1,2}(?:st|nd|rd|th)?,? \d{4}\b',
-            r'\bnext (?:monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b',
-            r'\btomorrow\b',
-            r'\btoday\b'
-        ]
+        misses = [i for i, result in enumerate(results) if result is None]
+        if misses:
+            entities = self._date_entities([texts[i] for i in misses])
+            for i, entity_texts in zip(misses, entities):
+                results[i] = self._parse_dates(texts[i], entity_texts, now)
+                self.cache.put(keys[i], [value.isoformat() for value in results[i]])
+        return results
+
+    def _chunks(self, text: str) -> List[str]:
+        """Split text into NER-sized chunks, preferring whitespace boundaries"""
+        text = text[:self.max_chars]
+        chunks = []
+        start = 0
+        while start < len(text):
+            end = start + self.chunk_chars
+            if end < len(text):
+                split = text.rfind(' ', start, end)
+                if split > start:
+                    end = split
+            chunks.append(text[start:end])
+            start = end
+        return chunks or [text]
+
+    def _date_entities(self, texts: List[str]) -> List[List[str]]:
+        """DATE/TIME entity strings for each text, batched through spaCy"""
+        entities = [[] for _ in texts]
+        pieces = ((chunk, i) for i, text in enumerate(texts) for chunk in self._chunks(text))
+        with _stage('ner'):
+            docs = self.nlp.pipe(pieces, as_tuples=True, batch_size=self.batch_size, n_process=self.n_process)
+            for doc, i in docs:
+                entities[i].extend(ent.text for ent in doc.ents if ent.label_ in ['DATE', 'TIME'])
+        return entities
+
+    def _parse_dates(self, text: str, entity_texts: List[str], now: Optional[datetime] = None) -> List[datetime]:
+        """Normalize spaCy entities and regex matches into datetimes"""
+        dates = set()
         
-        for pattern in date_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                try:
-                    parsed_date = parse(match.group(), fuzzy=True)
+        # Common date formats, all scanned in a single pass
+        with _stage('date_parse'):
+            candidates = entity_texts + DATE_FAMILY.find_all(text)
+            for candidate in candidates:
+                parsed_date = self.normalizer.parse(candidate, now)
+                if parsed_date is not None:
                     dates.add(parsed_date)
-                except:
-                    continue
         
         return sorted(list(dates))
 
+# Best of the pattern and urgency scores, subject boost, critical pattern matches
+RuleScores = Tuple[float, float, Set[str]]
+
+def priority_bucket(score: float) -> str:
+    """The scheduling tier of a priority score"""
+    if score >= CRITICAL_THRESHOLD:
+        return 'critical'
+    if score >= HIGH_THRESHOLD:
+        return 'high'
+    return 'medium_low'
+
+def _final_score(base_score: float, boost: float) -> float:
+    """Apply the subject boost, clamp to 1-10 and round"""
+    return round(max(min(base_score + boost, 10), 1), 1)
+
 class EmailPriorityAnalyzer:
-    def __init__(self):
-        self.model = SentenceTransformer(MODEL_NAME)
-        self._initialize_embeddings()
+    def __init__(self, cache: ResultCache = score_cache, registry: ModelRegistry = model_registry,
+                 backend: str = EMBEDDING_BACKEND, cascade: bool = CASCADE_SCORING,
+                 semantic_ceiling: float = CASCADE_SEMANTIC_CEILING,
+                 templates: Optional[Dict[str, List[str]]] = None):
+        self.registry = registry
+        self.cache = cache
+        # Skip the embedding model when the regex signals already decide the priority bucket
+        self.cascade = cascade
+        self.semantic_ceiling = semantic_ceiling
+        # Backends give slightly different scores, so each has its own cache entries
+        self.model_key = model_key(MODEL_NAME, backend)
+        # Scores depend on the template phrases too, so a changed template set gets new cache entries
+        self.priority_templates = templates or load_templates()
+        self.templates_version = template_hash(self.model_key, self.priority_templates, PRIORITY_TIERS)
+        self._embeddings_lock = threading.Lock()
+        self._embeddings_ready = False
+
+    @property
+    def model(self):
+        return self.registry.get(self.model_key)
+
+    def _ensure_embeddings(self):
+        """Encode the priority templates on first use"""
+        if self._embeddings_ready:
+            return
+        with self._embeddings_lock:
+            if not self._embeddings_ready:
+                self._initialize_embeddings()
+                self._embeddings_ready = True
         
     def _initialize_embeddings(self):
-        """Initialize priority templates and their embeddings"""
-        self.priority_templates = {
-            'critical': [
-                "server down", "server crash", "system crash", "outage", "downtime",
-                "service unavailable", "critical error", "system failure",
-                "data loss", "data corruption", "database corruption", "data breach",
-                "severe performance", "extreme latency", "system overload",
-                "urgent customer", "production blocked", "revenue impact"
-            ],
-            'high': [
-                "high priority", "urgent", "important", "asap", "time sensitive",
-                "needs immediate", "critical bug", "performance issue", "customer impact"
-            ],
-            'medium': [
-                "please review", "update needed", "follow up", "needs attention",
-                "check this", "minor issue", "small bug", "low impact"
-            ]
-        }
+        """Load the priority template embeddings, encoding them only when the saved index is stale"""
+        index = TemplateIndex.load_or_build(
+            self.model_key, self.priority_templates, PRIORITY_TIERS,
+            encode=lambda phrases: self.model.encode(
+                phrases, batch_size=EMBEDDING_BATCH_SIZE, convert_to_tensor=True
+            ).cpu().numpy()
+        )
         
+        # Rows are already normalized, so a whole batch of emails can be compared
+        # against every template with a single matrix multiply
+        self.template_matrix_t = torch.from_numpy(index.matrix_t)
+        self.template_matrix = self.template_matrix_t.T
+        self.tier_slices = index.tier_slices
         self.embeddings = {
-            priority: self.model.encode(templates, convert_to_tensor=True)
-            for priority, templates in self.priority_templates.items()
+            priority: self.template_matrix[self.tier_slices[priority]] for priority in PRIORITY_TIERS
         }
 
     def _check_critical_patterns(self, text: str) -> Tuple[float, Set[str]]:
         """Check for critical patterns with weights"""
-        critical_patterns = {
-            r'\b(server|system)\s*(crash|down|failure)\b': 4.0,
-            r'\b(emergency|critical)\s*(incident|issue|problem)\b': 3.5,
-            r'\bproduction\s*(down|issue|problem|blocked)\b': 3.5,
-            r'\b(service|site)\s*(down|unavailable)\b': 3.5,
-            r'\bdata\s*(loss|corruption|breach)\b': 3.0,
-            r'\bdatabase\s*(crash|down|corrupt)\b': 3.0,
-            r'\boutage\b': 3.0,
-            r'\bcritical\s*error\b': 2.5,
-            r'\bsevere\s*performance\b': 2.5,
-            r'\bimmediate\s*attention\b': 2.0,
-            r'\burgent\s*customer\b': 2.0,
-        }
-        
-        score = 0
-        matches_found = set()
-        
-        for pattern, weight in critical_patterns.items():
-            if re.search(pattern, text, re.IGNORECASE):
-                score += weight
-                matches_found.add(pattern)
-        
-        return score, matches_found
+        return CRITICAL_FAMILY.score(text)
+
+    def _cache_key(self, subject: str, body: str) -> str:
+        return content_key(subject, body, self.model_key, PATTERN_SET_VERSION, self.templates_version)
+
+    def _cached_score(self, key: str) -> Optional[Tuple[float, Set[str]]]:
+        cached = self.cache.get(key)
+        if cached is None:
+            return None
+        score, matches = cached
+        return score, set(matches)
 
     def calculate_priority_score(self, subject: str, body: str) -> Tuple[float, Set[str]]:
         """Calculate priority score with multiple factors"""
+        key = self._cache_key(subject, body)
+        cached = self._cached_score(key)
+        if cached is not None:
+            return cached
+        
         combined_text = f"{subject} {body}".lower()
-        text_embedding = self.model.encode(combined_text, convert_to_tensor=True)
+        rules = self._rule_scores(subject, combined_text)
+        decided = self._short_circuit(rules)
+        if decided is not None:
+            return decided, rules[2]
+        
+        from sentence_transformers import util
+        
+        self._ensure_embeddings()
+        with _stage('embedding'):
+            text_embedding = self.model.encode(combined_text, convert_to_tensor=True)
+        
+        # Calculate semantic similarities
+        if len(self.template_matrix) > TEMPLATE_TOP1_THRESHOLD:
+            # Large template sets: one matvec against the pre-normalized matrix
+            similarities = dict(zip(PRIORITY_TIERS, self._tier_maxima(text_embedding.unsqueeze(0))[0]))
+        else:
+            with _stage('similarity'):
+                similarities = {
+                    priority: util.cos_sim(text_embedding, embeddings).max().item()
+                    for priority, embeddings in self.embeddings.items()
+                }
         
+        result = self._combine_scores(rules, similarities)
+        self.cache.put(key, [result[0], sorted(result[1])])
+        return result
+
+    def calculate_priority_scores(self, batch: List[Tuple[str, str]],
+                                  batch_size: int = EMBEDDING_BATCH_SIZE) -> List[Tuple[float, Set[str]]]:
+        """Calculate priority scores for a batch of (subject, body) pairs in one encode call"""
+        keys = [self._cache_key(subject, body) for subject, body in batch]
+        results = [self._cached_score(key) for key in keys]
+        misses = []
+        for i, result in enumerate(results):
+            if result is not None:
+                continue
+            subject, body = batch[i]
+            combined_text = f"{subject} {body}".lower()
+            rules = self._rule_scores(subject, combined_text)
+            decided = self._short_circuit(rules)
+            if decided is not None:
+                results[i] = decided, rules[2]
+            else:
+                misses.append((i, combined_text, rules))
+        if misses:
+            scored = self._score_batch([(combined_text, rules) for _, combined_text, rules in misses], batch_size)
+            for (i, _, _), result in zip(misses, scored):
+                results[i] = result
+                self.cache.put(keys[i], [result[0], sorted(result[1])])
+        return results
+
+    def _score_batch(self, batch: List[Tuple[str, RuleScores]], batch_size: int) -> List[Tuple[float, Set[str]]]:
+        """Encode and score a batch of (combined text, rule scores) that missed the cache"""
+        self._ensure_embeddings()
+        with _stage('embedding'):
+            text_embeddings = self.model.encode(
+                [combined_text for combined_text, _ in batch], batch_size=batch_size, convert_to_tensor=True
+            )
+        
+        tier_maxima = self._tier_maxima(text_embeddings)
+        
+        return [
+            self._combine_scores(rules, dict(zip(PRIORITY_TIERS, maxima)))
+            for (_, rules), maxima in zip(batch, tier_maxima)
+        ]
+
+    def _tier_maxima(self, text_embeddings: torch.Tensor) -> List[List[float]]:
+        """Best template similarity per tier for each embedding: one matmul, then a top-1 per tier"""
+        with _stage('similarity'):
+            similarity_matrix = torch.nn.functional.normalize(text_embeddings, dim=1) @ self.template_matrix_t
+            return torch.stack([
+                similarity_matrix[:, self.tier_slices[priority]].max(dim=1).values
+                for priority in PRIORITY_TIERS
+            ], dim=1).tolist()
+
+    def _rule_scores(self, subject: str, combined_text: str) -> RuleScores:
+        """The cheap signals: best of the pattern and urgency scores, the subject boost, and the pattern matches"""
         # Check critical patterns
         critical_score, critical_matches = self._check_critical_patterns(combined_text)
         
-        # Calculate semantic similarities
-        similarities = {
-            priority: util.cos_sim(text_embedding, embeddings).max().item()
-            for priority, embeddings in self.embeddings.items()
-        }
+        # Check urgency indicators
+        urgency_score, _ = URGENCY_FAMILY.score(combined_text)
+        
+        # Subject line boost
+        boost = 0.0
+        if any(term in subject.lower() for term in ['urgent', 'critical', 'emergency', 'immediate']):
+            boost = 1.5
+        return max(critical_score * 1.5, urgency_score * 2.0), boost, critical_matches
+
+    def _short_circuit(self, rules: RuleScores) -> Optional[float]:
+        """The score from the rules alone, when no semantic score could change its priority bucket.
+
+        The semantic term only ever raises the score, up to `semantic_ceiling * 1.2`,
+        so the bucket is decided when the rules-only score and that upper bound agree.
+        Short-circuited scores are not cached: they depend on the ceiling.
+        """
+        if not self.cascade:
+            EVALUATIONS.inc(path='full')
+            return None
+        rule_score, boost, _ = rules
+        low = _final_score(rule_score, boost)
+        high = _final_score(max(rule_score, self.semantic_ceiling * 1.2), boost)
+        if priority_bucket(low) != priority_bucket(high):
+            EVALUATIONS.inc(path='full')
+            return None
+        EVALUATIONS.inc(path='short_circuit')
+        return low
+
+    def _combine_scores(self, rules: RuleScores, similarities: dict) -> Tuple[float, Set[str]]:
+        """Combine pattern, semantic and urgency signals into the final score"""
+        rule_score, boost, critical_matches = rules
         
         # Calculate weighted semantic score
         semantic_score = (
@@ -200,110 +524,316 @@ class EmailPriorityAnalyzer:
             similarities['medium'] * 1.0
         ) / 7.5 * 10
         
-        # Check urgency indicators
-        urgency_indicators = {
-            r'\basap\b': 1.0,
-            r'\bimmediately\b': 1.0,
-            r'\burgent\b': 1.0,
-            r'\bcritical\b': 1.0,
-            r'\bemergency\b': 1.0,
-        }
-        
-        urgency_score = sum(
-            weight for pattern, weight in urgency_indicators.items()
-            if re.search(pattern, combined_text, re.IGNORECASE)
-        )
-        
-        # Calculate final score
-        base_score = max(
-            critical_score * 1.5,
-            semantic_score * 1.2,
-            urgency_score * 2.0
-        )
-        
-        # Apply subject line boost
-        if any(term in subject.lower() for term in ['urgent', 'critical', 'emergency', 'immediate']):
-            base_score += 1.5
-        
-        final_score = max(min(base_score, 10), 1)
-        return round(final_score, 1), critical_matches
+        return _final_score(max(rule_score, semantic_score * 1.2), boost), critical_matches
 
-    def process_tasks(self, tasks: List[Task]) -> List[Task]:
+    def process_tasks(self, tasks: List[Task], now: Optional[datetime] = None) -> List[Task]:
         """Sort tasks based on priority and deadline"""
-        def task_sort_key(task):
-            # Calculate deadline score
-            if task.deadline:
-                time_until_deadline = task.deadline - datetime.now()
-                days_until_deadline = time_until_deadline.total_seconds() / (24 * 3600)
-                urgency_score = 1 / (1 + max(0, days_until_deadline))
-            else:
-                urgency_score = 0
-            
-            # Combine priority and urgency
-            combined_score = (task.priority_score * 0.7) + (urgency_score * 0.3)
-            deadline_timestamp = task.deadline.timestamp() if task.deadline else float('inf')
-            
-            return (-combined_score, deadline_timestamp)
+        # One reference time for every task, so the order is consistent
+        now = now or datetime.now()
+        return sorted(tasks, key=lambda task: priority_key(task, now))
+
+    def top_k(self, tasks: List[Task], k: int, now: Optional[datetime] = None) -> List[Task]:
+        """The first k tasks of process_tasks, without sorting the whole list"""
+        return top_k(tasks, k, now)
+
+class TaskScorer:
+    """Turns parsed emails into tasks with priority scores and deadlines"""
+
+    def __init__(self, analyzer: Optional[EmailPriorityAnalyzer] = None,
+                 date_extractor: Optional[DateExtractor] = None):
+        self.analyzer = analyzer or EmailPriorityAnalyzer()
+        self.date_extractor = date_extractor or DateExtractor()
+
+    def score(self, parsed_emails: List[Tuple[str, str, str]]) -> List[Task]:
+        """Extract deadlines and score a batch of (sender, subject, body) emails"""
+        # Score every email with a single batched encode call
+        scores = self.analyzer.calculate_priority_scores(
+            [(subject, body) for _, subject, body in parsed_emails]
+        )
         
-        return sorted(tasks, key=task_sort_key)
+        tasks = []
+        for (sender, subject, body), (priority_score, critical_matches), deadline in zip(
+            parsed_emails, scores, self.deadlines(parsed_emails)
+        ):
+            tasks.append(Task(
+                subject=subject,
+                body=body,
+                priority_score=priority_score,
+                deadline=deadline,
+                sender=sender,
+                critical_matches=critical_matches
+            ))
+        return tasks
+
+    def deadlines(self, parsed_emails: List[Tuple[str, str, str]]) -> List[Optional[datetime]]:
+        """Earliest date mentioned in each (sender, subject, body) email, without scoring it"""
+        # Run NER over every email in one nlp.pipe pass
+        all_dates = self.date_extractor.extract_dates_many(
+            [f"{subject}\n{body}" for _, subject, body in parsed_emails]
+        )
+        return [min(dates) if dates else None for dates in all_dates]
 
 class EmailProcessor:
-    def __init__(self, email_config: dict):
+    def __init__(self, email_config: dict, pool: IMAPConnectionPool = imap_pool,
+                 state: Optional[SyncStateStore] = None, metrics: Optional[PipelineMetrics] = None,
+                 scorer=None, collapse_duplicates: bool = COLLAPSE_DUPLICATES):
         self.config = email_config
+        self.collapse_duplicates = collapse_duplicates
+        self.pool = pool
+        self.metrics = metrics or pipeline_metrics
+        self.state = state or SyncStateStore(email_config.get('state_path', SYNC_STATE_PATH))
         self.analyzer = EmailPriorityAnalyzer()
         # self.calendar = CalendarManager()
         self.date_extractor = DateExtractor()
         self.email_parser = EmailParser()
+        # Anything with score(parsed_emails) -> List[Task] and deadlines(parsed_emails), e.g. a ScoringPool
+        self.scorer = scorer or TaskScorer(self.analyzer, self.date_extractor)
 
-    def process_emails(self, sender_list: List[str]):
-        """Main processing function"""
+    def fetch_tasks(self, sender_list: List[str],
+                    on_tasks: Optional[Callable[[List[Task]], None]] = None,
+                    include_cached: bool = True) -> List[Task]:
+        """Fetch the last emails from each sender and turn them into scored tasks.
+
+        on_tasks, if given, is called with each group of tasks as soon as it is ready;
+        with include_cached=False it only sees tasks scored by this call. With
+        collapse_duplicates, each group of duplicates is scored once and returned as
+        its newest task, with `duplicates` counting the rest; on_tasks gets that task
+        again, with the updated count, whenever a new email joins the group.
+        """
+        mailbox = self.state.mailbox_key(self.config, "inbox")
+        
+        with self.pool.connection(self.config, "inbox") as mail:
+            with _stage('imap_search'):
+                sender_uids, cached, synced, high_water = self._sync_sender_uids(mail, mailbox, sender_list)
+            
+            # Only messages we have not scored before are fetched, once even if several terms match
+            selected = []
+            seen = set()
+            for sender in sender_list:
+                for uid in sender_uids.get(sender, []):
+                    if uid not in cached[sender] and uid not in seen:
+                        seen.add(uid)
+                        selected.append((sender, uid))
+            
+            previous = [
+                Task.from_dict(cached[sender][uid]) for sender in sender_list
+                for uid in sender_uids.get(sender, []) if uid in cached[sender]
+            ]
+            if on_tasks and include_cached and previous:
+                on_tasks(collapse(previous) if self.collapse_duplicates else previous)
+            
+            # New mail that repeats an already scored email reuses its score
+            duplicates = None
+            publish = on_tasks
+            if self.collapse_duplicates:
+                duplicates = DuplicateIndex()
+                for task in previous:
+                    duplicates.set_value(
+                        duplicates.add(
+                            task.sender, task.subject, task.thread_id, task.fingerprint, key=task.uid,
+                            sent_at=task.sent_at
+                        ),
+                        task
+                    )
+                if on_tasks:
+                    publish = partial(self._publish_groups, duplicates, {task.uid: task for task in previous}, on_tasks)
+            
+            # This thread keeps fetching while parse workers and the inference stage catch up.
+            # With a listener the first batch is a single email and sizes double from there.
+            pipeline = StagedPipeline(
+                parse_fn=self._parse_fetched,
+                infer_fn=partial(self._build_batch, duplicates),
+                on_results=publish,
+                metrics=self.metrics,
+                parse_workers=PARSE_WORKERS,
+                batch_size=EMBEDDING_BATCH_SIZE,
+                initial_batch_size=1 if on_tasks else None
+            )
+            new_tasks = {task.uid: task for task in pipeline.run(self._fetch_chunks(mail, selected))}
+        
         tasks = []
+        unprocessed = 0
+        for sender in dict.fromkeys(sender_list):
+            recorded = {}
+            failed = []
+            for uid in sender_uids.get(sender, []):
+                if uid in cached[sender]:
+                    tasks.append(Task.from_dict(cached[sender][uid]))
+                elif uid in new_tasks:
+                    tasks.append(new_tasks[uid])
+                    recorded[uid] = new_tasks[uid].to_dict()
+                else:
+                    failed.append(uid)
+            # A sender is only marked synced up to its first message whose fetch, parse or
+            # scoring failed, so that message is searched for again next run
+            self.state.record_sender(mailbox, sender, recorded, min([synced[sender], *(uid - 1 for uid in failed)]))
+            unprocessed += len(failed)
+        if unprocessed:
+            logging.warning(f"{unprocessed} messages in {mailbox} were not processed, retrying them next run")
+        self.state.set_high_water(mailbox, high_water)
+        
+        if self.collapse_duplicates:
+            collapsed = collapse(tasks)
+            if len(collapsed) < len(tasks):
+                logging.info(f"Collapsed {len(tasks)} tasks into {len(collapsed)} after removing duplicates")
+            return collapsed
+        return tasks
+
+    def _sync_sender_uids(self, mail: imaplib.IMAP4, mailbox: str,
+                          sender_list: List[str]) -> Tuple[dict, dict, dict, int]:
+        """Work out the last 5 UIDs per sender, querying only what changed since each sender's last run.
+
+        Returns the UIDs, the cached tasks, the UID each sender has now been searched up to
+        and the highest UID searched; the caller stores them once the selected messages
+        have been processed.
+        """
+        uidvalidity = self.pool.uidvalidity(mail)
+        state = self.state.mailbox_state(mailbox)
+        if state is None or state[0] != uidvalidity:
+            if state is not None:
+                logging.info(f"UIDVALIDITY changed for {mailbox}, discarding sync state")
+            self.state.reset_mailbox(mailbox, uidvalidity)
+            high_water = 0
+        else:
+            high_water = state[1]
+        
+        known = self.state.known_senders(mailbox, sender_list)
+        new_senders = [sender for sender in dict.fromkeys(sender_list) if sender not in known]
+        cached = {sender: self.state.cached_tasks(mailbox, sender) for sender in sender_list}
+        sender_uids = {sender: sorted(cached[sender]) for sender in sender_list}
+        synced = dict(known)
+        
+        if known:
+            # Steady state: a single UID SEARCH for anything that arrived since the least
+            # recently synced sender's last run, each sender keeping only what is new to it
+            arrived = uids_since(mail, min(known.values()))
+            if arrived:
+                found = split_by_sender(mail, arrived, list(known), per_sender=5, uid=True)
+                for sender, uids in found.items():
+                    new_uids = {uid for uid in uids if uid > known[sender]}
+                    sender_uids[sender] = sorted(set(sender_uids[sender]) | new_uids)[-5:]
+                high_water = max(high_water, *arrived)
+                synced = dict.fromkeys(known, max(arrived))
+        elif new_senders:
+            high_water = highest_uid(mail)
         
+        if new_senders and high_water:
+            # Senders we have never synced get a full search up to the high-water mark
+            found = search_senders(
+                mail, new_senders, per_sender=5, uid=True, criteria=f'UID 1:{high_water}'
+            )
+            sender_uids.update(found)
+        synced.update(dict.fromkeys(new_senders, high_water))
+        
+        return sender_uids, cached, synced, high_water
+
+    def _fetch_chunks(self, mail: imaplib.IMAP4, selected: List[Tuple[str, int]]):
+        """Fetch stage: yield (sender, uid, raw message) items, one FETCH chunk at a time"""
+        for start in range(0, len(selected), PIPELINE_FETCH_CHUNK):
+            chunk = selected[start:start + PIPELINE_FETCH_CHUNK]
+            with _stage('imap_fetch'):
+                fetched = fetch_raw(mail, [uid for _, uid in chunk], uid=True)
+            yield [(sender, uid, fetched[uid]) for sender, uid in chunk if uid in fetched]
+
+    def _parse_fetched(self, item: Tuple[str, int, FetchedMessage]) -> Optional[tuple]:
+        """Parse stage: turn a raw message into (sender, subject, body, uid, message_id, sent_at, thread_id, fingerprint)"""
+        search_term, uid, fetched = item
         try:
-            with imaplib.IMAP4_SSL(self.config['server']) as mail:
-                mail.login(self.config['username'], self.config['password'])
-                mail.select("inbox")
-                
-                for sender in sender_list:
-                    logging.info(f"Processing emails from: {sender}")
-                    status, messages = mail.search(None, f'FROM "{sender}"')
-                    
-                    if status != "OK":
-                        logging.warning(f"Failed to search for sender: {sender}")
-                        continue
-                    
-                    email_ids = messages[0].split()[-5:]  # Last 5 emails
-                    
-                    for email_id in email_ids:
-                        try:
-                            status, msg_data = mail.fetch(email_id, "(RFC822)")
-                            if status != "OK":
-                                continue
-                            
-                            email_content = email.message_from_bytes(msg_data[0][1])
-                            subject = self.email_parser.decode_email_header(email_content["Subject"])
-                            body = self.email_parser.extract_email_body(email_content)
-                            
-                            # Extract dates and calculate priority
-                            dates = self.date_extractor.extract_dates(f"{subject}\n{body}")
-                            priority_score, critical_matches = self.analyzer.calculate_priority_score(
-                                subject, body
-                            )
-                            
-                            task = Task(
-                                subject=subject,
-                                body=body,
-                                priority_score=priority_score,
-                                deadline=min(dates) if dates else None,
-                                sender=sender,
-                                critical_matches=critical_matches
-                            )
-                            tasks.append(task)
-                            
-                        except Exception as e:
-                            logging.error(f"Error processing email {email_id}: {e}")
-                            continue
+            with _stage('mime_parse'):
+                email_content, body = self.email_parser.parse_message(fetched.chunks())
+                subject = self.email_parser.decode_email_header(email_content["Subject"])
+                # Attribute the task to the actual From address, not the term that matched it
+                sender = self.email_parser.parse_from(str(email_content["From"] or '')) or search_term
+                message_id = (email_content["Message-ID"] or '').strip() or None
+                sent_at = self.email_parser.parse_date(email_content["Date"])
+                thread_id = thread_root(email_content["References"], email_content["In-Reply-To"]) or message_id
+                fingerprint = simhash(body) if self.collapse_duplicates else None
+            return sender, subject, body, uid, message_id, sent_at, thread_id, fingerprint
+        except Exception as e:
+            logging.error(f"Error processing email {uid}: {e}")
+            return None
+
+    def _build_batch(self, duplicates: Optional[DuplicateIndex], parsed: List[tuple]) -> List[Task]:
+        """Inference stage: score a micro-batch and tag each task with its message headers.
+
+        With a DuplicateIndex, emails whose group already has a scored task copy its
+        score and matches, and only one email per new group is scored; deadlines are
+        still extracted from every email.
+        """
+        if duplicates is None:
+            items = [None] * len(parsed)
+            to_score = list(range(len(parsed)))
+        else:
+            items = [
+                duplicates.add(sender, subject, thread_id, fingerprint, key=uid, sent_at=sent_at)
+                for sender, subject, _, uid, _, sent_at, thread_id, fingerprint in parsed
+            ]
+            to_score, groups = [], set()
+            for i, item in enumerate(items):
+                root = duplicates.find(item)
+                if duplicates.value(item) is None and root not in groups:
+                    groups.add(root)
+                    to_score.append(i)
+        
+        scored = self.scorer.score([parsed[i][:3] for i in to_score])
+        tasks = [None] * len(parsed)
+        for i, task in zip(to_score, scored):
+            tasks[i] = task
+            if duplicates is not None:
+                duplicates.set_value(items[i], task)
         
+        for i, (sender, subject, body, uid, message_id, sent_at, thread_id, fingerprint) in enumerate(parsed):
+            if tasks[i] is None:
+                scored_task = duplicates.value(items[i])
+                tasks[i] = replace(
+                    scored_task, subject=subject, body=body, sender=sender,
+                    critical_matches=set(scored_task.critical_matches), account=None
+                )
+            task = tasks[i]
+            task.uid = uid
+            task.message_id = message_id
+            task.sent_at = sent_at
+            task.thread_id = thread_id
+            task.fingerprint = fingerprint
+            if duplicates is not None:
+                # Every email of a group keeps the id of its first one, whichever represents it
+                first = duplicates.value(items[i])
+                if first is task:
+                    task.group_id = thread_id
+                else:
+                    task.group_id = first.group_id or first.thread_id or first.message_id
+        
+        scored_indexes = set(to_score)
+        copies = [i for i in range(len(parsed)) if i not in scored_indexes]
+        if copies:
+            # A repeat can name a new date, and finding it needs no embedding model
+            for i, deadline in zip(copies, self.scorer.deadlines([parsed[i][:3] for i in copies])):
+                tasks[i].deadline = deadline
+        DUPLICATES.inc(len(parsed) - len(to_score))
+        EMAILS_PROCESSED.inc(len(tasks))
+        return tasks
+
+    @staticmethod
+    def _publish_groups(duplicates: DuplicateIndex, members: Dict[int, Task],
+                        on_tasks: Callable[[List[Task]], None], batch: List[Task]):
+        """Publish each group a new task joined as its newest task, with the updated duplicates count"""
+        groups = {}
+        for task in batch:
+            members[task.uid] = task
+            groups.setdefault(duplicates.find(duplicates.item(task.uid)))
+        updates = []
+        for root in groups:
+            newest = members[duplicates.latest(root)]
+            # A copy, so the count is not recorded with the task in the sync state
+            updates.append(replace(
+                newest, critical_matches=set(newest.critical_matches), duplicates=duplicates.size(root) - 1
+            ))
+        on_tasks(updates)
+
+    def process_emails(self, sender_list: List[str]):
+        """Main processing function"""
+        try:
+            tasks = self.fetch_tasks(sender_list)
         except Exception as e:
             logging.error(f"Error connecting to email server: {e}")
             return
@@ -341,7 +871,8 @@ class EmailProcessor:
             # print(f"Calendar event: {result}")
             # print("=" * 50)
 
-    def generate_summary_report(self, tasks: List[Task]) -> str:
+    @staticmethod
+    def generate_summary_report(tasks: List[Task]) -> str:
         """Generate a summary report of processed tasks"""
         critical_count = sum(1 for task in tasks if task.priority_score >= 8)
         high_count = sum(1 for task in tasks if 6 <= task.priority_score < 8)
@@ -367,6 +898,146 @@ class EmailProcessor:
         
         return "\n".join(report)
 
+# Worker processes that each load the models once, shared by multi-account runs
+scoring_pool = ScoringPool(TaskScorer, decode=Task.from_dict)
+atexit.register(scoring_pool.shutdown)
+
+class MultiAccountProcessor:
+    """Processes many mailboxes concurrently and merges their tasks into one prioritized list"""
+
+    def __init__(self, scorer=None, state: Optional[SyncStateStore] = None,
+                 max_concurrency: int = ACCOUNT_CONCURRENCY):
+        self.scorer = scorer or scoring_pool
+        # One store for every account: the mailbox keys already separate them
+        self.state = state or SyncStateStore(SYNC_STATE_PATH)
+        self.max_concurrency = max_concurrency
+        self.analyzer = EmailPriorityAnalyzer()
+
+    def fetch_tasks(self, accounts: List[dict],
+                    on_tasks: Optional[Callable[[List[Task]], None]] = None) -> Tuple[List[Task], dict]:
+        """Run IMAP work per account on threads, scoring in the process pool.
+
+        Each account dict is an email config plus its 'senders'. Returns the merged,
+        sorted tasks and a per-account status; one failing account does not fail the rest.
+        """
+        tasks = []
+        accounts_status = {}
+        with ThreadPoolExecutor(max_workers=min(len(accounts), self.max_concurrency),
+                                thread_name_prefix='account') as executor:
+            futures = {
+                executor.submit(self._fetch_account, account, on_tasks): account['username']
+                for account in accounts
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    account_tasks = future.result()
+                except Exception as e:
+                    logging.error(f"Error processing account {name}: {e}")
+                    accounts_status[name] = {'status': 'error', 'message': str(e)}
+                    continue
+                accounts_status[name] = {'status': 'success', 'tasks': len(account_tasks)}
+                tasks.extend(account_tasks)
+        
+        return self.analyzer.process_tasks(tasks), accounts_status
+
+    def _fetch_account(self, account: dict, on_tasks: Optional[Callable[[List[Task]], None]]) -> List[Task]:
+        config = {key: value for key, value in account.items() if key != 'senders'}
+        processor = EmailProcessor(config, state=self.state, scorer=self.scorer)
+        
+        def tag(batch: List[Task]):
+            for task in batch:
+                task.account = config['username']
+            if on_tasks:
+                on_tasks(batch)
+        
+        tasks = processor.fetch_tasks(account['senders'], on_tasks=tag if on_tasks else None)
+        for task in tasks:
+            task.account = config['username']
+        return tasks
+
+class MailWatcher:
+    """Push mode: holds an IMAP IDLE session per account and scores mail the moment it arrives.
+
+    Newly scored tasks go to `on_tasks` if given, otherwise into the `pending` priority index,
+    which `take` pages through highest priority first.
+    Between arrivals every watcher thread is blocked on its socket.
+    """
+
+    def __init__(self, accounts: List[dict], on_tasks: Optional[Callable[[List[Task]], None]] = None,
+                 scorer=None, state: Optional[SyncStateStore] = None, pool: IMAPConnectionPool = imap_pool):
+        self.accounts = accounts
+        self.on_tasks = on_tasks
+        # Keyed by group, so a newer email of a group replaces the pending one it supersedes
+        self.pending = TaskPriorityIndex(key=lambda task: (task.account, task.group_id or (task.sender, task.uid)))
+        # In-process scoring: a single new email is faster to score here than to ship to a worker
+        self.scorer = scorer or TaskScorer()
+        self.state = state or SyncStateStore(SYNC_STATE_PATH)
+        self.pool = pool
+        self.watchers: Dict[str, IdleWatcher] = {}
+        self.stats = {'published': 0, 'last_latency_seconds': None, 'max_latency_seconds': 0.0}
+        self._lock = threading.Lock()
+        self._arrived = threading.Condition(self._lock)
+
+    def start(self) -> 'MailWatcher':
+        for account in self.accounts:
+            config = {key: value for key, value in account.items() if key != 'senders'}
+            processor = EmailProcessor(config, pool=self.pool, state=self.state, scorer=self.scorer)
+            watcher = IdleWatcher(
+                config, partial(self._process, processor, config['username'], account['senders']), pool=self.pool
+            )
+            self.watchers[config['username']] = watcher.start()
+        logging.info(f"Watching {len(self.watchers)} inboxes with IMAP IDLE")
+        return self
+
+    def stop(self):
+        for watcher in self.watchers.values():
+            watcher.stop()
+
+    def _process(self, processor: EmailProcessor, username: str, senders: List[str]):
+        """Fetch and score only the UIDs that arrived since the last sync"""
+        started = time.monotonic()
+        
+        def publish(batch: List[Task]):
+            for task in batch:
+                task.account = username
+            latency = time.monotonic() - started
+            with self._lock:
+                self.stats['published'] += len(batch)
+                self.stats['last_latency_seconds'] = latency
+                self.stats['max_latency_seconds'] = max(self.stats['max_latency_seconds'], latency)
+            if self.on_tasks:
+                self.on_tasks(batch)
+            else:
+                with self._arrived:
+                    self.pending.extend(batch)
+                    self._arrived.notify_all()
+        
+        processor.fetch_tasks(senders, on_tasks=publish, include_cached=False)
+
+    def take(self, limit: int, wait: float = 0) -> List[Task]:
+        """Remove and return the `limit` highest priority pending tasks, waiting up to `wait` seconds for one"""
+        with self._arrived:
+            if wait > 0:
+                self._arrived.wait_for(lambda: len(self.pending), timeout=wait)
+            now = datetime.now()
+            if (now - self.pending.now).total_seconds() > WATCH_REKEY_SECONDS:
+                self.pending.rebase(now)
+            tasks = self.pending.top(limit)
+            for task in tasks:
+                self.pending.remove(self.pending.task_id(task))
+        return tasks
+
+    def status(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['pending'] = len(self.pending)
+        stats['accounts'] = {
+            name: {'connected': watcher.connected.is_set(), **watcher.stats}
+            for name, watcher in self.watchers.items()
+        }
+        return stats
+
 def main():
     """Main execution function"""
     # Email configuration
@@ -417,32 +1088,60 @@ def require_api_key(f):
     return decorated_function
 
 class CalendarManager:
-    def __init__(self):
+    def __init__(self, token_path: str = 'token.pickle'):
         self.service = None
         self.SCOPES = ['https://www.googleapis.com/auth/calendar.events']
+        self.token_path = token_path
+        # Set when the service talks to a different endpoint, e.g. a local fake
+        self.batch_uri = None
+        self._creds = None
+        self._token_mtime = None
+        # One service is shared by every job worker, and googleapiclient/httplib2 objects
+        # are not thread-safe: initialization and batch execution take turns
+        self._lock = threading.RLock()
 
     def initialize_service(self):
-        """Initialize Google Calendar service"""
+        """Initialize Google Calendar service, reusing it until the token changes"""
+        with self._lock:
+            return self._initialize_service()
+
+    def _initialize_service(self):
+        token_mtime = os.path.getmtime(self.token_path) if os.path.exists(self.token_path) else None
+        if self.service and token_mtime == self._token_mtime:
+            if self._creds is None or self._creds.valid:
+                return True
+            if self._creds.expired and self._creds.refresh_token:
+                # The service holds the same credentials object, so refreshing in place is enough
+                self._creds.refresh(Request())
+                return True
+        
         creds = None
-        if os.path.exists('token.pickle'):
-            with open('token.pickle', 'rb') as token:
+        if token_mtime is not None:
+            with open(self.token_path, 'rb') as token:
                 creds = pickle.load(token)
 
         if not creds or not creds.valid:
             if creds and creds.expired and creds.refresh_token:
                 creds.refresh(Request())
             else:
+                self.service = None
                 return False
 
-        self.service = build('calendar', 'v3', credentials=creds)
+        self.service = build('calendar', 'v3', credentials=creds, cache_discovery=False)
+        self._creds = creds
+        self._token_mtime = token_mtime
         return True
 
-    def create_event(self, task: Task) -> dict:
-        """Create calendar event from task"""
-        if not self.service:
-            return {"error": "Calendar service not initialized"}
+    @staticmethod
+    def event_id(task: Task) -> str:
+        """Deterministic event ID for a task, so re-running or a newer duplicate updates instead of duplicating"""
+        identity = task.group_id or task.message_id or f"{task.sender}\n{task.subject}\n{task.body}"
+        digest = hashlib.sha1(f"email-task:{identity}".encode()).digest()
+        # Calendar IDs may only use base32hex characters (a-v, 0-9)
+        return base64.b32hexencode(digest).decode().lower().rstrip('=')
 
-        start_time = datetime.now()
+    def _event_body(self, task: Task, now: datetime) -> dict:
+        start_time = now
         if task.priority_score >= 8:
             start_time += timedelta(hours=1)
         elif task.priority_score >= 6:
@@ -452,7 +1151,8 @@ class CalendarManager:
 
         end_time = start_time + timedelta(hours=1)
 
-        event = {
+        return {
+            'id': self.event_id(task),
             'summary': f"[Priority: {task.priority_score}] {task.subject}",
             'description': f"""
 Priority Score: {task.priority_score}/10
@@ -469,14 +1169,74 @@ Email Body:
                 'dateTime': end_time.isoformat(),
                 'timeZone': 'UTC',
             },
+            # Brings back an event that was deleted in the calendar UI
+            'status': 'confirmed',
         }
 
-        try:
-            event = self.service.events().insert(calendarId='primary', body=event).execute()
-            return {"success": True, "event_link": event.get('htmlLink')}
-        except Exception as e:
-            logging.error(f"Failed to create calendar event: {e}")
-            return {"error": str(e)}
+    def create_event(self, task: Task) -> dict:
+        """Create calendar event from task"""
+        return self.create_events([task])[0]
+
+    def create_events(self, tasks: List[Task]) -> List[dict]:
+        """Create events for many tasks in batch requests; events that already exist are updated"""
+        with self._lock:
+            return self._create_events(tasks)
+
+    def _create_events(self, tasks: List[Task]) -> List[dict]:
+        if not self.service:
+            return [{"error": "Calendar service not initialized"} for _ in tasks]
+
+        now = datetime.now()
+        bodies = {str(i): self._event_body(task, now) for i, task in enumerate(tasks)}
+        results = {}
+        
+        events = self.service.events()
+        conflicts = self._execute_batches(
+            bodies, lambda body: events.insert(calendarId='primary', body=body), results
+        )
+        if conflicts:
+            # 409: an event with this ID exists from an earlier run
+            self._execute_batches(
+                {request_id: bodies[request_id] for request_id in conflicts},
+                lambda body: events.update(calendarId='primary', eventId=body['id'], body=body),
+                results, updated=True
+            )
+        return [results[str(i)] for i in range(len(tasks))]
+
+    def _execute_batches(self, bodies: dict, make_request, results: dict, updated: bool = False) -> List[str]:
+        """Send requests in batches of CALENDAR_BATCH_SIZE, returning the IDs that hit a conflict"""
+        conflicts = []
+
+        def callback(request_id, response, exception):
+            if exception is None:
+                results[request_id] = {
+                    "success": True,
+                    "event_id": response.get('id'),
+                    "event_link": response.get('htmlLink'),
+                    "updated": updated
+                }
+            elif not updated and isinstance(exception, HttpError) and exception.resp.status == 409:
+                conflicts.append(request_id)
+            else:
+                logging.error(f"Failed to create calendar event: {exception}")
+                results[request_id] = {"error": str(exception)}
+
+        items = list(bodies.items())
+        for start in range(0, len(items), CALENDAR_BATCH_SIZE):
+            chunk = items[start:start + CALENDAR_BATCH_SIZE]
+            if self.batch_uri:
+                batch = BatchHttpRequest(callback=callback, batch_uri=self.batch_uri)
+            else:
+                batch = self.service.new_batch_http_request(callback=callback)
+            for request_id, body in chunk:
+                batch.add(make_request(body), request_id=request_id)
+            try:
+                batch.execute()
+            except Exception as e:
+                logging.error(f"Calendar batch request failed: {e}")
+                for request_id, _ in chunk:
+                    results.setdefault(request_id, {"error": str(e)})
+        return conflicts
 
 # Initialize global components
 email_processor = None
@@ -492,7 +1252,8 @@ def initialize_processor():
             'server': data.get('server', 'imap.gmail.com'),
             'username': data.get('username'),
             'password': data.get('password'),
-            'port': data.get('port', 993)
+            'port': data.get('port', 993),
+            'ssl': data.get('ssl', True)
         }
         
         global email_processor
@@ -503,10 +1264,63 @@ def initialize_processor():
         logging.error(f"Initialization error: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+def _task_response(task: Task) -> dict:
+    """JSON representation of a task returned by the API"""
+    return {
+        'uid': task.uid,
+        'account': task.account,
+        'subject': task.subject,
+        'sender': task.sender,
+        'sent_at': task.sent_at.isoformat() if task.sent_at else None,
+        'duplicates': task.duplicates,
+        'priority_score': task.priority_score,
+        'deadline': task.deadline.isoformat() if task.deadline else None,
+        'critical_matches': list(task.critical_matches)
+    }
+
+def _run_process_emails(job, processor: EmailProcessor, sender_list: List[str]) -> dict:
+    """Fetch, score, sort and schedule tasks; runs on a job worker"""
+    # Process emails and get tasks, publishing each scored batch as it is ready
+    tasks = processor.fetch_tasks(
+        sender_list, on_tasks=lambda batch: job.add_partial([_task_response(task) for task in batch])
+    )
+
+    # Sort tasks by priority
+    sorted_tasks = processor.analyzer.process_tasks(tasks)
+    
+    # Create calendar events for tasks if calendar is initialized
+    calendar_events = []
+    if calendar_manager.initialize_service():
+        with _stage('calendar_insert'):
+            event_results = calendar_manager.create_events(sorted_tasks)
+        for event_result in event_results:
+            if 'error' in event_result:
+                STAGE_ERRORS.inc(stage='calendar_insert')
+        for task, event_result in zip(sorted_tasks, event_results):
+            calendar_events.append({
+                'task_subject': task.subject,
+                'calendar_result': event_result
+            })
+
+    return {
+        'status': 'success',
+        'tasks': [_task_response(task) for task in sorted_tasks],
+        'calendar_events': calendar_events if calendar_events else None,
+        'summary': processor.generate_summary_report(sorted_tasks)
+    }
+
+job_queue = JobQueue(max_workers=JOB_WORKERS)
+
+def _submit_processing_job(sender_list: List[str]):
+    """Queue processing for the current account; identical pending requests share one run"""
+    config = email_processor.config
+    key = job_key(config.get('server'), config.get('username'), sorted(set(sender_list)))
+    return job_queue.submit(key, _run_process_emails, email_processor, sender_list)
+
 @app.route('/api/process-emails', methods=['POST'])
 @require_api_key
 def process_emails():
-    """Process emails and create tasks"""
+    """Queue a job that processes emails and creates tasks"""
     if not email_processor:
         return jsonify({'status': 'error', 'message': 'Email processor not initialized'}), 400
     
@@ -517,78 +1331,331 @@ def process_emails():
         if not sender_list:
             return jsonify({'status': 'error', 'message': 'No senders provided'}), 400
 
-        # Process emails and get tasks
-        tasks = []
+        job = _submit_processing_job(sender_list)
+
+        return jsonify({
+            'status': 'accepted',
+            'job_id': job.id,
+            'status_url': f'/api/jobs/{job.id}',
+            'result_url': f'/api/jobs/{job.id}/result'
+        }), 202
+
+    except Exception as e:
+        logging.error(f"Error queueing email processing: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+def _stream_event(fmt: str, event: str, data: dict) -> str:
+    """Format one event as a Server-Sent Event or an NDJSON line"""
+    if fmt == 'ndjson':
+        return json.dumps({'event': event, **data}) + '\n'
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/api/process-emails/stream', methods=['POST'])
+@require_api_key
+def process_emails_stream():
+    """Stream each task as soon as it is scored, then the sorted order and summary"""
+    if not email_processor:
+        return jsonify({'status': 'error', 'message': 'Email processor not initialized'}), 400
+    
+    try:
+        data = request.get_json()
+        sender_list = data.get('senders', [])
         
-        with imaplib.IMAP4_SSL(email_processor.config['server']) as mail:
-            mail.login(email_processor.config['username'], email_processor.config['password'])
-            mail.select("inbox")
-            
-            for sender in sender_list:
-                logging.info(f"Processing emails from: {sender}")
-                status, messages = mail.search(None, f'FROM "{sender}"')
-                
-                if status != "OK":
-                    continue
-                
-                email_ids = messages[0].split()[-5:]  # Last 5 emails
-                
-                for email_id in email_ids:
-                    status, msg_data = mail.fetch(email_id, "(RFC822)")
-                    if status != "OK":
-                        continue
-                    
-                    email_content = email.message_from_bytes(msg_data[0][1])
-                    subject = email_processor.email_parser.decode_email_header(email_content["Subject"])
-                    body = email_processor.email_parser.extract_email_body(email_content)
-                    
-                    # Extract dates and calculate priority
-                    dates = email_processor.date_extractor.extract_dates(f"{subject}\n{body}")
-                    priority_score, critical_matches = email_processor.analyzer.calculate_priority_score(
-                        subject, body
-                    )
-                    
-                    task = Task(
-                        subject=subject,
-                        body=body,
-                        priority_score=priority_score,
-                        deadline=min(dates) if dates else None,
-                        sender=sender,
-                        critical_matches=critical_matches
-                    )
-                    tasks.append(task)
-
-        # Sort tasks by priority
-        sorted_tasks = email_processor.analyzer.process_tasks(tasks)
-        
-        # Create calendar events for tasks if calendar is initialized
-        calendar_events = []
-        if calendar_manager.initialize_service():
-            for task in sorted_tasks:
-                event_result = calendar_manager.create_event(task)
-                calendar_events.append({
-                    'task_subject': task.subject,
-                    'calendar_result': event_result
-                })
-
-        # Generate response data
-        response_data = {
-            'status': 'success',
-            'tasks': [{
-                'subject': task.subject,
-                'sender': task.sender,
-                'priority_score': task.priority_score,
-                'deadline': task.deadline.isoformat() if task.deadline else None,
-                'critical_matches': list(task.critical_matches)
-            } for task in sorted_tasks],
-            'calendar_events': calendar_events if calendar_events else None,
-            'summary': email_processor.generate_summary_report(sorted_tasks)
+        if not sender_list:
+            return jsonify({'status': 'error', 'message': 'No senders provided'}), 400
+
+        job = _submit_processing_job(sender_list)
+    except Exception as e:
+        logging.error(f"Error queueing email processing: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+    # SSE by default; NDJSON for clients that ask for it
+    ndjson = request.args.get('format') == 'ndjson' or 'application/x-ndjson' in request.headers.get('Accept', '')
+    fmt = 'ndjson' if ndjson else 'sse'
+
+    def events():
+        yield _stream_event(fmt, 'job', {'job_id': job.id})
+        for items in job.follow(heartbeat=STREAM_HEARTBEAT_SECONDS):
+            if not items:
+                # Keeps proxies from closing an idle connection
+                yield _stream_event(fmt, 'heartbeat', {}) if ndjson else ': keep-alive\n\n'
+            for item in items:
+                yield _stream_event(fmt, 'task', item)
+        
+        snapshot = job.snapshot()
+        if snapshot['status'] == 'failed':
+            yield _stream_event(fmt, 'error', {'message': snapshot['error']})
+            return
+        yield _stream_event(fmt, 'complete', {
+            'order': [task['uid'] for task in job.result['tasks']],
+            'summary': job.result['summary'],
+            'calendar_events': job.result['calendar_events']
+        })
+
+    return Response(
+        events(),
+        mimetype='application/x-ndjson' if ndjson else 'text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def _account_config(data: dict, default_senders: List[str]) -> dict:
+    """Email config for one account of a multi-account request"""
+    if not data.get('username'):
+        raise ValueError('Every account needs a username')
+    senders = data.get('senders') or default_senders
+    if not senders:
+        raise ValueError(f"No senders provided for {data['username']}")
+    return {
+        'server': data.get('server', 'imap.gmail.com'),
+        'username': data['username'],
+        'password': data.get('password'),
+        'port': data.get('port', 993),
+        'ssl': data.get('ssl', True),
+        'senders': senders
+    }
+
+def _run_process_accounts(job, accounts: List[dict]) -> dict:
+    """Process every account and merge the results; runs on a job worker"""
+    processor = MultiAccountProcessor()
+    sorted_tasks, accounts_status = processor.fetch_tasks(
+        accounts, on_tasks=lambda batch: job.add_partial([_task_response(task) for task in batch])
+    )
+    return {
+        'status': 'success',
+        'tasks': [_task_response(task) for task in sorted_tasks],
+        'accounts': accounts_status,
+        'summary': EmailProcessor.generate_summary_report(sorted_tasks)
+    }
+
+@app.route('/api/process-accounts', methods=['POST'])
+@require_api_key
+def process_accounts():
+    """Queue a job that processes many accounts in parallel into one prioritized list"""
+    try:
+        data = request.get_json()
+        default_senders = data.get('senders', [])
+        accounts = [_account_config(account, default_senders) for account in data.get('accounts', [])]
+        
+        if not accounts:
+            return jsonify({'status': 'error', 'message': 'No accounts provided'}), 400
+
+        # Identical requests for the same set of accounts and senders share one run
+        key = job_key(sorted(
+            (account['server'], account['username'], sorted(set(account['senders'])))
+            for account in accounts
+        ))
+        job = job_queue.submit(key, _run_process_accounts, accounts)
+        
+        return jsonify({
+            'status': 'accepted',
+            'job_id': job.id,
+            'status_url': f'/api/jobs/{job.id}',
+            'result_url': f'/api/jobs/{job.id}/result'
+        }), 202
+
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        logging.error(f"Error queueing account processing: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+# Push-mode watcher started through /api/watch; at most one per process
+mail_watcher: Optional[MailWatcher] = None
+mail_watcher_lock = threading.Lock()
+
+@app.route('/api/watch', methods=['POST'])
+@require_api_key
+def start_watch():
+    """Start (or replace) the IMAP IDLE watcher for a set of accounts"""
+    global mail_watcher
+    try:
+        data = request.get_json()
+        default_senders = data.get('senders', [])
+        accounts = [_account_config(account, default_senders) for account in data.get('accounts', [])]
+        
+        if not accounts:
+            return jsonify({'status': 'error', 'message': 'No accounts provided'}), 400
+        
+        with mail_watcher_lock:
+            if mail_watcher is not None:
+                mail_watcher.stop()
+            mail_watcher = MailWatcher(accounts).start()
+        
+        return jsonify({'status': 'success', 'accounts': [account['username'] for account in accounts]})
+    
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        logging.error(f"Error starting watcher: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/api/watch', methods=['GET'])
+@require_api_key
+def watch_tasks():
+    """Take the ?limit= highest priority tasks published by the watcher, waiting up to ?wait= seconds for one"""
+    watcher = mail_watcher
+    if watcher is None:
+        return jsonify({'status': 'error', 'message': 'Watcher not running'}), 404
+    
+    wait = min(float(request.args.get('wait', 0)), STREAM_HEARTBEAT_SECONDS)
+    limit = int(request.args.get('limit', WATCH_PAGE_SIZE))
+    tasks = watcher.take(limit, wait)
+    
+    return jsonify({
+        'status': 'success',
+        'tasks': [_task_response(task) for task in tasks],
+        'watcher': watcher.status()
+    })
+
+@app.route('/api/watch', methods=['DELETE'])
+@require_api_key
+def stop_watch():
+    """Stop the IMAP IDLE watcher"""
+    global mail_watcher
+    with mail_watcher_lock:
+        watcher, mail_watcher = mail_watcher, None
+    if watcher is None:
+        return jsonify({'status': 'error', 'message': 'Watcher not running'}), 404
+    watcher.stop()
+    return jsonify({'status': 'success', 'watcher': watcher.status()})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@require_api_key
+def job_status(job_id):
+    """Report the state and progress of a processing job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    return jsonify({'status': 'success', 'job': job.snapshot()})
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+@require_api_key
+def job_result(job_id):
+    """Return the final result of a job, or the tasks scored so far while it runs"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    
+    snapshot = job.snapshot()
+    if snapshot['status'] == 'succeeded':
+        return jsonify({**job.result, 'job': snapshot})
+    if snapshot['status'] == 'failed':
+        return jsonify({'status': 'error', 'message': snapshot['error'], 'job': snapshot}), 500
+    
+    # Partial results are in scoring order, not yet sorted by priority
+    return jsonify({
+        'status': 'pending',
+        'job': snapshot,
+        'tasks': job.partial_results()
+    }), 202
+
+@app.route('/api/cache/stats', methods=['GET'])
+@require_api_key
+def cache_stats():
+    """Report hit/miss counters for the score and deadline caches"""
+    return jsonify({
+        'status': 'success',
+        'priority_scores': score_cache.summary(),
+        'deadlines': date_cache.summary(),
+        'date_parsing': date_normalizer.report()
+    })
+
+@app.route('/api/pipeline/stats', methods=['GET'])
+@require_api_key
+def pipeline_stats():
+    """Report per-stage throughput and queue depth of the processing pipeline"""
+    return jsonify({
+        'status': 'success',
+        'pipeline': pipeline_metrics.summary(),
+        # Priority scores that skipped the embedding model because the rules decided the bucket
+        'scoring': {
+            'short_circuited': EVALUATIONS.value(path='short_circuit'),
+            'full': EVALUATIONS.value(path='full')
         }
+    })
+
+@app.route('/api/models/status', methods=['GET'])
+@require_api_key
+def models_status():
+    """Report load state, cold-start time and memory of each model"""
+    return jsonify({'status': 'success', 'models': model_registry.status()})
+
+def _collect_state_metrics():
+    """Cache, model and queue state that is already tracked elsewhere, read at scrape time"""
+    caches = {'priority_scores': score_cache.summary(), 'deadlines': date_cache.summary()}
+    yield family('email_cache_requests_total', 'counter', 'Cache lookups by result', (
+        ({'cache': name, 'result': result}, stats.get(result, 0))
+        for name, stats in caches.items() for result in ('hits', 'disk_hits', 'misses')
+    ))
+    yield family('email_cache_entries', 'gauge', 'Entries held in memory per cache', (
+        ({'cache': name}, stats['entries']) for name, stats in caches.items()
+    ))
+
+    models = model_registry.status()
+    yield family('model_loaded', 'gauge', '1 if the model is loaded, else 0', (
+        ({'model': name}, int(stats['state'] == 'loaded')) for name, stats in models.items()
+    ))
+    yield family('model_load_failed', 'gauge', '1 if the last load attempt failed, else 0', (
+        ({'model': name}, int(stats['state'] == 'failed')) for name, stats in models.items()
+    ))
+    yield family('model_load_seconds', 'gauge', 'Cold-start time of each loaded model', (
+        ({'model': name}, stats['load_seconds']) for name, stats in models.items() if 'load_seconds' in stats
+    ))
+
+    queues = {name: q.summary() for name, q in pipeline_metrics.queues.items()}
+    yield family('pipeline_queue_last_depth', 'gauge', 'Depth of each pipeline queue at its most recent put', (
+        ({'queue': name}, stats['last_depth']) for name, stats in queues.items()
+    ))
+    yield family('pipeline_queue_max_depth', 'gauge', 'Highest depth seen on each pipeline queue', (
+        ({'queue': name}, stats['max_depth']) for name, stats in queues.items()
+    ))
+
+metrics_registry.register_collector(_collect_state_metrics)
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Stage latency, throughput, errors and cache/model state in the Prometheus text format"""
+    # Unauthenticated like most scrape targets; it exposes counts and timings only
+    return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/api/profile/process-emails', methods=['POST'])
+@require_api_key
+def profile_process_emails():
+    """Run one processing request synchronously under the sampling profiler.
+
+    Returns folded stacks for flamegraph.pl or speedscope; only available with PROFILING_ENABLED=1.
+    """
+    if not PROFILING_ENABLED:
+        return jsonify({'status': 'error', 'message': 'Profiling is disabled'}), 404
+    if not email_processor:
+        return jsonify({'status': 'error', 'message': 'Email processor not initialized'}), 400
+
+    try:
+        data = request.get_json()
+        sender_list = data.get('senders', [])
+        if not sender_list:
+            return jsonify({'status': 'error', 'message': 'No senders provided'}), 400
+
+        # Bypasses the job queue so the request's own thread and its pipeline workers are sampled
+        job = Job(id=uuid.uuid4().hex, key='profile')
+        with SamplingProfiler() as profiler:
+            result = _run_process_emails(job, email_processor, sender_list)
 
-        return jsonify(response_data)
+        summary = profiler.summary()
+        logging.info(f"Profiled email processing: {summary['samples']} samples, {summary['stacks']} stacks")
+        if request.args.get('format') == 'json':
+            return jsonify({
+                'status': 'success',
+                'profile': {**summary, 'folded': profiler.folded()},
+                'tasks': len(result['tasks'])
+            })
+        response = Response(profiler.folded(), content_type='text/plain; charset=utf-8')
+        response.headers['X-Profile-Samples'] = str(summary['samples'])
+        response.headers['X-Profile-Tasks'] = str(len(result['tasks']))
+        return response
 
     except Exception as e:
-        logging.error(f"Error processing emails: {e}")
+        logging.error(f"Error profiling email processing: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @app.route('/api/calendar/auth', methods=['GET'])
@@ -650,4 +1717,7 @@ def oauth2callback():
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 if __name__ == '__main__':
+    # Load the models in the background so the first request does not pay for it
+    if os.getenv('WARM_UP_MODELS', '1') == '1':
+        model_registry.warm_up([model_key(MODEL_NAME, EMBEDDING_BACKEND), SPACY_MODEL])
     app.run(debug=True, port=5000)
\ No newline at end of file
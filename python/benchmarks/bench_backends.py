@@ -0,0 +1,101 @@
+"""Priority scoring throughput, peak RSS and score parity for each embedding backend.
+
+Each backend runs in its own process so peak RSS is not shared between them.
+Scores are compared with the fp32 torch backend; the run fails if any score
+differs by more than --tolerance.
+
+Usage: python benchmarks/bench_backends.py [--emails 2000] [--backends torch int8 onnx]
+                                           [--threads 0] [--tolerance 0.2]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_backend(backend: str, emails: int, threads: int):
+    """Child process: score the corpus with one backend and print JSON results"""
+    from access import EmailPriorityAnalyzer, model_registry
+    from bench_patterns import synthetic_corpus
+    from embedding_backends import configure_threads
+    from score_cache import ResultCache
+
+    configure_threads(threads)
+    corpus = synthetic_corpus(emails, seed=0)
+    batch = [(text[:60], text) for text in corpus]
+    # A zero-sized cache so every email goes through the model
+    analyzer = EmailPriorityAnalyzer(cache=ResultCache('bench', max_entries=0), backend=backend)
+
+    start = time.perf_counter()
+    analyzer.calculate_priority_scores(batch[:8])  # Load the model and encode the templates
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scores = analyzer.calculate_priority_scores(batch)
+    seconds = time.perf_counter() - start
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        'backend': backend,
+        'load_seconds': load_seconds,
+        'emails_per_second': len(batch) / seconds,
+        'peak_rss_mb': peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10,
+        'models': model_registry.status(),
+        'scores': [score for score, _ in scores],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=2000)
+    parser.add_argument('--backends', nargs='+', default=['torch', 'int8', 'onnx'])
+    parser.add_argument('--threads', type=int, default=0, help='torch threads, 0 for the default')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='max score difference from fp32')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return run_backend(args.child, args.emails, args.threads)
+
+    backends = ['torch'] + [backend for backend in args.backends if backend != 'torch']
+    results = {}
+    for backend in backends:
+        proc = subprocess.run(
+            [sys.executable, __file__, '--child', backend, '--emails', str(args.emails),
+             '--threads', str(args.threads)],
+            capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            print(f"{backend:6s} failed: {proc.stderr.strip().splitlines()[-1] if proc.stderr else proc.returncode}")
+            continue
+        results[backend] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    if 'torch' not in results:
+        print("The fp32 torch backend failed; nothing to compare against")
+        return 1
+
+    reference = results['torch']['scores']
+    failed = False
+    print(f"Emails: {args.emails}, torch threads: {args.threads or 'default'}")
+    print(f"{'backend':8s} {'emails/s':>10s} {'speedup':>8s} {'load s':>7s} {'peak RSS MB':>12s} "
+          f"{'max |diff|':>10s} {'changed':>8s}")
+    for backend, result in results.items():
+        diffs = [abs(a - b) for a, b in zip(result['scores'], reference)]
+        max_diff = max(diffs) if diffs else 0.0
+        failed |= max_diff > args.tolerance
+        print(f"{backend:8s} {result['emails_per_second']:10.1f} "
+              f"{result['emails_per_second'] / results['torch']['emails_per_second']:7.2f}x "
+              f"{result['load_seconds']:7.2f} {result['peak_rss_mb']:12.1f} "
+              f"{max_diff:10.2f} {sum(d > 0 for d in diffs):8d}")
+    if failed:
+        print(f"Parity check failed: some scores differ from fp32 by more than {args.tolerance}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
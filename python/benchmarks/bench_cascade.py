@@ -0,0 +1,105 @@
+"""Embedding model calls saved by cascade scoring, and bucket parity with full scoring.
+
+The corpus mimics an alert-heavy inbox: monitoring alerts whose critical
+patterns alone reach the critical bucket, mixed with ordinary mail. Every email
+is scored with the cascade off and on (a zero-sized cache, so nothing is
+reused) and the run fails if any email lands in a different priority bucket.
+--ceilings also tries lower CASCADE_SEMANTIC_CEILING values, which skip the
+model for more mail but are no longer guaranteed to keep buckets.
+
+Usage: python benchmarks/bench_cascade.py [--emails 5000] [--alert-fraction 0.7]
+                                          [--ceilings 10 6] [--stub-models]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_patterns import FILLER  # noqa: E402
+
+ALERTS = [
+    "[FIRING] production down on {host}: service unavailable, outage in progress",
+    "ALERT {host}: server down - database crash detected, data loss possible",
+    "PagerDuty: critical incident on {host}, site down since 03:12 UTC",
+    "[P1] {host} system failure: outage affecting checkout, production blocked",
+]
+SUBJECTS = ["Weekly sync notes", "Lunch on Friday?", "Roadmap draft", "Re: numbers for the report", "Invoice"]
+
+
+def synthetic_inbox(count: int, alert_fraction: float, seed: int):
+    rng = random.Random(seed)
+    batch = []
+    for _ in range(count):
+        host = f"db-{rng.randint(1, 40)}"
+        if rng.random() < alert_fraction:
+            body = rng.choice(ALERTS).format(host=host) + ' ' + ' '.join(rng.choices(FILLER, k=20))
+            batch.append((f"Alert: {host} down", body))
+        else:
+            batch.append((rng.choice(SUBJECTS), ' '.join(rng.choices(FILLER, k=rng.randint(20, 200)))))
+    return batch
+
+
+def score(access, registry, batch, cascade: bool, ceiling: float):
+    from score_cache import ResultCache
+    analyzer = access.EmailPriorityAnalyzer(
+        cache=ResultCache('bench', max_entries=0), registry=registry, cascade=cascade, semantic_ceiling=ceiling
+    )
+    analyzer.calculate_priority_scores(batch[:8])  # Load the model and encode the templates
+    before = {path: access.EVALUATIONS.value(path=path) for path in ('full', 'short_circuit')}
+    start = time.perf_counter()
+    scores = [score for score, _ in analyzer.calculate_priority_scores(batch)]
+    seconds = time.perf_counter() - start
+    counts = {path: access.EVALUATIONS.value(path=path) - count for path, count in before.items()}
+    return scores, seconds, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=5000)
+    parser.add_argument('--alert-fraction', type=float, default=0.7)
+    parser.add_argument('--ceilings', type=float, nargs='+', default=[10.0],
+                        help='CASCADE_SEMANTIC_CEILING values to try; 10 is exact')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stub-models', action='store_true', help='no MiniLM model needed')
+    args = parser.parse_args()
+
+    if args.stub_models:
+        # Keep stub template vectors out of the real template index
+        os.environ['TEMPLATE_INDEX_DIR'] = tempfile.mkdtemp(prefix='bench-templates-')
+    os.environ.setdefault('WARM_UP_MODELS', '0')
+    import access
+    from bench_pipeline import StubEncoder
+    from model_registry import ModelRegistry
+
+    registry = access.model_registry
+    if args.stub_models:
+        registry = ModelRegistry()
+        registry.register(access.model_key(access.MODEL_NAME, access.EMBEDDING_BACKEND), StubEncoder)
+
+    batch = synthetic_inbox(args.emails, args.alert_fraction, args.seed)
+    expected, full_seconds, _ = score(access, registry, batch, cascade=False, ceiling=10.0)
+    print(f"Emails:             {len(batch)} ({args.alert_fraction:.0%} alerts)")
+    print(f"Full scoring:       {full_seconds:8.3f} s, {len(batch)} model evaluations")
+
+    failed = False
+    for ceiling in args.ceilings:
+        actual, seconds, counts = score(access, registry, batch, cascade=True, ceiling=ceiling)
+        changed = sum(
+            1 for a, b in zip(expected, actual) if access.priority_bucket(a) != access.priority_bucket(b)
+        )
+        rescored = sum(1 for a, b in zip(expected, actual) if a != b)
+        print(f"Cascade (ceiling {ceiling:g}): {seconds:8.3f} s, {counts['full']} model evaluations, "
+              f"{counts['short_circuit']} short-circuited ({counts['short_circuit'] / len(batch):.0%}), "
+              f"{full_seconds / seconds:.1f}x")
+        print(f"  bucket changes:   {changed}  (scores differing within a bucket: {rescored - changed})")
+        # Only the exact ceiling guarantees parity; lower ones are reported, not enforced
+        failed |= changed > 0 and ceiling >= 10
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
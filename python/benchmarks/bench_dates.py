@@ -0,0 +1,54 @@
+"""Date extraction throughput: full spaCy pipeline per email vs trimmed nlp.pipe batches.
+
+Usage: python benchmarks/bench_dates.py [--emails 10000] [--batch-size 64] [--n-process 1]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spacy  # noqa: E402
+
+from access import SPACY_MODEL, DateExtractor  # noqa: E402
+from bench_patterns import synthetic_corpus  # noqa: E402
+from score_cache import ResultCache  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=10000)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--n-process', type=int, default=1)
+    args = parser.parse_args()
+
+    corpus = synthetic_corpus(args.emails, seed=0)
+    # A zero-sized cache so every text goes through the model
+    extractor = DateExtractor(cache=ResultCache('bench', max_entries=0),
+                              batch_size=args.batch_size, n_process=args.n_process)
+
+    full_nlp = spacy.load(SPACY_MODEL)
+    start = time.perf_counter()
+    before = []
+    for text in corpus:
+        doc = full_nlp(text)
+        entities = [ent.text for ent in doc.ents if ent.label_ in ['DATE', 'TIME']]
+        before.append(extractor._parse_dates(text, entities))
+    before_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    after = extractor.extract_dates_many(corpus)
+    after_time = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(before, after) if a != b)
+    print(f"Emails:                 {len(corpus)}")
+    print(f"Full pipeline, per doc: {len(corpus) / before_time:10.1f} emails/s")
+    print(f"NER only, nlp.pipe:     {len(corpus) / after_time:10.1f} emails/s")
+    print(f"Speedup:                {before_time / after_time:.2f}x")
+    print(f"Mismatched results:     {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
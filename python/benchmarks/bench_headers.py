@@ -0,0 +1,103 @@
+"""Subject/From header decoding cost with the ASCII fast path and memoization.
+
+The corpus mimics a real inbox: mostly plain ASCII subjects, RFC 2047 encoded
+words (UTF-8 and Latin-1, B and Q encodings) for non-English mail, Re:/Fwd:
+variants of the same threads, and a limited set of recurring senders.
+
+Usage: python benchmarks/bench_headers.py [--headers 200000] [--threads 2000] [--seed 0]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from email.header import Header, decode_header
+from email.utils import formataddr, parseaddr
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from access import EmailParser  # noqa: E402
+
+WORDS = "quarterly report server outage follow up invoice meeting notes deploy review urgent".split()
+NON_ASCII = ["Rechnung für März", "Réunion demain", "会议纪要", "Срочно: сервер", "Überprüfung nötig"]
+NAMES = ["Priya Sharma", "José Álvarez", "Li Wei", "Anna Müller", "Ops Alerts", "GitHub"]
+
+
+def _subject(rng: random.Random) -> str:
+    if rng.random() < 0.2:
+        text = rng.choice(NON_ASCII) + ' ' + ' '.join(rng.choices(WORDS, k=3))
+        charset = rng.choice(['utf-8', 'utf-8', 'iso-8859-1'])
+        try:
+            return Header(text, charset).encode()
+        except UnicodeEncodeError:
+            return Header(text, 'utf-8').encode()
+    return ' '.join(rng.choices(WORDS, k=rng.randint(3, 8))).capitalize()
+
+
+def synthetic_headers(count: int, threads: int, seed: int):
+    rng = random.Random(seed)
+    subjects = [_subject(rng) for _ in range(threads)]
+    senders = []
+    for index in range(threads // 10 or 1):
+        name = rng.choice(NAMES)
+        address = f"user{index}@example.com"
+        senders.append(formataddr((name, address)) if name.isascii() else formataddr((name, address), 'utf-8'))
+    corpus = []
+    for _ in range(count):
+        # Thread activity is skewed: a few busy threads account for most mail
+        subject = subjects[min(int(rng.paretovariate(1.2)) - 1, threads - 1)]
+        prefix = rng.choice(['', '', '', 'Re: ', 'RE: ', 'Fwd: '])
+        corpus.append((prefix + subject, rng.choice(senders)))
+    return corpus
+
+
+def legacy_decode(header: str) -> str:
+    """decode_email_header as it was: decode_header and rebuild on every call"""
+    decoded_parts = []
+    for part, encoding in decode_header(header):
+        if isinstance(part, bytes):
+            decoded_parts.append(part.decode(encoding or 'utf-8', errors='replace'))
+        else:
+            decoded_parts.append(str(part))
+    return " ".join(decoded_parts)
+
+
+def legacy(corpus):
+    return [(legacy_decode(subject), parseaddr(sender)[1].lower()) for subject, sender in corpus]
+
+
+def current(corpus):
+    return [(EmailParser.decode_email_header(subject), EmailParser.parse_from(sender)) for subject, sender in corpus]
+
+
+def timed(fn, corpus):
+    start = time.perf_counter()
+    results = fn(corpus)
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--headers', type=int, default=200000)
+    parser.add_argument('--threads', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = synthetic_headers(args.headers, args.threads, args.seed)
+    encoded = sum(1 for subject, _ in corpus if '=?' in subject)
+    before, expected = timed(legacy, corpus)
+    after, actual = timed(current, corpus)
+
+    mismatches = sum(1 for a, b in zip(expected, actual) if a != b)
+    cache = EmailParser._decode_encoded_header.cache_info()
+    print(f"Messages:               {len(corpus)} ({encoded} encoded subjects)")
+    print(f"Before (per message):   {before / len(corpus) * 1e6:8.2f} us")
+    print(f"After  (per message):   {after / len(corpus) * 1e6:8.2f} us")
+    print(f"Speedup:                {before / after:.2f}x")
+    print(f"Encoded subject cache:  {cache.hits} hits, {cache.misses} misses")
+    print(f"Mismatched results:     {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
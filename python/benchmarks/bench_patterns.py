@@ -0,0 +1,92 @@
+"""Per-email regex cost before and after the precompiled pattern engine.
+
+Usage: python benchmarks/bench_patterns.py [--emails 100000] [--seed 0]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from patterns import (  # noqa: E402
+    CRITICAL_FAMILY, CRITICAL_PATTERNS, DATE_FAMILY, DATE_PATTERNS, URGENCY_FAMILY, URGENCY_PATTERNS
+)
+
+FILLER = (
+    "the team will sync on the roadmap and share notes with everyone after lunch "
+    "please let me know if the numbers look right before we send the report out"
+).split()
+PHRASES = [
+    "server down", "system crash", "critical incident", "production blocked", "site unavailable",
+    "data breach", "database corrupt", "outage", "critical error", "severe performance",
+    "immediate attention", "urgent customer", "asap", "immediately", "urgent", "emergency",
+    "12/10/2024", "2024-11-05", "March 3rd, 2025", "next friday", "tomorrow", "today",
+]
+
+
+def synthetic_corpus(count: int, seed: int):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        words = rng.choices(FILLER, k=rng.randint(20, 200))
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(PHRASES))
+        corpus.append(' '.join(words).lower())
+    return corpus
+
+
+def legacy(text: str):
+    """The per-pattern re.search / re.finditer loops the analyzer used before"""
+    critical_score = 0
+    critical_matches = set()
+    for pattern, weight in CRITICAL_PATTERNS.items():
+        if re.search(pattern, text, re.IGNORECASE):
+            critical_score += weight
+            critical_matches.add(pattern)
+    urgency_score = sum(
+        weight for pattern, weight in URGENCY_PATTERNS.items()
+        if re.search(pattern, text, re.IGNORECASE)
+    )
+    dates = set()
+    for pattern in DATE_PATTERNS:
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            dates.add(match.group())
+    return critical_score, critical_matches, urgency_score, dates
+
+
+def engine(text: str):
+    critical_score, critical_matches = CRITICAL_FAMILY.score(text)
+    urgency_score, _ = URGENCY_FAMILY.score(text)
+    return critical_score, critical_matches, urgency_score, set(DATE_FAMILY.find_all(text))
+
+
+def timed(fn, corpus):
+    start = time.perf_counter()
+    results = [fn(text) for text in corpus]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = synthetic_corpus(args.emails, args.seed)
+    before, expected = timed(legacy, corpus)
+    after, actual = timed(engine, corpus)
+
+    mismatches = sum(1 for a, b in zip(expected, actual) if a != b)
+    print(f"Emails:            {len(corpus)}")
+    print(f"Before (per email): {before / len(corpus) * 1e6:8.2f} us")
+    print(f"After  (per email): {after / len(corpus) * 1e6:8.2f} us")
+    print(f"Speedup:           {before / after:.2f}x")
+    print(f"Mismatched results: {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,331 @@
+"""End-to-end throughput of the email pipeline against a local fake IMAP server.
+
+Loads FakeIMAPServer with a synthetic mailbox, then runs the same work as
+EmailProcessor.process_emails or /api/process-emails: sync → fetch → parse →
+date extraction → scoring → sort. Reports emails/sec, p50/p95/p99 latency per
+stage and peak RSS. Each run starts from an empty sync state and empty score
+caches. fetch_tasks keeps the last 5 messages per sender, so a run processes
+at most 5 x --senders emails.
+
+--stub-models swaps MiniLM and spaCy for a hash-seeded encoder and a blank
+spaCy pipeline with a date entity ruler. That measures everything except model
+cost and needs no downloads.
+
+Usage: python benchmarks/bench_pipeline.py [--emails 2000] [--senders 200] [--runs 3]
+           [--html-fraction 0.3] [--multipart-fraction 0.4] [--attachment-fraction 0.1]
+           [--large-fraction 0.01] [--duplicate-fraction 0] [--body-words 40 400] [--route] [--stub-models]
+           [--output results.json] [--compare baseline.json] [--tolerance 0.2]
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from email.message import EmailMessage
+from functools import wraps
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_patterns import FILLER, PHRASES  # noqa: E402
+
+STAGES = ('sync', 'fetch', 'parse', 'dates', 'scoring', 'sort', 'run')
+
+
+def _text(rng: random.Random, words: int) -> str:
+    tokens = rng.choices(FILLER, k=words)
+    for _ in range(rng.randint(0, 3)):
+        tokens.insert(rng.randrange(len(tokens) + 1), rng.choice(PHRASES))
+    return ' '.join(tokens)
+
+
+def synthetic_mailbox(args) -> list:
+    """Raw RFC 822 messages with the requested size and MIME mix"""
+    rng = random.Random(args.seed)
+    senders = [f"sender{index}@example.com" for index in range(args.senders)]
+    messages = []
+    last = {}
+    for index in range(args.emails):
+        sender = index % args.senders
+        message = EmailMessage()
+        message['From'] = f"Sender {sender} <{senders[sender]}>"
+        message['To'] = 'user@example.com'
+        message['Date'] = 'Mon, 07 Oct 2024 10:00:00 +0000'
+        message['Message-ID'] = f"<{index}.bench@example.com>"
+        if args.duplicate_fraction and sender in last and rng.random() < args.duplicate_fraction:
+            # The sender repeats its previous email, like a re-fired alert
+            subject, body = last[sender]
+        else:
+            subject, body = _text(rng, rng.randint(3, 8))[:120], _text(rng, rng.randint(*args.body_words))
+        last[sender] = subject, body
+        message['Subject'] = subject
+        if rng.random() < args.large_fraction:
+            # A long forwarded thread
+            body += '\n\n' + '\n'.join(f"> {_text(rng, 20)}" for _ in range(5000))
+        roll = rng.random()
+        if roll < args.html_fraction:
+            message.set_content(f"<html><body><p>{body}</p></body></html>", subtype='html')
+        else:
+            message.set_content(body)
+            if roll < args.html_fraction + args.multipart_fraction:
+                message.add_alternative(f"<html><body><p>{body}</p></body></html>", subtype='html')
+        if rng.random() < args.attachment_fraction:
+            message.add_attachment(
+                rng.randbytes(rng.randint(10_000, 500_000)), maintype='application', subtype='pdf',
+                filename='report.pdf'
+            )
+        messages.append(bytes(message))
+    return messages
+
+
+class StubEncoder:
+    """Stands in for SentenceTransformer: deterministic unit vectors seeded by the text"""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts, batch_size: int = 32, convert_to_tensor: bool = False, **kwargs):
+        import torch
+        single = isinstance(texts, str)
+        vectors = np.stack([
+            np.random.default_rng(int.from_bytes(hashlib.md5(text.encode()).digest()[:8], 'little'))
+            .standard_normal(self.dim, dtype=np.float32)
+            for text in ([texts] if single else texts)
+        ])
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        out = vectors[0] if single else vectors
+        return torch.from_numpy(out) if convert_to_tensor else out
+
+
+def stub_spacy():
+    """Blank English pipeline whose only component tags simple date shapes"""
+    import spacy
+    nlp = spacy.blank('en')
+    ruler = nlp.add_pipe('entity_ruler')
+    ruler.add_patterns([
+        {'label': 'DATE', 'pattern': [{'SHAPE': 'dddd'}, {'ORTH': '-'}, {'SHAPE': 'dd'}, {'ORTH': '-'}, {'SHAPE': 'dd'}]},
+        {'label': 'DATE', 'pattern': [{'SHAPE': 'dd/dd/dddd'}]},
+        {'label': 'DATE', 'pattern': [{'LOWER': {'IN': ['today', 'tomorrow']}}]},
+        {'label': 'DATE', 'pattern': [{'LOWER': 'next'}, {'LOWER': {'IN': ['monday', 'friday', 'week']}}]},
+    ])
+    return nlp
+
+
+class StageTimer:
+    """Wraps callables and keeps every call's duration per stage"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def wrap(self, owner, name: str, stage: str):
+        original = getattr(owner, name)
+
+        @wraps(original)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                # list.append is atomic, so parse worker threads can share the list
+                self.samples[stage].append(time.perf_counter() - start)
+
+        setattr(owner, name, timed)
+
+    def summary(self) -> dict:
+        stages = {}
+        for stage in STAGES:
+            samples = np.array(self.samples.get(stage, []))
+            if not len(samples):
+                continue
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+            stages[stage] = {
+                'calls': len(samples),
+                'total_seconds': round(float(samples.sum()), 4),
+                'p50_ms': round(float(p50), 3),
+                'p95_ms': round(float(p95), 3),
+                'p99_ms': round(float(p99), 3),
+            }
+        return stages
+
+
+def run_once(access, config: dict, senders: list, timer: StageTimer, registry, route: bool):
+    """One cold run: fresh sync state and caches, instrumented processor"""
+    from score_cache import ResultCache
+
+    analyzer = access.EmailPriorityAnalyzer(cache=ResultCache('bench', max_entries=0), registry=registry)
+    date_extractor = access.DateExtractor(cache=ResultCache('bench', max_entries=0), registry=registry)
+    state = access.SyncStateStore(tempfile.mktemp(suffix='.db'))
+    processor = access.EmailProcessor(
+        config, state=state, scorer=access.TaskScorer(analyzer, date_extractor)
+    )
+    processor.analyzer = analyzer
+    timer.wrap(processor, '_sync_sender_uids', 'sync')
+    timer.wrap(processor, '_parse_fetched', 'parse')
+    timer.wrap(date_extractor, 'extract_dates_many', 'dates')
+    timer.wrap(analyzer, 'calculate_priority_scores', 'scoring')
+    timer.wrap(analyzer, 'process_tasks', 'sort')
+
+    start = time.perf_counter()
+    if route:
+        access.email_processor = processor
+        client = access.app.test_client()
+        headers = {'X-API-Key': os.getenv('API_KEY', 'your-api-key-here')}
+        job = client.post('/api/process-emails', json={'senders': senders}, headers=headers).get_json()
+        while True:
+            response = client.get(job['result_url'], headers=headers)
+            if response.status_code != 202:
+                break
+            time.sleep(0.01)
+        result = response.get_json()
+        if response.status_code != 200:
+            raise RuntimeError(f"Processing job failed: {result.get('message')}")
+        count = sum(1 + task['duplicates'] for task in result['tasks'])
+    else:
+        tasks = processor.analyzer.process_tasks(processor.fetch_tasks(senders))
+        # Collapsed duplicates were processed too, just not scored separately
+        count = sum(1 + task.duplicates for task in tasks)
+    timer.samples['run'].append(time.perf_counter() - start)
+    return count
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(results: dict, baseline_path: str, tolerance: float) -> bool:
+    """Print the change against a previous results file; False if throughput regressed"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nAgainst {baseline_path} (commit {baseline.get('commit')}):")
+    before, after = baseline['emails_per_second'], results['emails_per_second']
+    print(f"  emails/sec {before:10.1f} -> {after:10.1f} ({after / before - 1:+.1%})")
+    for stage, stats in results['stages'].items():
+        old = baseline['stages'].get(stage)
+        if old and old['p50_ms']:
+            print(f"  {stage:8s} p50 {old['p50_ms']:9.3f} -> {stats['p50_ms']:9.3f} ms "
+                  f"({stats['p50_ms'] / old['p50_ms'] - 1:+.1%})")
+    return after >= before * (1 - tolerance)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=2000)
+    parser.add_argument('--senders', type=int, default=200)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--html-fraction', type=float, default=0.3, help='HTML-only messages')
+    parser.add_argument('--multipart-fraction', type=float, default=0.4, help='text + HTML alternatives')
+    parser.add_argument('--attachment-fraction', type=float, default=0.1)
+    parser.add_argument('--large-fraction', type=float, default=0.01, help='messages with a long quoted thread')
+    parser.add_argument('--duplicate-fraction', type=float, default=0.0,
+                        help='emails that repeat the sender\'s previous one')
+    parser.add_argument('--body-words', type=int, nargs=2, default=(40, 400), metavar=('MIN', 'MAX'))
+    parser.add_argument('--route', action='store_true', help='go through POST /api/process-emails')
+    parser.add_argument('--stub-models', action='store_true', help='no MiniLM/spaCy models needed')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--compare', help='results JSON of a previous commit')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed emails/sec regression')
+    args = parser.parse_args()
+
+    if args.stub_models:
+        # Keep stub template vectors out of the real template index
+        os.environ['TEMPLATE_INDEX_DIR'] = tempfile.mkdtemp(prefix='bench-templates-')
+    os.environ.setdefault('WARM_UP_MODELS', '0')
+    import access
+    from fake_imap import FakeIMAPServer
+    from model_registry import ModelRegistry
+
+    registry = access.model_registry
+    if args.stub_models:
+        registry = ModelRegistry()
+        registry.register(access.model_key(access.MODEL_NAME, access.EMBEDDING_BACKEND), StubEncoder)
+        registry.register(access.SPACY_MODEL, stub_spacy)
+
+    messages = synthetic_mailbox(args)
+    server = FakeIMAPServer(messages).start()
+    config = server.email_config()
+    senders = [f"sender{index}@example.com" for index in range(args.senders)]
+
+    # Load models and encode templates outside the measured runs
+    warm = access.TaskScorer(
+        access.EmailPriorityAnalyzer(registry=registry), access.DateExtractor(registry=registry)
+    )
+    warm.score([('warm up', 'server down tomorrow', 'warm up')])
+
+    timer = StageTimer()
+    timer.wrap(access, 'fetch_raw', 'fetch')  # Looked up as a module global by _fetch_chunks
+    processed = 0
+    duplicates = access.DUPLICATES.value()
+    try:
+        for _ in range(args.runs):
+            processed += run_once(access, config, senders, timer, registry, args.route)
+    finally:
+        server.stop()
+
+    stages = timer.summary()
+    results = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'mode': 'route' if args.route else 'pipeline',
+        'stub_models': args.stub_models,
+        'corpus': {
+            'emails': args.emails,
+            'senders': args.senders,
+            'bytes': sum(len(message) for message in messages),
+            'html_fraction': args.html_fraction,
+            'multipart_fraction': args.multipart_fraction,
+            'attachment_fraction': args.attachment_fraction,
+            'large_fraction': args.large_fraction,
+            'duplicate_fraction': args.duplicate_fraction,
+            'body_words': list(args.body_words),
+        },
+        'runs': args.runs,
+        'emails_processed': processed,
+        'duplicates_collapsed': access.DUPLICATES.value() - duplicates,
+        'emails_per_second': round(processed / stages['run']['total_seconds'], 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'stages': stages,
+    }
+
+    print(f"Mode:            {results['mode']}{' (stub models)' if args.stub_models else ''}")
+    print(f"Emails:          {processed} in {args.runs} runs "
+          f"({results['corpus']['bytes'] / 1e6:.1f} MB mailbox)")
+    print(f"Throughput:      {results['emails_per_second']:.1f} emails/sec")
+    print(f"Duplicates:      {results['duplicates_collapsed']} emails reused an earlier score")
+    print(f"Peak RSS:        {results['peak_rss_mb']:.1f} MB")
+    print(f"{'stage':8s} {'calls':>7s} {'total s':>9s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}")
+    for stage, stats in stages.items():
+        print(f"{stage:8s} {stats['calls']:7d} {stats['total_seconds']:9.3f} "
+              f"{stats['p50_ms']:9.3f} {stats['p95_ms']:9.3f} {stats['p99_ms']:9.3f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare and not compare(results, args.compare, args.tolerance):
+        print(f"Throughput regressed by more than {args.tolerance:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Prioritizing tasks: full sort with a clock read per task vs heap top-k and the incremental index.
+
+Usage: python benchmarks/bench_top_k.py [--tasks 1000000] [--k 50] [--seed 0]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from access import EmailPriorityAnalyzer, Task  # noqa: E402
+from priority_index import TaskPriorityIndex, top_k  # noqa: E402
+
+
+def synthetic_tasks(count: int, seed: int, now: datetime):
+    rng = random.Random(seed)
+    tasks = []
+    for uid in range(count):
+        deadline = None
+        if rng.random() < 0.6:
+            deadline = now + timedelta(minutes=rng.randint(-7 * 24 * 60, 60 * 24 * 60))
+        tasks.append(Task(
+            subject=f'task {uid}',
+            body='',
+            # Coarse scores so there are plenty of ties to keep the ordering honest
+            priority_score=rng.choice([1.5, 4.0, 5.5, 6.0, 7.5, 8.0, 9.0, 10.0]),
+            deadline=deadline,
+            sender=f'sender{uid % 500}@example.com',
+            critical_matches=set(),
+            uid=uid,
+        ))
+    return tasks
+
+
+def legacy_process_tasks(tasks):
+    """process_tasks before this change: datetime.now() inside the key, then a full sort"""
+    def task_sort_key(task):
+        if task.deadline:
+            time_until_deadline = task.deadline - datetime.now()
+            days_until_deadline = time_until_deadline.total_seconds() / (24 * 3600)
+            urgency_score = 1 / (1 + max(0, days_until_deadline))
+        else:
+            urgency_score = 0
+        combined_score = (task.priority_score * 0.7) + (urgency_score * 0.3)
+        deadline_timestamp = task.deadline.timestamp() if task.deadline else float('inf')
+        return (-combined_score, deadline_timestamp)
+    return sorted(tasks, key=task_sort_key)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=1000000)
+    parser.add_argument('--k', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    now = datetime.now()
+    tasks = synthetic_tasks(args.tasks, args.seed, now)
+    analyzer = EmailPriorityAnalyzer()
+
+    legacy_time, _ = timed(lambda: legacy_process_tasks(tasks)[:args.k])
+    sort_time, expected = timed(lambda: analyzer.process_tasks(tasks, now=now)[:args.k])
+    top_k_time, actual = timed(lambda: top_k(tasks, args.k, now=now))
+
+    index = TaskPriorityIndex(now=now)
+    build_time, _ = timed(lambda: index.extend(tasks))
+    indexed_time, indexed = timed(lambda: index.top(args.k))
+
+    # Steady state: a new batch arrives and the oldest tasks expire
+    arrivals = synthetic_tasks(1000, args.seed + 1, now)
+    for task in arrivals:
+        task.uid += args.tasks
+    update_time, _ = timed(lambda: (index.extend(arrivals), [index.remove((t.sender, t.uid)) for t in tasks[:1000]]))
+    refreshed_time, refreshed = timed(lambda: index.top(args.k))
+    expected_after = analyzer.process_tasks(tasks[1000:] + arrivals, now=now)[:args.k]
+
+    mismatches = sum([actual != expected, indexed != expected, refreshed != expected_after])
+    print(f"Tasks: {len(tasks)}, k = {args.k}")
+    print(f"Full sort, clock read per task:     {legacy_time * 1e3:10.1f} ms")
+    print(f"Full sort, one reference time:      {sort_time * 1e3:10.1f} ms")
+    print(f"top_k (heap, O(n log k)):           {top_k_time * 1e3:10.1f} ms")
+    print(f"Index build (one-off):              {build_time * 1e3:10.1f} ms")
+    print(f"Index top-k:                        {indexed_time * 1e3:10.3f} ms")
+    print(f"Index +1000 arrivals / -1000 expiry: {update_time * 1e3:9.1f} ms")
+    print(f"Index top-k after update:           {refreshed_time * 1e3:10.3f} ms")
+    print(f"Speedup, top_k vs legacy sort:      {legacy_time / top_k_time:.2f}x")
+    print(f"Mismatched orderings:               {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
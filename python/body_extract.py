@@ -0,0 +1,135 @@
+import html
+import logging
+import os
+import re
+from email.feedparser import BytesFeedParser
+from email.message import Message
+from typing import Iterable, List, Optional, Tuple
+
+BODY_CHAR_BUDGET = int(os.getenv('BODY_CHAR_BUDGET', 20000))
+# Raw bytes fed to the parser per message; also the most fetch_raw downloads
+MAX_MESSAGE_BYTES = int(os.getenv('MAX_MESSAGE_BYTES', 1024 * 1024))
+FEED_CHUNK_BYTES = 64 * 1024
+
+# Where a quoted reply chain starts: "On <date>, <name> wrote:", Outlook headers, forwarded blocks
+_REPLY_HEADER = re.compile(
+    r'^(?:On\b.{0,300}\bwrote:\s*$'
+    r'|-{2,}\s*Original Message\s*-{2,}'
+    r'|-{2,}\s*Forwarded message\s*-{2,}'
+    r'|From:\s.+\n(?:.*\n){0,3}?(?:Sent|Date):\s)',
+    re.IGNORECASE | re.MULTILINE
+)
+# RFC 3676 "-- " delimiter, and the usual mobile footers
+_SIGNATURE = re.compile(r'^(?:-- ?|Sent from my \w+.*|Get Outlook for \w+.*)$', re.MULTILINE)
+_QUOTED_LINE = re.compile(r'^[ \t]*>.*(?:\n|$)', re.MULTILINE)
+
+_HTML_INVISIBLE = re.compile(r'<(script|style|head|title)\b[^>]*>.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_HTML_BREAK = re.compile(r'<(?:br|/p|/div|/li|/tr|/h[1-6]|p|div|li|tr|h[1-6])\b[^>]*>', re.IGNORECASE)
+_HTML_TAG = re.compile(r'<[^>]*>|<!--.*?-->', re.DOTALL)
+_BLANK_LINES = re.compile(r'\n[ \t]*(?:\n[ \t]*)+')
+_SPACES = re.compile(r'[ \t\r\f\v\xa0]+')
+
+
+class _LeanMessage(Message):
+    """Message that drops attachment payloads as soon as the parser hands them over"""
+
+    def set_payload(self, payload, charset=None):
+        if isinstance(payload, str) and self.get_content_maintype() not in ('text', 'message', 'multipart'):
+            payload = ''
+        super().set_payload(payload, charset)
+
+
+def html_to_text(markup: str) -> str:
+    """Cheap HTML to text: drop invisible blocks and tags, keep line breaks, unescape entities"""
+    text = _HTML_INVISIBLE.sub('', markup)
+    text = _HTML_BREAK.sub('\n', text)
+    text = _SPACES.sub(' ', html.unescape(_HTML_TAG.sub('', text)))
+    return _BLANK_LINES.sub('\n\n', text).strip()
+
+
+def strip_replies(text: str) -> str:
+    """Remove quoted reply chains and the signature, keeping the newly written text"""
+    reply = _REPLY_HEADER.search(text)
+    if reply and reply.start() > 0:
+        text = text[:reply.start()]
+    text = _QUOTED_LINE.sub('', text)
+    signature = _SIGNATURE.search(text)
+    if signature and signature.start() > 0:
+        text = text[:signature.start()]
+    return text.rstrip() + '\n' if text.strip() else ''
+
+
+def _decode(part: Message) -> str:
+    payload = part.get_payload(decode=True)
+    if not payload:
+        return ''
+    charset = part.get_content_charset() or 'utf-8'
+    try:
+        return payload.decode(charset, errors='replace')
+    except LookupError:
+        return payload.decode('utf-8', errors='replace')
+
+
+class BodyExtractor:
+    """Incremental MIME parsing with bounded memory and a character budget for the body.
+
+    Raw bytes are fed to a BytesFeedParser chunk by chunk and feeding stops after
+    `max_bytes`; attachment payloads are discarded as soon as they are parsed.
+    Text is collected part by part until `budget` characters, preferring text/plain
+    and falling back to converted HTML.
+    """
+
+    def __init__(self, budget: int = BODY_CHAR_BUDGET, max_bytes: int = MAX_MESSAGE_BYTES,
+                 strip_quotes: bool = True):
+        self.budget = budget
+        self.max_bytes = max_bytes
+        self.strip_quotes = strip_quotes
+
+    def parse(self, chunks: Iterable[bytes]) -> Tuple[Message, str]:
+        """Parse raw message chunks into the message headers/structure and its bounded body"""
+        parser = BytesFeedParser(_factory=_LeanMessage)
+        fed = 0
+        for chunk in chunks:
+            if fed + len(chunk) > self.max_bytes:
+                parser.feed(chunk[:self.max_bytes - fed])
+                logging.info(f"Message truncated at {self.max_bytes} bytes for body extraction")
+                break
+            parser.feed(chunk)
+            fed += len(chunk)
+        message = parser.close()
+        return message, self.body(message)
+
+    def body(self, message: Message) -> str:
+        """Body text of an already parsed message, within the character budget"""
+        leaves = [part for part in message.walk() if not part.is_multipart()]
+        plain = [part for part in leaves if part.get_content_type() == 'text/plain']
+        if not message.is_multipart() and message.get_content_maintype() != 'text':
+            plain = [message]  # Same as before: a single-part message is always read
+        text = self._collect(plain, convert=None)
+        if not text:
+            html_parts = [part for part in leaves if part.get_content_type() == 'text/html']
+            text = self._collect(html_parts, convert=html_to_text)
+        return text
+
+    def _collect(self, parts: List[Message], convert: Optional[callable]) -> str:
+        pieces = []
+        size = 0
+        for part in parts:
+            if part.get_filename():
+                continue  # Attached text files are not the message body
+            try:
+                text = _decode(part)
+            except Exception as e:
+                logging.warning(f"Error extracting body part: {e}")
+                continue
+            if convert:
+                text = convert(text)
+            if self.strip_quotes:
+                text = strip_replies(text)
+            if not text:
+                continue
+            pieces.append(text[:self.budget - size])
+            size += len(pieces[-1])
+            if size >= self.budget:
+                break
+        return ''.join(pieces)
@@ -0,0 +1,193 @@
+import re
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from dateutil.parser import parse
+
+DATE_MEMO_SIZE = 4096
+TIERS = ('rejected', 'fast', 'memo', 'fuzzy', 'failed')
+
+MONTHS = {
+    name: number
+    for number, names in enumerate([
+        ('jan', 'january'), ('feb', 'february'), ('mar', 'march'), ('apr', 'april'),
+        ('may',), ('jun', 'june'), ('jul', 'july'), ('aug', 'august'),
+        ('sep', 'sept', 'september'), ('oct', 'october'), ('nov', 'november'), ('dec', 'december'),
+    ], 1)
+    for name in names
+}
+WEEKDAYS = {
+    name: number
+    for number, names in enumerate([
+        ('mon', 'monday'), ('tue', 'tues', 'tuesday'), ('wed', 'wednesday'),
+        ('thu', 'thur', 'thurs', 'thursday'), ('fri', 'friday'), ('sat', 'saturday'), ('sun', 'sunday'),
+    ])
+    for name in names
+}
+RELATIVE_DAYS = {'today': 0, 'tonight': 0, 'tomorrow': 1, 'yesterday': -1}
+
+_MONTH = '|'.join(sorted(MONTHS, key=len, reverse=True))
+_WEEKDAY = '|'.join(sorted(WEEKDAYS, key=len, reverse=True))
+_ORDINAL = r'(?:st|nd|rd|th)?'
+
+_DATE_FORMS = [
+    ('iso', rf'(?P<y>\d{{4}})[-/](?P<m>\d{{1,2}})[-/](?P<d>\d{{1,2}})'),
+    ('numeric', r'(?P<a>\d{1,2})[-/.](?P<b>\d{1,2})[-/.](?P<y>\d{2}|\d{4})'),
+    ('month_day', rf'(?P<month>{_MONTH})\.? (?P<d>\d{{1,2}}){_ORDINAL}(?:,? (?P<y>\d{{4}}))?'),
+    ('day_month', rf'(?P<d>\d{{1,2}}){_ORDINAL} (?:of )?(?P<month>{_MONTH})\.?(?:,? (?P<y>\d{{4}}))?'),
+    ('relative', rf'(?P<rel>{"|".join(RELATIVE_DAYS)})'),
+    ('weekday', rf'(?:(?P<which>next|this|on) )?(?P<weekday>{_WEEKDAY})'),
+]
+_TIME = (
+    r'(?P<time>noon|midnight|'
+    r'(?P<hh>\d{1,2})(?::(?P<mm>\d{2}))?(?::(?P<ss>\d{2}))?\s*(?P<ampm>[ap]\.?m\.?)|'
+    r'(?P<hh24>\d{1,2}):(?P<mm24>\d{2})(?::(?P<ss24>\d{2}))?)'
+)
+_FAST_FORMS = [
+    (kind, re.compile(rf'(?:(?:on|by|due|at) )?{form}(?:(?:,| at| @|t)? ?{_TIME})?'))
+    for kind, form in _DATE_FORMS
+] + [('time', re.compile(rf'(?:(?:at|by|@) )?{_TIME}'))]
+
+# Strings that cannot be a calendar date: no digit, month, weekday or relative day word
+_DATE_HINT = re.compile(
+    rf'\d|\b(?:{_MONTH}|{_WEEKDAY}|{"|".join(RELATIVE_DAYS)}|noon|midnight)\b', re.IGNORECASE
+)
+_DURATION = re.compile(
+    r'(?:about |around |over |within |for |the )?(?:last |next |past )?'
+    r'(?:\d+(?:\.\d+)?|a|an|one|two|three|four|five|six|seven|eight|nine|ten|few|several|couple of) '
+    r'(?:seconds?|secs?|minutes?|mins?|hours?|hrs?|days?|weeks?|months?|years?|quarters?)'
+    r'(?: ago| later| from now)?|q[1-4]|h[12]|fy ?\d{2,4}'
+)
+
+
+def _two_digit_year(year: int, now: datetime) -> int:
+    """Same century rule as dateutil: keep the year within 50 years of now"""
+    year += now.year // 100 * 100
+    if year >= now.year + 50:
+        year -= 100
+    elif year < now.year - 50:
+        year += 100
+    return year
+
+
+def _apply_time(day: datetime, match) -> datetime:
+    if not match.group('time'):
+        return day
+    word = match.group('time')
+    if word == 'noon':
+        return day.replace(hour=12)
+    if word == 'midnight':
+        return day
+    if match.group('hh24'):
+        return day.replace(hour=int(match.group('hh24')), minute=int(match.group('mm24')),
+                           second=int(match.group('ss24') or 0))
+    hour = int(match.group('hh'))
+    if not 1 <= hour <= 12:
+        raise ValueError('hour out of range for am/pm')
+    hour = hour % 12 + (12 if match.group('ampm').startswith('p') else 0)
+    return day.replace(hour=hour, minute=int(match.group('mm') or 0), second=int(match.group('ss') or 0))
+
+
+def _fast_parse(kind: str, match, today: datetime) -> datetime:
+    groups = match.groupdict()
+    if kind == 'iso':
+        day = datetime(int(groups['y']), int(groups['m']), int(groups['d']))
+    elif kind == 'numeric':
+        first, second = int(groups['a']), int(groups['b'])
+        year = int(groups['y'])
+        if len(groups['y']) == 2:
+            year = _two_digit_year(year, today)
+        # Month first like dateutil, unless the first number cannot be a month
+        month, day_of_month = (second, first) if first > 12 else (first, second)
+        day = datetime(year, month, day_of_month)
+    elif kind in ('month_day', 'day_month'):
+        year = int(groups['y']) if groups['y'] else today.year
+        day = datetime(year, MONTHS[groups['month']], int(groups['d']))
+    elif kind == 'relative':
+        day = today + timedelta(days=RELATIVE_DAYS[groups['rel']])
+    elif kind == 'weekday':
+        ahead = (WEEKDAYS[groups['weekday']] - today.weekday()) % 7
+        if groups['which'] == 'next' and ahead == 0:
+            ahead = 7
+        day = today + timedelta(days=ahead)
+    else:
+        day = today
+    return _apply_time(day, match)
+
+
+class DateNormalizer:
+    """Deterministic parsing of common date strings, with fuzzy dateutil as the last resort.
+
+    Strings are handled by the first tier that applies: rejected by a cheap
+    pre-filter, parsed by the fast path (ISO, d/m/y, month names, relative days,
+    weekdays, time of day), answered from the memo, or parsed by dateutil.
+    """
+
+    def __init__(self, memo_size: int = DATE_MEMO_SIZE):
+        self.memo_size = memo_size
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    def _count(self, tier: str):
+        with self._lock:
+            self.stats[tier] += 1
+
+    def parse(self, text: str, now: Optional[datetime] = None) -> Optional[datetime]:
+        """Resolve a date string against the reference time `now`, or None if it is not a date"""
+        now = now or datetime.now()
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        cleaned = ' '.join(text.lower().strip(' \t\r\n.,;:!?()[]"\'').split())
+
+        if not cleaned or not _DATE_HINT.search(cleaned) or _DURATION.fullmatch(cleaned):
+            self._count('rejected')
+            return None
+
+        for kind, form in _FAST_FORMS:
+            match = form.fullmatch(cleaned)
+            if match:
+                try:
+                    result = _fast_parse(kind, match, today)
+                except ValueError:
+                    break  # e.g. 31/02/2024; let dateutil decide
+                self._count('fast')
+                return result
+
+        key = (cleaned, today)
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                self.stats['memo'] += 1
+                return self._memo[key]
+
+        tier, result = self._fuzzy(cleaned, today)
+        self._count(tier)
+        with self._lock:
+            self._memo[key] = result
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _fuzzy(text: str, today: datetime) -> Tuple[str, Optional[datetime]]:
+        try:
+            result = parse(text, fuzzy=True, default=today)
+        except (ValueError, OverflowError):
+            return 'failed', None
+        if result.tzinfo is not None:
+            # Deadlines are compared with naive local datetimes
+            result = result.astimezone().replace(tzinfo=None)
+        return 'fuzzy', result
+
+    def report(self) -> Dict[str, object]:
+        """Counts and share of strings handled by each tier"""
+        with self._lock:
+            counts = {tier: self.stats[tier] for tier in TIERS}
+        total = sum(counts.values())
+        return {
+            'total': total,
+            'counts': counts,
+            'shares': {tier: round(count / total, 4) if total else 0.0 for tier, count in counts.items()},
+        }
@@ -0,0 +1,180 @@
+import hashlib
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+SIMHASH_BITS = 64
+SIMHASH_MAX_DISTANCE = int(os.getenv('SIMHASH_MAX_DISTANCE', 3))  # Differing bits still counted as a duplicate
+# Same-subject emails from a sender sent further apart are separate, e.g. a weekly report
+SUBJECT_WINDOW_HOURS = float(os.getenv('SUBJECT_WINDOW_HOURS', 24))
+SHINGLE_WORDS = 3
+MIN_SHINGLES = 8  # Shorter bodies are too small to fingerprint reliably
+
+_WORD = re.compile(r'\w+')
+_DIGITS = re.compile(r'\d+')
+_REPLY_PREFIX = re.compile(r'^\s*(?:(?:re|fwd?|fw|aw|wg|sv|tr)\s*(?:\[\d+\])?\s*:\s*)+', re.IGNORECASE)
+_MESSAGE_ID = re.compile(r'<[^<>\s]+>')
+
+
+def normalize_subject(subject: str) -> str:
+    """Subject without Re:/Fwd: prefixes, case or whitespace differences"""
+    return ' '.join(_REPLY_PREFIX.sub('', subject or '').lower().split())
+
+
+def thread_root(references: Optional[str], in_reply_to: Optional[str]) -> Optional[str]:
+    """Message-ID of the first message in the thread, as far as the headers tell"""
+    # References lists the chain oldest first; In-Reply-To only names the parent
+    ids = _MESSAGE_ID.findall(str(references or '')) or _MESSAGE_ID.findall(str(in_reply_to or ''))
+    return ids[0] if ids else None
+
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash of the word 3-shingles of `text`; None if it is too short"""
+    # Numbers are masked so repeats that differ only in timestamps or counters match exactly
+    words = _WORD.findall(_DIGITS.sub('0', text.lower()))
+    shingles = {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    if len(shingles) < MIN_SHINGLES:
+        return None
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'little') for shingle in shingles),
+        dtype=np.uint64, count=len(shingles)
+    )
+    # Each bit of the fingerprint is the majority vote of that bit over all shingle hashes
+    bits = (hashes[:, None] >> np.arange(SIMHASH_BITS, dtype=np.uint64)) & np.uint64(1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+    return sum(1 << int(bit) for bit in np.flatnonzero(votes > 0))
+
+
+class DuplicateIndex:
+    """Groups emails that are the same thread, the same subject from the same sender
+    within `subject_window` seconds, or near-identical bodies (SimHash within
+    `max_distance` bits).
+
+    Groups are merged when an email matches several of them. Each group keeps the earliest
+    added email as its root, one value, e.g. the task that was scored for it, its size and
+    the largest key added to it, e.g. the newest UID.
+    Near-duplicate lookups use the pigeonhole trick: fingerprints within `max_distance`
+    bits agree exactly on at least one of `max_distance + 1` blocks.
+    """
+
+    def __init__(self, max_distance: int = SIMHASH_MAX_DISTANCE, subject_window: float = SUBJECT_WINDOW_HOURS * 3600):
+        self.max_distance = max_distance
+        self.subject_window = subject_window
+        blocks = max_distance + 1
+        width = SIMHASH_BITS // blocks
+        self._blocks = [(i * width, SIMHASH_BITS - i * width if i == blocks - 1 else width) for i in range(blocks)]
+        self._block_index: List[Dict[int, Dict[int, int]]] = [{} for _ in range(blocks)]
+        self._parent: List[int] = []
+        self._sizes: List[int] = []
+        self._latest: Dict[int, Hashable] = {}
+        self._threads: Dict[str, int] = {}
+        self._subjects: Dict[Hashable, Tuple[int, Optional[float]]] = {}
+        self._items: Dict[Hashable, int] = {}
+        self._values: Dict[int, Any] = {}
+
+    def find(self, item: int) -> int:
+        """Root item of the group `item` belongs to"""
+        while self._parent[item] != item:
+            self._parent[item] = self._parent[self._parent[item]]
+            item = self._parent[item]
+        return item
+
+    def _union(self, a: int, b: int):
+        a, b = sorted((self.find(a), self.find(b)))
+        if a == b:
+            return
+        self._parent[b] = a
+        self._sizes[a] += self._sizes[b]
+        if b in self._values:
+            self._values.setdefault(a, self._values.pop(b))
+        if b in self._latest:
+            latest = self._latest.pop(b)
+            self._latest[a] = max(self._latest.get(a, latest), latest)
+
+    def add(self, sender: str, subject: str, thread_id: Optional[str] = None,
+            fingerprint: Optional[int] = None, key: Optional[Hashable] = None,
+            sent_at: Optional[datetime] = None) -> int:
+        """Index one email and return its item number; it joins every group it matches"""
+        item = len(self._parent)
+        self._parent.append(item)
+        self._sizes.append(1)
+        if key is not None:
+            self._items[key] = item
+            self._latest[item] = key
+
+        subject_key = normalize_subject(subject)
+        if subject_key:
+            # Compared with the latest email sent with that subject; a missing date always matches
+            sent = sent_at.timestamp() if sent_at else None
+            latest = self._subjects.get((sender, subject_key))
+            if latest is not None:
+                other, other_sent = latest
+                if sent is None or other_sent is None or abs(sent - other_sent) <= self.subject_window:
+                    self._union(other, item)
+            if latest is None or sent is not None and (latest[1] is None or sent >= latest[1]):
+                self._subjects[(sender, subject_key)] = (item, sent)
+        if thread_id:
+            other = self._threads.setdefault(thread_id, item)
+            if other != item:
+                self._union(other, item)
+
+        if fingerprint is not None:
+            for (shift, width), index in zip(self._blocks, self._block_index):
+                bucket = index.setdefault((fingerprint >> shift) & ((1 << width) - 1), {})
+                for other_fingerprint, other in bucket.items():
+                    if (fingerprint ^ other_fingerprint).bit_count() <= self.max_distance:
+                        self._union(other, item)
+                # Repeats of the same fingerprint add nothing to search
+                bucket.setdefault(fingerprint, item)
+        return item
+
+    def value(self, item: int) -> Any:
+        return self._values.get(self.find(item))
+
+    def set_value(self, item: int, value: Any):
+        """Attach `value` to the item's group unless it already has one"""
+        self._values.setdefault(self.find(item), value)
+
+    def item(self, key: Hashable) -> int:
+        """Item number of the email added with `key`"""
+        return self._items[key]
+
+    def size(self, item: int) -> int:
+        """Number of emails in the item's group"""
+        return self._sizes[self.find(item)]
+
+    def latest(self, item: int) -> Optional[Hashable]:
+        """Largest key added to the item's group, None if no email in it had a key"""
+        return self._latest.get(self.find(item))
+
+
+def collapse(tasks: Iterable[Any], max_distance: int = SIMHASH_MAX_DISTANCE) -> List[Any]:
+    """One task per group of duplicates, in the order each group first appears.
+
+    The newest task of each group (highest UID, then latest in the input) is kept and
+    its `duplicates` is set to the number of other emails in the group. Repeats of the
+    same UID, e.g. a message matched by two senders, are dropped without being counted.
+    """
+    index = DuplicateIndex(max_distance)
+    items = []
+    seen = set()
+    for task in tasks:
+        if task.uid is not None:
+            if task.uid in seen:
+                continue
+            seen.add(task.uid)
+        item = index.add(task.sender, task.subject, task.thread_id, task.fingerprint, sent_at=task.sent_at)
+        items.append((item, task))
+
+    groups: Dict[int, List[Any]] = {}
+    for item, task in items:
+        groups.setdefault(index.find(item), []).append(task)
+    representatives = []
+    for members in groups.values():
+        newest = max(range(len(members)), key=lambda i: (members[i].uid or 0, i))
+        members[newest].duplicates = len(members) - 1
+        representatives.append(members[newest])
+    return representatives
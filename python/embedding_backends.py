@@ -0,0 +1,50 @@
+import logging
+import os
+from functools import partial
+
+import torch
+
+EMBEDDING_BACKENDS = ('torch', 'int8', 'onnx')
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'torch')
+TORCH_THREADS = int(os.getenv('TORCH_THREADS', 0))  # 0 keeps torch's default
+
+
+def configure_threads(threads: int = TORCH_THREADS):
+    """Cap intra-op threads used by torch on CPU"""
+    if threads > 0:
+        torch.set_num_threads(threads)
+        logging.info(f"Using {threads} torch threads")
+
+
+def model_key(model_name: str, backend: str) -> str:
+    """Registry and cache name of a model served by a backend; fp32 torch keeps the plain name"""
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {EMBEDDING_BACKENDS}")
+    return model_name if backend == 'torch' else f"{model_name}@{backend}"
+
+
+def load_embedding_model(model_name: str, backend: str):
+    """A SentenceTransformer whose encode() runs on the requested backend"""
+    from sentence_transformers import SentenceTransformer
+
+    if backend == 'torch':
+        return SentenceTransformer(model_name)
+    if backend == 'int8':
+        # Dynamic quantization: Linear weights stored as int8, activations quantized on the fly
+        model = SentenceTransformer(model_name, device='cpu')
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if backend == 'onnx':
+        try:
+            import onnxruntime  # noqa: F401
+        except ImportError:
+            raise RuntimeError(
+                "The onnx embedding backend needs ONNX Runtime: pip install 'optimum[onnxruntime]'"
+            )
+        return SentenceTransformer(model_name, device='cpu', backend='onnx')
+    raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {EMBEDDING_BACKENDS}")
+
+
+def register_backends(registry, model_name: str):
+    """Register a lazy loader for every backend; only the ones used are ever loaded"""
+    for backend in EMBEDDING_BACKENDS:
+        registry.register(model_key(model_name, backend), partial(load_embedding_model, model_name, backend))
@@ -0,0 +1,158 @@
+"""Minimal in-process fake of the Google Calendar v3 events API, including HTTP batch requests.
+
+Usage:
+    server = FakeCalendarServer().start()
+    server.attach(calendar_manager)   # point CalendarManager at the fake
+    ...
+    server.stop()
+"""
+import itertools
+import json
+import re
+import threading
+from collections import Counter
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+_EVENTS_PATH = re.compile(r'^/calendar/v3/calendars/(?P<calendar>[^/]+)/events(?:/(?P<event_id>[^/?]+))?')
+
+
+class FakeCalendarHandler(BaseHTTPRequestHandler):
+    server: 'FakeCalendarServer'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+    def _reply(self, status: int, body: bytes, content_type: str = 'application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._handle('GET', self.path, self._body())
+
+    def do_POST(self):
+        if self.path.startswith('/batch/'):
+            return self._batch(self._body())
+        self._handle('POST', self.path, self._body())
+
+    def do_PUT(self):
+        self._handle('PUT', self.path, self._body())
+
+    def _handle(self, method: str, path: str, body: bytes):
+        self.server.stats['http_requests'] += 1
+        status, payload = self.server.dispatch(method, path, body)
+        self._reply(status, json.dumps(payload).encode())
+
+    def _batch(self, body: bytes):
+        """Answer a multipart/mixed batch with one application/http part per inner request"""
+        self.server.stats['http_requests'] += 1
+        self.server.stats['batches'] += 1
+        content_type = self.headers['Content-Type']
+        message = BytesParser(policy=HTTP).parsebytes(
+            f'Content-Type: {content_type}\r\n\r\n'.encode() + body
+        )
+        boundary = 'fake_batch_boundary'
+        parts = []
+        for part in message.iter_parts():
+            raw = part.get_payload(decode=True)
+            request_line, _, rest = raw.partition(b'\r\n' if b'\r\n' in raw else b'\n')
+            method, path, _ = request_line.decode().split(' ', 2)
+            _, _, inner_body = rest.partition(b'\r\n\r\n') if b'\r\n\r\n' in rest else rest.partition(b'\n\n')
+            status, payload = self.server.dispatch(method, path, inner_body)
+            content_id = part['Content-ID'].strip('<>')
+            data = json.dumps(payload)
+            parts.append(
+                f'--{boundary}\r\nContent-Type: application/http\r\n'
+                f'Content-ID: <response-{content_id}>\r\n\r\n'
+                f'HTTP/1.1 {status} {"OK" if status < 400 else "Error"}\r\n'
+                f'Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n{data}\r\n'
+            )
+        response = ''.join(parts) + f'--{boundary}--\r\n'
+        self._reply(200, response.encode(), f'multipart/mixed; boundary={boundary}')
+
+
+class FakeCalendarServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        super().__init__((host, port), FakeCalendarHandler)
+        self.calendars: Dict[str, Dict[str, dict]] = {}
+        self.stats = Counter()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address
+        return f'http://{host}:{port}/'
+
+    @property
+    def batch_uri(self) -> str:
+        return self.base_url + 'batch/calendar/v3'
+
+    def events(self, calendar: str = 'primary') -> Dict[str, dict]:
+        return self.calendars.get(calendar, {})
+
+    def dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, dict]:
+        match = _EVENTS_PATH.match(path)
+        if not match:
+            return 404, _error(404, 'Not Found')
+        calendar = self.calendars.setdefault(match.group('calendar'), {})
+        event_id = match.group('event_id')
+        with self._lock:
+            if method == 'GET' and event_id is None:
+                return 200, {'kind': 'calendar#events', 'items': list(calendar.values())}
+            if method == 'GET':
+                return (200, calendar[event_id]) if event_id in calendar else (404, _error(404, 'Not Found'))
+            event = json.loads(body or b'{}')
+            if method == 'POST' and event_id is None:
+                self.stats['inserts'] += 1
+                event_id = event.get('id') or f'fake{next(self._ids)}'
+                if event_id in calendar:
+                    self.stats['conflicts'] += 1
+                    return 409, _error(409, 'The requested identifier already exists.')
+            elif method == 'PUT':
+                self.stats['updates'] += 1
+                if event_id not in calendar:
+                    return 404, _error(404, 'Not Found')
+            else:
+                return 405, _error(405, 'Method Not Allowed')
+            event['id'] = event_id
+            event['htmlLink'] = f'{self.base_url}event?eid={event_id}'
+            calendar[event_id] = event
+            return 200, event
+
+    def service(self):
+        """A googleapiclient Calendar service that talks to this server"""
+        import httplib2
+        from googleapiclient.discovery import build
+        return build('calendar', 'v3', http=httplib2.Http(), static_discovery=True,
+                     client_options={'api_endpoint': self.base_url + 'calendar/v3/'})
+
+    def attach(self, manager):
+        """Point a CalendarManager at this server instead of Google"""
+        manager.service = self.service()
+        manager.batch_uri = self.batch_uri
+        return manager
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-calendar', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def _error(code: int, message: str) -> dict:
+    return {'error': {'code': code, 'message': message, 'errors': [{'reason': 'fake', 'message': message}]}}
@@ -0,0 +1,362 @@
+"""Minimal in-process IMAP4rev1 server for exercising the IMAP code without Gmail.
+
+Usage:
+    server = FakeIMAPServer(messages=[raw_bytes, ...])
+    server.start()
+    config = server.email_config()   # feed to EmailProcessor / IMAPConnectionPool
+    ...
+    server.stop()
+"""
+import queue
+import re
+import select
+import socket
+import socketserver
+import threading
+from collections import Counter
+from email import message_from_bytes
+from typing import List, Optional
+
+
+def tokenize(line: str) -> list:
+    """Split an IMAP command line into atoms, quoted strings and nested lists"""
+    stack = [[]]
+    i = 0
+    while i < len(line):
+        ch = line[i]
+        if ch == ' ':
+            i += 1
+        elif ch == '"':
+            j = i + 1
+            value = []
+            while line[j] != '"':
+                if line[j] == '\\':
+                    j += 1
+                value.append(line[j])
+                j += 1
+            stack[-1].append(''.join(value))
+            i = j + 1
+        elif ch == '(':
+            stack.append([])
+            i += 1
+        elif ch == ')':
+            inner = stack.pop()
+            stack[-1].append(inner)
+            i += 1
+        else:
+            # Atoms may contain bracketed sections with spaces, e.g. BODY[HEADER.FIELDS (FROM)]
+            j = i
+            depth = 0
+            while j < len(line) and (depth or line[j] not in ' ()'):
+                if line[j] == '[':
+                    depth += 1
+                elif line[j] == ']':
+                    depth -= 1
+                j += 1
+            stack[-1].append(line[i:j])
+            i = j
+    return stack[0]
+
+
+def parse_sequence_set(spec: str, maximum: int) -> set:
+    """Expand an IMAP sequence set such as 1:3,7,9:* into numbers"""
+    numbers = set()
+    for part in spec.split(','):
+        if ':' in part:
+            low, high = part.split(':')
+            low = maximum if low == '*' else int(low)
+            high = maximum if high == '*' else int(high)
+            if low > high:
+                low, high = high, low
+            numbers.update(range(low, high + 1))
+        else:
+            numbers.add(maximum if part == '*' else int(part))
+    return numbers
+
+
+class FakeMailbox:
+    def __init__(self, messages: List[bytes], uidvalidity: int = 1):
+        self.uidvalidity = uidvalidity
+        self.messages = []
+        self.next_uid = 1
+        self.lock = threading.Lock()
+        self.listeners = []
+        for raw in messages:
+            self.append(raw)
+
+    def append(self, raw: bytes) -> int:
+        with self.lock:
+            uid = self.next_uid
+            self.next_uid += 1
+            self.messages.append((uid, raw, message_from_bytes(raw)))
+            listeners = list(self.listeners)
+        for notify in listeners:
+            notify(len(self.messages))
+        return uid
+
+
+class FakeIMAPHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.authenticated = False
+        self.selected: Optional[FakeMailbox] = None
+        with self.server.lock:
+            self.server.clients.add(self.connection)
+
+    def finish(self):
+        with self.server.lock:
+            self.server.clients.discard(self.connection)
+        super().finish()
+
+    def send(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self.wfile.write(data)
+        self.server.stats['bytes_sent'] += len(data)
+
+    def handle(self):
+        self.send('* OK [CAPABILITY IMAP4rev1 IDLE] Fake IMAP ready\r\n')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            line = line.decode(errors='replace').rstrip('\r\n')
+            tag, _, rest = line.partition(' ')
+            command, _, args = rest.partition(' ')
+            command = command.upper()
+            uid = False
+            if command == 'UID':
+                uid = True
+                command, _, args = args.partition(' ')
+                command = command.upper()
+            self.server.stats[f"{'UID ' if uid else ''}{command}"] += 1
+            handler = getattr(self, f'cmd_{command.lower()}', None)
+            if handler is None:
+                self.send(f'{tag} BAD Unknown command\r\n')
+                continue
+            try:
+                if handler(tag, args, uid) is False:
+                    break
+            except Exception as e:
+                self.send(f'{tag} BAD {e}\r\n')
+
+    def cmd_capability(self, tag, args, uid):
+        self.send(f'* CAPABILITY IMAP4rev1 IDLE\r\n{tag} OK CAPABILITY completed\r\n')
+
+    def cmd_login(self, tag, args, uid):
+        username, password = tokenize(args)
+        if (username, password) != (self.server.username, self.server.password):
+            self.send(f'{tag} NO [AUTHENTICATIONFAILED] Invalid credentials\r\n')
+            return
+        self.authenticated = True
+        self.send(f'{tag} OK LOGIN completed\r\n')
+
+    def cmd_logout(self, tag, args, uid):
+        self.send(f'* BYE Logging out\r\n{tag} OK LOGOUT completed\r\n')
+        return False
+
+    def cmd_noop(self, tag, args, uid):
+        self.send(f'{tag} OK NOOP completed\r\n')
+
+    def cmd_select(self, tag, args, uid):
+        if not self.authenticated:
+            self.send(f'{tag} NO Not authenticated\r\n')
+            return
+        name = tokenize(args)[0].lower()
+        mailbox = self.server.mailboxes.get(name)
+        if mailbox is None:
+            self.send(f'{tag} NO Mailbox does not exist\r\n')
+            return
+        self.selected = mailbox
+        self.send(
+            f'* {len(mailbox.messages)} EXISTS\r\n'
+            f'* OK [UIDVALIDITY {mailbox.uidvalidity}] UIDs valid\r\n'
+            f'* OK [UIDNEXT {mailbox.next_uid}] Predicted next UID\r\n'
+            f'{tag} OK [READ-WRITE] SELECT completed\r\n'
+        )
+
+    cmd_examine = cmd_select
+
+    def cmd_idle(self, tag, args, uid):
+        """Push '* n EXISTS' for every append until the client sends DONE"""
+        mailbox = self.selected
+        if mailbox is None:
+            self.send(f'{tag} BAD No mailbox selected\r\n')
+            return
+        arrivals = queue.Queue()
+        with mailbox.lock:
+            mailbox.listeners.append(arrivals.put)
+        self.send('+ idling\r\n')
+        try:
+            while True:
+                try:
+                    self.send(f'* {arrivals.get(timeout=0.05)} EXISTS\r\n')
+                    continue
+                except queue.Empty:
+                    pass
+                readable, _, _ = select.select([self.connection], [], [], 0)
+                if readable:
+                    line = self.rfile.readline()
+                    if not line:
+                        return False
+                    if line.strip().upper() == b'DONE':
+                        break
+        finally:
+            with mailbox.lock:
+                mailbox.listeners.remove(arrivals.put)
+        self.send(f'{tag} OK IDLE terminated\r\n')
+
+    def _matches(self, criteria: list, seq: int, msg_uid: int, msg) -> bool:
+        """Evaluate a flat list of search keys (implicitly ANDed)"""
+        keys = list(criteria)
+        while keys:
+            if not self._match_one(keys, seq, msg_uid, msg):
+                return False
+        return True
+
+    def _match_one(self, keys: list, seq: int, msg_uid: int, msg) -> bool:
+        key = keys.pop(0)
+        if isinstance(key, list):
+            return self._matches(key, seq, msg_uid, msg)
+        upper = key.upper()
+        total = len(self.selected.messages)
+        if upper == 'ALL':
+            return True
+        if upper == 'OR':
+            left = self._match_one(keys, seq, msg_uid, msg)
+            right = self._match_one(keys, seq, msg_uid, msg)
+            return left or right
+        if upper == 'NOT':
+            return not self._match_one(keys, seq, msg_uid, msg)
+        if upper in ('FROM', 'SUBJECT', 'TO'):
+            needle = keys.pop(0).lower()
+            return needle in str(msg.get(upper.capitalize(), '')).lower()
+        if upper == 'UID':
+            max_uid = self.selected.messages[-1][0] if total else 0
+            return msg_uid in parse_sequence_set(keys.pop(0), max_uid)
+        if re.match(r'^[\d*:,]+$', key):
+            return seq in parse_sequence_set(key, total)
+        raise ValueError(f'Unsupported search key {key}')
+
+    def cmd_search(self, tag, args, uid):
+        criteria = tokenize(args)
+        if criteria and str(criteria[0]).upper() == 'CHARSET':
+            criteria = criteria[2:]
+        hits = [
+            str(msg_uid if uid else seq)
+            for seq, (msg_uid, _, msg) in enumerate(self.selected.messages, 1)
+            if self._matches(criteria, seq, msg_uid, msg)
+        ]
+        self.send(f"* SEARCH {' '.join(hits)}\r\n".replace(' \r\n', '\r\n'))
+        self.send(f'{tag} OK SEARCH completed\r\n')
+
+    def _fetch_item(self, item: str, raw: bytes, msg_uid: int) -> bytes:
+        upper = item.upper()
+        if upper == 'UID':
+            return f'UID {msg_uid}'.encode()
+        if upper == 'RFC822.SIZE':
+            return f'RFC822.SIZE {len(raw)}'.encode()
+        if upper in ('RFC822', 'BODY[]', 'BODY.PEEK[]'):
+            name = 'RFC822' if upper == 'RFC822' else 'BODY[]'
+            return name.encode() + b' {%d}\r\n' % len(raw) + raw
+        section = re.match(r'^BODY(?:\.PEEK)?\[([^\]]*)\](?:<(\d+)\.(\d+)>)?$', item, re.IGNORECASE)
+        if not section:
+            raise ValueError(f'Unsupported fetch item {item}')
+        spec, offset, length = section.groups()
+        header, sep, text = raw.partition(b'\r\n\r\n')
+        if not sep:
+            header, sep, text = raw.partition(b'\n\n')
+        spec_upper = spec.upper()
+        if spec_upper == '':
+            data = raw
+        elif spec_upper == 'TEXT':
+            data = text
+        elif spec_upper == 'HEADER':
+            data = header + b'\r\n\r\n'
+        elif spec_upper.startswith('HEADER.FIELDS'):
+            wanted = {f.lower() for f in re.findall(r'[\w-]+', spec[len('HEADER.FIELDS'):])}
+            lines = re.split(rb'\r?\n(?![ \t])', header)
+            data = b''.join(
+                l + b'\r\n' for l in lines
+                if l.split(b':', 1)[0].decode(errors='replace').strip().lower() in wanted
+            ) + b'\r\n'
+        else:
+            raise ValueError(f'Unsupported section {spec}')
+        label = f'BODY[{spec}]'
+        if offset is not None:
+            data = data[int(offset):int(offset) + int(length)]
+            label += f'<{offset}>'
+        return label.encode() + b' {%d}\r\n' % len(data) + data
+
+    def cmd_fetch(self, tag, args, uid):
+        spec, _, items = args.partition(' ')
+        items = tokenize(items)
+        if len(items) == 1 and isinstance(items[0], list):
+            items = items[0]
+        macros = {'FAST': ['RFC822.SIZE'], 'ALL': ['RFC822.SIZE']}
+        if len(items) == 1 and items[0].upper() in macros:
+            items = macros[items[0].upper()]
+        if uid and 'UID' not in [i.upper() for i in items]:
+            items = ['UID'] + items
+        mailbox = self.selected
+        if uid:
+            max_uid = mailbox.messages[-1][0] if mailbox.messages else 0
+            wanted = parse_sequence_set(spec, max_uid)
+        else:
+            wanted = parse_sequence_set(spec, len(mailbox.messages))
+        for seq, (msg_uid, raw, _) in enumerate(mailbox.messages, 1):
+            if (msg_uid if uid else seq) not in wanted:
+                continue
+            parts = [self._fetch_item(item, raw, msg_uid) for item in items]
+            self.send(b'* %d FETCH (' % seq + b' '.join(parts) + b')\r\n')
+        self.send(f'{tag} OK FETCH completed\r\n')
+
+
+class FakeIMAPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, messages: List[bytes] = (), username: str = 'user@example.com',
+                 password: str = 'secret', host: str = '127.0.0.1', port: int = 0):
+        super().__init__((host, port), FakeIMAPHandler)
+        self.username = username
+        self.password = password
+        self.mailboxes = {'inbox': FakeMailbox(list(messages))}
+        self.stats = Counter()
+        self.clients = set()
+        self.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def inbox(self) -> FakeMailbox:
+        return self.mailboxes['inbox']
+
+    def email_config(self) -> dict:
+        """Config dict accepted by EmailProcessor and IMAPConnectionPool"""
+        host, port = self.server_address
+        return {
+            'server': host,
+            'port': port,
+            'username': self.username,
+            'password': self.password,
+            'ssl': False,
+        }
+
+    def disconnect_all(self):
+        """Drop every client connection, like a server restart or a network blip"""
+        with self.lock:
+            clients = list(self.clients)
+        for connection in clients:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-imap', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
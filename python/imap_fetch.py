@@ -0,0 +1,288 @@
+import email
+import imaplib
+import logging
+import re
+from dataclasses import dataclass
+from email.header import decode_header, make_header
+from email.message import Message
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from body_extract import FEED_CHUNK_BYTES, MAX_MESSAGE_BYTES
+
+# Header fields needed to decode the subject, thread the message and parse the prefetched body
+PREFETCH_HEADER_FIELDS = (
+    'SUBJECT', 'FROM', 'DATE', 'MESSAGE-ID', 'REFERENCES', 'IN-REPLY-TO', 'CONTENT-TYPE', 'CONTENT-TRANSFER-ENCODING'
+)
+PREFETCH_TEXT_BYTES = 16384
+# Keep FETCH command lines well under common server limits
+FETCH_CHUNK_SIZE = 500
+# Senders combined into one OR-tree SEARCH
+SEARCH_CHUNK_SIZE = 50
+# Newest matches whose From header is fetched per round when splitting results
+FROM_SCAN_BATCH = 200
+# Past this many scanned headers, unresolved senders fall back to their own SEARCH
+FROM_SCAN_LIMIT = 2000
+
+_MESSAGE_START = re.compile(rb'^\s*(\d+) \(')
+_UID_ATTR = re.compile(rb'\bUID (\d+)')
+_SIZE_ATTR = re.compile(rb'\bRFC822\.SIZE (\d+)')
+_SECTION = re.compile(rb'(BODY\[[^\]]*\](?:<\d+>)?|RFC822(?:\.HEADER|\.TEXT)?) \{\d+\}$', re.IGNORECASE)
+
+
+@dataclass
+class FetchedMessage:
+    header: bytes = b''
+    text: bytes = b''
+    size: Optional[int] = None
+    uid: Optional[int] = None
+    full: Optional[bytes] = None
+
+    def to_message(self) -> Message:
+        """Build a Message from the full download, or from the prefetched parts"""
+        if self.full is not None:
+            return email.message_from_bytes(self.full)
+        return email.message_from_bytes(self.header.rstrip(b'\r\n') + b'\r\n\r\n' + self.text)
+
+    def chunks(self, size: int = FEED_CHUNK_BYTES) -> Iterator[bytes]:
+        """The same bytes to_message parses, as slices for an incremental parser"""
+        if self.full is not None:
+            parts = [self.full]
+        else:
+            parts = [self.header.rstrip(b'\r\n') + b'\r\n\r\n', self.text]
+        for data in parts:
+            for start in range(0, len(data), size):
+                yield data[start:start + size]
+
+
+def sequence_set(ids: Iterable) -> str:
+    """Compress message numbers into an IMAP sequence set, e.g. 1:3,7,9:10"""
+    numbers = sorted({int(i) for i in ids})
+    ranges = []
+    for number in numbers:
+        if ranges and number == ranges[-1][1] + 1:
+            ranges[-1][1] = number
+        else:
+            ranges.append([number, number])
+    return ','.join(str(low) if low == high else f'{low}:{high}' for low, high in ranges)
+
+
+def _section_name(section: bytes) -> str:
+    section = section.upper()
+    if section.startswith(b'BODY[HEADER'):
+        return 'header'
+    if section.startswith(b'BODY[TEXT]'):
+        return 'text'
+    return 'full'
+
+
+def parse_fetch_response(data: list, uid: bool = False) -> Dict[int, dict]:
+    """Group an imaplib FETCH response into {id: {section: bytes, 'uid': .., 'size': ..}}"""
+    messages = {}
+    current = None
+    for item in data:
+        if item is None:
+            continue
+        prefix, literal = item if isinstance(item, tuple) else (item, None)
+        start = _MESSAGE_START.match(prefix)
+        if start:
+            current = {'seq': int(start.group(1))}
+            messages[current['seq']] = current
+        if current is None:
+            continue
+        uid_match = _UID_ATTR.search(prefix)
+        if uid_match:
+            current['uid'] = int(uid_match.group(1))
+        size_match = _SIZE_ATTR.search(prefix)
+        if size_match:
+            current['size'] = int(size_match.group(1))
+        if literal is not None:
+            section = _SECTION.search(prefix)
+            if section:
+                current[_section_name(section.group(1))] = literal
+    if uid:
+        return {m['uid']: m for m in messages.values() if 'uid' in m}
+    return messages
+
+
+def _needs_full_message(fetched: FetchedMessage, prefetch_bytes: int) -> bool:
+    """Decide whether the prefetched partial is enough for BodyExtractor"""
+    if len(fetched.text) < prefetch_bytes:
+        return False  # The whole body fit in the partial
+    message = fetched.to_message()
+    if not message.is_multipart():
+        return True
+    leaves = [part for part in message.walk() if not part.is_multipart()]
+    # The last leaf may have been cut off; we can only trust the parts before it
+    complete_text = [part for part in leaves[:-1] if part.get_content_type() == 'text/plain']
+    return not complete_text or leaves[-1].get_content_type() == 'text/plain'
+
+
+def _fetch(mail: imaplib.IMAP4, ids: List[int], items: str, uid: bool, stats: dict) -> Dict[int, dict]:
+    results = {}
+    for start in range(0, len(ids), FETCH_CHUNK_SIZE):
+        chunk = sequence_set(ids[start:start + FETCH_CHUNK_SIZE])
+        if uid:
+            status, data = mail.uid('FETCH', chunk, items)
+        else:
+            status, data = mail.fetch(chunk, items)
+        stats['round_trips'] += 1
+        if status != 'OK':
+            logging.warning(f"FETCH {chunk} failed: {status}")
+            continue
+        stats['bytes'] += sum(len(item[1]) for item in data if isinstance(item, tuple))
+        results.update(parse_fetch_response(data, uid))
+    return results
+
+
+def fetch_raw(mail: imaplib.IMAP4, ids: Iterable, uid: bool = False,
+              prefetch_bytes: int = PREFETCH_TEXT_BYTES,
+              max_bytes: Optional[int] = MAX_MESSAGE_BYTES) -> Dict[int, FetchedMessage]:
+    """Fetch many messages with one FETCH per chunk, downloading the full message only when needed.
+
+    Full downloads stop at `max_bytes` (None for no limit), the most BodyExtractor reads.
+    """
+    ids = sorted({int(i) for i in ids})
+    if not ids:
+        return {}
+    stats = {'round_trips': 0, 'bytes': 0}
+
+    # First pass: selected headers plus the start of the body for every message
+    items = (
+        f"(UID RFC822.SIZE BODY.PEEK[HEADER.FIELDS ({' '.join(PREFETCH_HEADER_FIELDS)})] "
+        f"BODY.PEEK[TEXT]<0.{prefetch_bytes}>)"
+    )
+    fetched = {}
+    for msg_id, parts in _fetch(mail, ids, items, uid, stats).items():
+        fetched[msg_id] = FetchedMessage(
+            header=parts.get('header', b''),
+            text=parts.get('text', b''),
+            size=parts.get('size'),
+            uid=parts.get('uid'),
+        )
+
+    # Second pass: full downloads only for bodies the partial could not cover
+    incomplete = [msg_id for msg_id, f in fetched.items() if _needs_full_message(f, prefetch_bytes)]
+    if incomplete:
+        full_item = f'BODY.PEEK[]<0.{max_bytes}>' if max_bytes else 'BODY.PEEK[]'
+        for msg_id, parts in _fetch(mail, incomplete, f'({full_item})', uid, stats).items():
+            if msg_id in fetched and 'full' in parts:
+                fetched[msg_id].full = parts['full']
+
+    logging.info(
+        f"Fetched {len(fetched)} messages in {stats['round_trips']} FETCH round trips "
+        f"({len(incomplete)} full downloads, {stats['bytes']} bytes)"
+    )
+    return fetched
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def or_query(senders: List[str]) -> str:
+    """Build a balanced OR-tree of FROM keys; IMAP OR is a binary prefix operator"""
+    if len(senders) == 1:
+        return f'FROM {_quote(senders[0])}'
+    middle = len(senders) // 2
+    return f'OR {or_query(senders[:middle])} {or_query(senders[middle:])}'
+
+
+def _search(mail: imaplib.IMAP4, query: str, uid: bool) -> List[int]:
+    if uid:
+        status, data = mail.uid('SEARCH', None, query)
+    else:
+        status, data = mail.search(None, query)
+    if status != 'OK':
+        raise imaplib.IMAP4.error(f"SEARCH failed: {status}")
+    return [int(i) for i in data[0].split()]
+
+
+def highest_uid(mail: imaplib.IMAP4) -> int:
+    """Largest UID in the selected mailbox, 0 when it is empty"""
+    uids = _search(mail, 'UID *', uid=True)
+    return max(uids) if uids else 0
+
+
+def uids_since(mail: imaplib.IMAP4, last_uid: int) -> List[int]:
+    """UIDs that arrived after `last_uid` (one UID SEARCH)"""
+    # "n:*" always includes the highest UID, even when it is below n
+    return [u for u in _search(mail, f'UID {last_uid + 1}:*', uid=True) if u > last_uid]
+
+
+def _decode_from(header: bytes) -> str:
+    value = email.message_from_bytes(header).get('From', '')
+    if isinstance(value, str) and '=?' not in value:
+        return value.lower()  # Nothing to decode
+    try:
+        return str(make_header(decode_header(value))).lower()
+    except Exception:
+        return str(value).lower()
+
+
+def _attribute_senders(mail: imaplib.IMAP4, newest_first: List[int], senders: List[str],
+                       per_sender: int, uid: bool, results: Dict[str, List[int]],
+                       stats: dict, limit: Optional[int] = None) -> int:
+    """Assign ids to senders the way IMAP FROM matches (case-insensitive substring of From)"""
+    needles = {sender: sender.lower() for sender in senders}
+    pending = {sender for sender in senders if len(results[sender]) < per_sender}
+    scanned = 0
+    while pending and scanned < len(newest_first) and (limit is None or scanned < limit):
+        batch = newest_first[scanned:scanned + FROM_SCAN_BATCH]
+        scanned += len(batch)
+        headers = _fetch(mail, batch, '(BODY.PEEK[HEADER.FIELDS (FROM)])', uid, stats)
+        for msg_id in batch:
+            from_header = _decode_from(headers.get(msg_id, {}).get('header', b''))
+            for sender in list(pending):
+                if needles[sender] in from_header:
+                    results[sender].append(msg_id)
+                    if len(results[sender]) == per_sender:
+                        pending.discard(sender)
+    return scanned
+
+
+def split_by_sender(mail: imaplib.IMAP4, ids: Iterable, senders: List[str],
+                    per_sender: int = 5, uid: bool = False) -> Dict[str, List[int]]:
+    """Attribute already-known ids (e.g. newly arrived UIDs) to senders locally"""
+    senders = list(dict.fromkeys(senders))
+    results = {sender: [] for sender in senders}
+    stats = {'round_trips': 0, 'bytes': 0}
+    _attribute_senders(mail, sorted({int(i) for i in ids}, reverse=True), senders,
+                       per_sender, uid, results, stats)
+    return {sender: sorted(found) for sender, found in results.items()}
+
+
+def search_senders(mail: imaplib.IMAP4, senders: List[str], per_sender: int = 5,
+                   uid: bool = False, criteria: str = '') -> Dict[str, List[int]]:
+    """Find the last `per_sender` messages from each sender with a few combined SEARCHes"""
+    senders = list(dict.fromkeys(senders))
+    results = {sender: [] for sender in senders}
+    if not senders:
+        return results
+    prefix = f'{criteria} ' if criteria else ''
+    stats = {'round_trips': 0, 'bytes': 0}
+    search_round_trips = 0
+
+    matched = set()
+    for start in range(0, len(senders), SEARCH_CHUNK_SIZE):
+        chunk = senders[start:start + SEARCH_CHUNK_SIZE]
+        matched.update(_search(mail, prefix + or_query(chunk), uid))
+        search_round_trips += 1
+
+    # Attribute matches to senders locally, newest first
+    newest_first = sorted(matched, reverse=True)
+    scanned = _attribute_senders(
+        mail, newest_first, senders, per_sender, uid, results, stats, FROM_SCAN_LIMIT
+    )
+    pending = {sender for sender in senders if len(results[sender]) < per_sender}
+
+    # Senders we could not settle locally keep the exact per-sender semantics
+    if scanned < len(newest_first):
+        for sender in pending:
+            results[sender] = _search(mail, prefix + f'FROM {_quote(sender)}', uid)[-per_sender:]
+            search_round_trips += 1
+
+    logging.info(
+        f"Resolved {len(senders)} senders with {search_round_trips} SEARCH round trips "
+        f"and {stats['round_trips']} From header FETCHes"
+    )
+    return {sender: sorted(ids) for sender, ids in results.items()}
@@ -0,0 +1,137 @@
+import imaplib
+import itertools
+import logging
+import random
+import re
+import socket
+import threading
+from collections import Counter
+from typing import Callable, Optional
+
+from imap_pool import IMAPConnectionPool
+
+# RFC 2177: clients must re-issue IDLE at least every 29 minutes
+IDLE_RENEW_SECONDS = 25 * 60
+BACKOFF_INITIAL = 1.0
+BACKOFF_MAX = 300.0
+
+_EXISTS = re.compile(rb'^\* \d+ EXISTS\b', re.IGNORECASE)
+_tags = itertools.count(1)
+
+
+def idle_start(mail: imaplib.IMAP4) -> bytes:
+    """Send IDLE and wait for the server's continuation; returns the command tag"""
+    # Our own tag namespace, so imaplib's tagged response bookkeeping is untouched
+    tag = b'IDLE%d' % next(_tags)
+    mail.send(tag + b' IDLE\r\n')
+    while True:
+        line = mail.readline()
+        if not line:
+            raise imaplib.IMAP4.abort('Connection closed while starting IDLE')
+        if line.startswith(b'+'):
+            return tag
+        if line.startswith(tag):
+            raise imaplib.IMAP4.error(f"IDLE rejected: {line.decode(errors='replace').strip()}")
+
+
+class IdleWatcher:
+    """Holds an IMAP IDLE session on one mailbox and calls `on_change` when mail arrives.
+
+    `on_change` runs once after every (re)connect, to catch up on anything that
+    arrived while disconnected, and again for every EXISTS the server pushes.
+    The thread blocks on the socket between notifications. Sessions are replaced
+    every `renew_seconds`, and failed ones reconnect with jittered exponential backoff.
+    """
+
+    def __init__(self, config: dict, on_change: Callable[[], None], pool: Optional[IMAPConnectionPool] = None,
+                 mailbox: str = 'inbox', renew_seconds: float = IDLE_RENEW_SECONDS,
+                 backoff_initial: float = BACKOFF_INITIAL, backoff_max: float = BACKOFF_MAX):
+        self.config = config
+        self.on_change = on_change
+        self.pool = pool or IMAPConnectionPool()
+        self.mailbox = mailbox
+        self.renew_seconds = renew_seconds
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.stats = Counter()
+        self.connected = threading.Event()
+        self._stopped = threading.Event()
+        self._mail: Optional[imaplib.IMAP4] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'IdleWatcher':
+        self._thread = threading.Thread(
+            target=self._run, name=f"imap-idle-{self.config['username']}", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = 5):
+        self._stopped.set()
+        mail = self._mail
+        if mail is not None:
+            try:
+                # Unblocks the readline the watcher thread is sleeping in
+                mail.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        failures = 0
+        while not self._stopped.is_set():
+            try:
+                self._session()
+            except socket.timeout:
+                # Renewal: the timed-out socket was discarded, start a fresh session right away
+                self.stats['renewals'] += 1
+                failures = 0
+            except Exception as e:
+                if self._stopped.is_set():
+                    break
+                self.stats['errors'] += 1
+                delay = min(self.backoff_max, self.backoff_initial * 2 ** failures)
+                delay *= random.uniform(0.5, 1.0)
+                failures += 1
+                logging.warning(
+                    f"IDLE session for {self.config['username']} failed ({e}), reconnecting in {delay:.1f}s"
+                )
+                self._stopped.wait(delay)
+            else:
+                failures = 0
+
+    def _session(self):
+        """One IDLE session: connect, catch up, then react to pushes until renewal, failure or stop"""
+        with self.pool.connection(self.config, self.mailbox) as mail:
+            self._mail = mail
+            try:
+                self.stats['connects'] += 1
+                idle_start(mail)
+                self.connected.set()
+                # Sleeps in readline until the server pushes something; a timeout means renew
+                mail.sock.settimeout(self.renew_seconds)
+                self._notify()
+                while not self._stopped.is_set():
+                    line = mail.readline()
+                    if not line:
+                        raise imaplib.IMAP4.abort('Connection closed during IDLE')
+                    if line.startswith(b'* BYE'):
+                        raise imaplib.IMAP4.abort(line.decode(errors='replace').strip())
+                    if _EXISTS.match(line):
+                        self.stats['notifications'] += 1
+                        self._notify()
+                # Still in IDLE on a shut down socket: make sure the pool discards it
+                raise imaplib.IMAP4.abort('IDLE watcher stopped')
+            finally:
+                self._mail = None
+                self.connected.clear()
+
+    def _notify(self):
+        try:
+            self.on_change()
+            self.stats['runs'] += 1
+        except Exception as e:
+            # Processing errors must not tear down the IDLE session
+            self.stats['run_errors'] += 1
+            logging.error(f"Error handling new mail for {self.config['username']}: {e}")
@@ -0,0 +1,188 @@
+import imaplib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# Gmail drops idle sessions after ~30 minutes, so NOOP well before that
+KEEPALIVE_INTERVAL = 240
+# Connections idle for less than this are handed out without a NOOP check
+VALIDATE_AFTER = 30
+MAX_IDLE_PER_KEY = 4
+
+
+@dataclass
+class PooledConnection:
+    mail: imaplib.IMAP4
+    key: Tuple[str, str]
+    password: str
+    mailbox: str = None
+    uidvalidity: Optional[int] = None
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class IMAPConnectionPool:
+    """Thread-safe pool of authenticated IMAP sessions keyed by (server, username)"""
+
+    def __init__(self, max_idle_per_key: int = MAX_IDLE_PER_KEY,
+                 keepalive_interval: float = KEEPALIVE_INTERVAL,
+                 validate_after: float = VALIDATE_AFTER):
+        self.max_idle_per_key = max_idle_per_key
+        self.keepalive_interval = keepalive_interval
+        self.validate_after = validate_after
+        self._idle: Dict[Tuple[str, str], List[PooledConnection]] = {}
+        self._leased: Dict[int, PooledConnection] = {}
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._keepalive_thread = None
+        self.stats = {'created': 0, 'reused': 0, 'reconnects': 0, 'discarded': 0}
+
+    @staticmethod
+    def _key(config: dict) -> Tuple[str, str]:
+        return (config['server'], config['username'])
+
+    def _connect(self, config: dict) -> PooledConnection:
+        """Open a new connection and log in"""
+        port = config.get('port', 993)
+        if config.get('ssl', True):
+            mail = imaplib.IMAP4_SSL(config['server'], port)
+        else:
+            mail = imaplib.IMAP4(config['server'], port)
+        try:
+            mail.login(config['username'], config['password'])
+        except Exception:
+            self._close(mail)
+            raise
+        with self._lock:
+            self.stats['created'] += 1
+        logging.info(f"Opened IMAP connection to {config['server']} for {config['username']}")
+        return PooledConnection(mail=mail, key=self._key(config), password=config['password'])
+
+    @staticmethod
+    def _close(mail: imaplib.IMAP4):
+        try:
+            mail.logout()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _is_alive(conn: PooledConnection) -> bool:
+        try:
+            status, _ = conn.mail.noop()
+            return status == 'OK'
+        except Exception:
+            return False
+
+    def _acquire(self, config: dict, mailbox: str) -> PooledConnection:
+        key = self._key(config)
+        conn = None
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle and conn is None:
+                candidate = idle.pop()
+                # Credentials were changed through /api/initialize
+                if candidate.password != config['password']:
+                    self.stats['discarded'] += 1
+                    self._close(candidate.mail)
+                else:
+                    conn = candidate
+
+        if conn is not None:
+            stale = time.monotonic() - conn.last_used > self.validate_after
+            if stale and not self._is_alive(conn):
+                logging.info(f"Re-authenticating dead IMAP session for {config['username']}")
+                self._close(conn.mail)
+                conn = self._connect(config)
+                with self._lock:
+                    self.stats['reconnects'] += 1
+            else:
+                with self._lock:
+                    self.stats['reused'] += 1
+        else:
+            conn = self._connect(config)
+
+        if conn.mailbox != mailbox:
+            status, _ = conn.mail.select(mailbox)
+            if status != 'OK':
+                self._release(conn, broken=True)
+                raise imaplib.IMAP4.error(f"Failed to select mailbox {mailbox}")
+            conn.mailbox = mailbox
+            _, data = conn.mail.response('UIDVALIDITY')
+            conn.uidvalidity = int(data[0]) if data and data[0] else None
+        with self._lock:
+            self._leased[id(conn.mail)] = conn
+        return conn
+
+    def _release(self, conn: PooledConnection, broken: bool = False):
+        conn.last_used = time.monotonic()
+        with self._lock:
+            self._leased.pop(id(conn.mail), None)
+            idle = self._idle.setdefault(conn.key, [])
+            if broken or self._closed.is_set() or len(idle) >= self.max_idle_per_key:
+                self.stats['discarded'] += 1
+                discard = True
+            else:
+                idle.append(conn)
+                discard = False
+        if discard:
+            self._close(conn.mail)
+        self._ensure_keepalive()
+
+    @contextmanager
+    def connection(self, config: dict, mailbox: str = 'inbox'):
+        """Lease an authenticated connection with `mailbox` selected"""
+        conn = self._acquire(config, mailbox)
+        try:
+            yield conn.mail
+        except (imaplib.IMAP4.abort, OSError):
+            # The session is unusable; never hand it out again
+            self._release(conn, broken=True)
+            raise
+        except BaseException:
+            self._release(conn)
+            raise
+        else:
+            self._release(conn)
+
+    def uidvalidity(self, mail: imaplib.IMAP4) -> Optional[int]:
+        """UIDVALIDITY reported when the leased connection selected its mailbox"""
+        with self._lock:
+            conn = self._leased.get(id(mail))
+        return conn.uidvalidity if conn else None
+
+    def _ensure_keepalive(self):
+        if self._keepalive_thread is None or not self._keepalive_thread.is_alive():
+            self._keepalive_thread = threading.Thread(
+                target=self._keepalive_loop, name='imap-keepalive', daemon=True
+            )
+            self._keepalive_thread.start()
+
+    def _keepalive_loop(self):
+        """Send NOOP on idle sessions so the server does not drop them"""
+        while not self._closed.wait(self.keepalive_interval):
+            with self._lock:
+                due = []
+                for idle in self._idle.values():
+                    for conn in list(idle):
+                        if time.monotonic() - conn.last_used >= self.keepalive_interval:
+                            idle.remove(conn)
+                            due.append(conn)
+            for conn in due:
+                if self._is_alive(conn):
+                    self._release(conn)
+                else:
+                    logging.info(f"Dropping dead idle IMAP session for {conn.key[1]}")
+                    with self._lock:
+                        self.stats['discarded'] += 1
+                    self._close(conn.mail)
+
+    def close_all(self):
+        """Log out every idle connection and stop the keepalive thread"""
+        self._closed.set()
+        with self._lock:
+            conns = [conn for idle in self._idle.values() for conn in idle]
+            self._idle.clear()
+        for conn in conns:
+            self._close(conn.mail)
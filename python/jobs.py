@@ -0,0 +1,136 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+JOB_WORKERS = 2
+# Finished jobs are kept this long so clients can collect their results
+JOB_RETENTION_SECONDS = 3600
+
+
+def job_key(*parts) -> str:
+    """Coalescing key for jobs that would do identical work"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+@dataclass
+class Job:
+    id: str
+    key: str
+    status: str = 'queued'
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    partial: List[dict] = field(default_factory=list)
+    result: Any = None
+    error: Optional[str] = None
+    _lock: threading.Condition = field(default_factory=threading.Condition, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    def add_partial(self, items: List[dict]):
+        """Publish results as they become available"""
+        with self._lock:
+            self.partial.extend(items)
+            self._lock.notify_all()
+
+    def follow(self, heartbeat: float = 15.0) -> Iterator[List[dict]]:
+        """Yield each new group of partial results until the job finishes.
+
+        An empty list is yielded whenever nothing arrived within `heartbeat` seconds.
+        """
+        seen = 0
+        while True:
+            with self._lock:
+                self._lock.wait_for(lambda: len(self.partial) > seen or self.done, timeout=heartbeat)
+                items = self.partial[seen:]
+                done = self.done
+            seen += len(items)
+            if items or not done:
+                yield items
+            if done:
+                return
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'job_id': self.id,
+                'status': self.status,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'progress': len(self.partial),
+                'error': self.error,
+            }
+
+    def partial_results(self) -> List[dict]:
+        with self._lock:
+            return list(self.partial)
+
+
+class JobQueue:
+    """Runs jobs on a local thread pool, coalescing duplicates that are still pending"""
+
+    def __init__(self, max_workers: int = JOB_WORKERS, retention: float = JOB_RETENTION_SECONDS):
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job-worker')
+        self._jobs: Dict[str, Job] = {}
+        self._active: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, fn: Callable[..., Any], *args) -> Job:
+        """Queue fn(job, *args), or return the pending job with the same key"""
+        with self._lock:
+            self._expire()
+            job = self._active.get(key)
+            if job is not None:
+                logging.info(f"Coalescing duplicate request into job {job.id}")
+                return job
+            job = Job(id=uuid.uuid4().hex, key=key)
+            self._jobs[job.id] = job
+            self._active[key] = job
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple):
+        with job._lock:
+            job.status = 'running'
+            job.started_at = time.time()
+        try:
+            result = fn(job, *args)
+        except Exception as e:
+            logging.error(f"Job {job.id} failed: {e}")
+            with job._lock:
+                job.status = 'failed'
+                job.error = str(e)
+        else:
+            with job._lock:
+                job.status = 'succeeded'
+                job.result = result
+        finally:
+            with job._lock:
+                job.finished_at = time.time()
+                job._lock.notify_all()
+            with self._lock:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _expire(self):
+        cutoff = time.time() - self.retention
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
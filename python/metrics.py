@@ -0,0 +1,196 @@
+"""Dependency-free counters, gauges and histograms rendered in the Prometheus text format.
+
+Metrics live in the process that records them: work done inside ScoringPool
+worker processes is not visible here.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Seconds; spans a dict lookup to a slow IMAP round trip or model load
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+# name, type, help, [(labels dict, value)]
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def collect(self) -> Iterable[Family]:
+        with self._lock:
+            samples = [(self._labels(key), value) for key, value in self._values.items()]
+        yield self.name + '_total', self.kind, self.documentation, samples
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def collect(self) -> Iterable[Family]:
+        with self._lock:
+            samples = [(self._labels(key), value) for key, value in self._values.items()]
+        yield self.name, self.kind, self.documentation, samples
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: non-cumulative bucket counts (last one is +Inf), sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with block, also when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def collect(self) -> Iterable[Family]:
+        samples = []
+        with self._lock:
+            values = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        for key, counts, total in values:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                samples.append(({**labels, 'le': _format_value(bound)}, cumulative, '_bucket'))
+            samples.append((labels, cumulative, '_count'))
+            samples.append((labels, total, '_sum'))
+        yield self.name, self.kind, self.documentation, samples
+
+
+class MetricsRegistry:
+    """Named metrics plus collector callbacks that report existing state at scrape time"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[Family]]):
+        """`collector()` yields (name, type, help, [(labels, value)]) families on every scrape"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Everything in the Prometheus text exposition format, version 0.0.4"""
+        with self._lock:
+            sources = [metric.collect for metric in self._metrics.values()] + list(self._collectors)
+        lines = []
+        for source in sources:
+            for name, kind, documentation, samples in source():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for sample in samples:
+                    labels, value = sample[0], sample[1]
+                    suffix = sample[2] if len(sample) > 2 else ''
+                    lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+registry = MetricsRegistry()
+
+
+def family(name: str, kind: str, documentation: str,
+           samples: Iterable[Tuple[Dict[str, str], float]]) -> Family:
+    """Helper for collectors"""
+    return name, kind, documentation, list(samples)
@@ -0,0 +1,97 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+def resident_memory_mb() -> float:
+    """Current resident set size of this process in MB"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        # Not Linux: fall back to the peak RSS, which is the best we can get
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+class ModelRegistry:
+    """Process-wide registry that loads each model once, lazily and thread-safely"""
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._models: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.load_stats: Dict[str, dict] = {}
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        with self._lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+            self.load_stats.setdefault(name, {'state': 'not_loaded'})
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def get(self, name: str) -> Any:
+        """Return the model, loading it on first use; concurrent callers wait for one load"""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        if name not in self._loaders:
+            raise KeyError(f"No loader registered for model {name}")
+        with self._locks[name]:
+            model = self._models.get(name)
+            if model is None:
+                model = self._load(name)
+        return model
+
+    def _load(self, name: str) -> Any:
+        self.load_stats[name] = {'state': 'loading'}
+        rss_before = resident_memory_mb()
+        start = time.perf_counter()
+        try:
+            model = self._loaders[name]()
+        except Exception as e:
+            self.load_stats[name] = {'state': 'failed', 'error': str(e)}
+            logging.error(f"Failed to load model {name}: {e}")
+            raise
+        seconds = time.perf_counter() - start
+        rss_after = resident_memory_mb()
+        self._models[name] = model
+        self.load_stats[name] = {
+            'state': 'loaded',
+            'load_seconds': round(seconds, 3),
+            'rss_delta_mb': round(rss_after - rss_before, 1),
+            'rss_mb': round(rss_after, 1),
+        }
+        logging.info(
+            f"Loaded model {name} in {seconds:.2f}s "
+            f"(+{rss_after - rss_before:.1f} MB RSS, {rss_after:.1f} MB total)"
+        )
+        return model
+
+    def warm_up(self, names: Optional[Iterable[str]] = None, background: bool = True):
+        """Load models ahead of the first request, by default on a daemon thread"""
+        names = list(names or self._loaders)
+
+        def load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception:
+                    continue  # Already logged; the first request will retry
+
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(target=load_all, name='model-warm-up', daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> Dict[str, dict]:
+        return {name: dict(stats) for name, stats in self.load_stats.items()}
@@ -0,0 +1,146 @@
+import re
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+# Bump whenever the patterns below or their weights change (invalidates cached scores)
+PATTERN_SET_VERSION = 2
+
+CRITICAL_PATTERNS = {
+    r'\b(server|system)\s*(crash|down|failure)\b': 4.0,
+    r'\b(emergency|critical)\s*(incident|issue|problem)\b': 3.5,
+    r'\bproduction\s*(down|issue|problem|blocked)\b': 3.5,
+    r'\b(service|site)\s*(down|unavailable)\b': 3.5,
+    r'\bdata\s*(loss|corruption|breach)\b': 3.0,
+    r'\bdatabase\s*(crash|down|corrupt)\b': 3.0,
+    r'\boutage\b': 3.0,
+    r'\bcritical\s*error\b': 2.5,
+    r'\bsevere\s*performance\b': 2.5,
+    r'\bimmediate\s*attention\b': 2.0,
+    r'\burgent\s*customer\b': 2.0,
+}
+
+URGENCY_PATTERNS = {
+    r'\basap\b': 1.0,
+    r'\bimmediately\b': 1.0,
+    r'\burgent\b': 1.0,
+    r'\bcritical\b': 1.0,
+    r'\bemergency\b': 1.0,
+}
+
+# Regular expression patterns for common date formats
+DATE_PATTERNS = [
+    r'\b\d{1,2}[-/]\d{1,2}[-/]\d{2,4}\b',
+    r'\b\d{4}[-/]\d{1,2}[-/]\d{1,2}\b',
+    r'\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]* \d{1,2}(?:st|nd|rd|th)?,? \d{4}\b',
+    r'\bnext (?:monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b',
+    r'\btomorrow\b',
+    r'\btoday\b'
+]
+
+
+_CATEGORIES = {'CATEGORY_DIGIT': r'\d', 'CATEGORY_WORD': r'\w', 'CATEGORY_SPACE': r'\s'}
+
+
+def _first_chars(items) -> Optional[Set[str]]:
+    """Character-class fragments a match of the parsed pattern can start with, or None"""
+    for op, av in items:
+        name = str(op)
+        if name == 'AT':
+            continue  # Zero-width anchors such as \b
+        if name == 'LITERAL':
+            return {re.escape(chr(av))}
+        if name == 'IN':
+            fragments = set()
+            for item_op, item_av in av:
+                item_name = str(item_op)
+                if item_name == 'LITERAL':
+                    fragments.add(re.escape(chr(item_av)))
+                elif item_name == 'RANGE':
+                    fragments.add(f'{re.escape(chr(item_av[0]))}-{re.escape(chr(item_av[1]))}')
+                elif item_name == 'CATEGORY' and str(item_av) in _CATEGORIES:
+                    fragments.add(_CATEGORIES[str(item_av)])
+                else:
+                    return None
+            return fragments
+        if name == 'BRANCH':
+            fragments = set()
+            for branch in av[1]:
+                branch_first = _first_chars(branch)
+                if branch_first is None:
+                    return None
+                fragments |= branch_first
+            return fragments
+        if name == 'SUBPATTERN':
+            return _first_chars(av[-1])
+        if name in ('MAX_REPEAT', 'MIN_REPEAT') and av[0] > 0:
+            return _first_chars(av[2])
+        return None
+    return None
+
+
+class PatternFamily:
+    """A family of regexes compiled into one alternation, one named group per pattern.
+
+    Each text is scanned once per family. The alternation is guarded by a lookahead
+    on the characters any pattern can start with, which lets the regex engine skip
+    ahead instead of trying every alternative at every position. Patterns in a family
+    must not be able to match starting at the same position or inside each other's
+    matches; the built-in families all start with distinct keywords, so results are
+    the same as running every pattern separately.
+    """
+
+    def __init__(self, patterns: Union[Dict[str, float], List[str]], flags: int = re.IGNORECASE):
+        weights = patterns if isinstance(patterns, dict) else dict.fromkeys(patterns, 1.0)
+        self.weights = dict(weights)
+        self._by_group = {f'p{i}': pattern for i, pattern in enumerate(self.weights)}
+        self.regex = re.compile(self._build(flags), flags)
+
+    def _build(self, flags: int) -> str:
+        sources = dict(self._by_group)
+        prefix = ''
+        # Factor out a shared leading word boundary
+        if all(pattern.startswith(r'\b') for pattern in sources.values()):
+            sources = {group: pattern[2:] for group, pattern in sources.items()}
+            prefix = r'\b'
+        first = set()
+        for pattern in self._by_group.values():
+            try:
+                pattern_first = _first_chars(sre_parse.parse(pattern, flags))
+            except Exception:
+                pattern_first = None
+            if pattern_first is None:
+                first = None
+                break
+            first |= pattern_first
+        if first:
+            prefix = f"(?=[{''.join(sorted(first))}]){prefix}"
+        alternation = '|'.join(f'(?P<{group}>{pattern})' for group, pattern in sources.items())
+        return f'{prefix}(?:{alternation})'
+
+    def matched(self, text: str) -> Set[str]:
+        """Source patterns that occur anywhere in the text"""
+        found = set()
+        for match in self.regex.finditer(text):
+            found.add(self._by_group[match.lastgroup])
+            if len(found) == len(self._by_group):
+                break
+        return found
+
+    def score(self, text: str) -> Tuple[float, Set[str]]:
+        """Sum of weights of the patterns present, and those patterns"""
+        found = self.matched(text)
+        return sum(weight for pattern, weight in self.weights.items() if pattern in found), found
+
+    def find_all(self, text: str) -> List[str]:
+        """Every matched substring, in order"""
+        return [match.group() for match in self.regex.finditer(text)]
+
+
+# Built once at import time and shared by every analyzer
+CRITICAL_FAMILY = PatternFamily(CRITICAL_PATTERNS)
+URGENCY_FAMILY = PatternFamily(URGENCY_PATTERNS)
+DATE_FAMILY = PatternFamily(DATE_PATTERNS)
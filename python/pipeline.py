@@ -0,0 +1,271 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+PIPELINE_QUEUE_SIZE = 256
+PIPELINE_PARSE_WORKERS = 4
+# How long the inference stage waits to fill a micro-batch once it has one item
+PIPELINE_BATCH_TIMEOUT = 0.05
+
+STAGES = ('fetch', 'parse', 'inference')
+QUEUES = ('parse', 'inference')
+
+_DONE = object()
+
+
+class _Aborted(Exception):
+    """Another stage failed; unwind without doing more work"""
+
+
+class StageMetrics:
+    """Items handled and time spent working in one pipeline stage"""
+
+    def __init__(self):
+        self.items = 0
+        self.batches = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, items: int, seconds: float, errors: int = 0):
+        with self._lock:
+            self.items += items
+            self.batches += 1
+            self.errors += errors
+            self.busy_seconds += seconds
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'items': self.items,
+                'batches': self.batches,
+                'errors': self.errors,
+                'busy_seconds': round(self.busy_seconds, 4),
+                'items_per_second': round(self.items / self.busy_seconds, 1) if self.busy_seconds else None,
+            }
+
+
+class QueueMetrics:
+    """Depth of a bounded queue, sampled on every put"""
+
+    def __init__(self):
+        self.depth = 0
+        self.max_depth = 0
+        self.puts = 0
+        self.full_waits = 0
+        self._depth_total = 0
+        self._lock = threading.Lock()
+
+    def observe(self, depth: int, waited: bool):
+        with self._lock:
+            self.depth = depth
+            self.max_depth = max(self.max_depth, depth)
+            self.puts += 1
+            self.full_waits += waited
+            self._depth_total += depth
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'last_depth': self.depth,
+                'max_depth': self.max_depth,
+                'mean_depth': round(self._depth_total / self.puts, 2) if self.puts else 0.0,
+                'full_waits': self.full_waits,
+            }
+
+
+class PipelineMetrics:
+    """Per-stage throughput and queue depth, accumulated over every pipeline run"""
+
+    def __init__(self):
+        self.stages = {name: StageMetrics() for name in STAGES}
+        self.queues = {name: QueueMetrics() for name in QUEUES}
+        self.runs = 0
+        self.wall_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record_run(self, seconds: float):
+        with self._lock:
+            self.runs += 1
+            self.wall_seconds += seconds
+
+    def summary(self) -> Dict[str, Any]:
+        stages = {name: stage.summary() for name, stage in self.stages.items()}
+        busiest = max(stages, key=lambda name: stages[name]['busy_seconds'])
+        return {
+            'runs': self.runs,
+            'wall_seconds': round(self.wall_seconds, 4),
+            'stages': stages,
+            'queues': {name: q.summary() for name, q in self.queues.items()},
+            # Parse time is spread over several workers, so this is only a hint
+            'bottleneck': busiest if stages[busiest]['busy_seconds'] else None,
+        }
+
+
+class StagedPipeline:
+    """Fetch, parse and batched inference stages connected by bounded queues.
+
+    The caller's thread drives the fetch stage by iterating `source`, which yields
+    one list of raw items per network round trip. Parse workers turn raw items into
+    model inputs, and a single inference thread groups them into micro-batches of
+    up to `batch_size`, flushing early after `batch_timeout` seconds.
+    """
+
+    def __init__(self, parse_fn: Callable[[Any], Any], infer_fn: Callable[[List[Any]], List[Any]],
+                 on_results: Optional[Callable[[List[Any]], None]] = None,
+                 metrics: Optional[PipelineMetrics] = None,
+                 parse_workers: int = PIPELINE_PARSE_WORKERS,
+                 queue_size: int = PIPELINE_QUEUE_SIZE,
+                 batch_size: int = 64, initial_batch_size: Optional[int] = None,
+                 batch_timeout: float = PIPELINE_BATCH_TIMEOUT):
+        self.parse_fn = parse_fn
+        self.infer_fn = infer_fn
+        self.on_results = on_results
+        self.metrics = metrics or PipelineMetrics()
+        self.parse_workers = parse_workers
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        # Batches grow from this size to batch_size, so the first results come out quickly
+        self.initial_batch_size = initial_batch_size or batch_size
+        self.batch_timeout = batch_timeout
+        self._failed = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._results: List[Any] = []
+
+    def run(self, source: Iterable[List[Any]]) -> List[Any]:
+        """Push every item from source through the stages and return all inference results"""
+        started = time.perf_counter()
+        parse_queue = queue.Queue(maxsize=self.queue_size)
+        inference_queue = queue.Queue(maxsize=self.queue_size)
+        threads = [
+            threading.Thread(target=self._parse_worker, args=(parse_queue, inference_queue),
+                             name=f'pipeline-parse-{i}', daemon=True)
+            for i in range(self.parse_workers)
+        ]
+        threads.append(threading.Thread(target=self._inference_worker, args=(inference_queue,),
+                                        name='pipeline-inference', daemon=True))
+        for thread in threads:
+            thread.start()
+
+        try:
+            chunks = iter(source)
+            while True:
+                fetch_started = time.perf_counter()
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    break
+                self.metrics.stages['fetch'].record(len(chunk), time.perf_counter() - fetch_started)
+                for item in chunk:
+                    self._put(parse_queue, 'parse', item)
+            for _ in range(self.parse_workers):
+                self._put(parse_queue, 'parse', _DONE)
+        except _Aborted:
+            pass
+        except BaseException:
+            self._failed.set()
+            raise
+        finally:
+            for thread in threads:
+                thread.join()
+            self.metrics.record_run(time.perf_counter() - started)
+
+        if self._error is not None:
+            raise self._error
+        return self._results
+
+    def _fail(self, error: BaseException):
+        if self._error is None:
+            self._error = error
+        self._failed.set()
+
+    def _put(self, target: queue.Queue, name: str, item: Any):
+        """Blocking put that gives up when another stage fails; counts waits on a full queue"""
+        waited = False
+        while True:
+            if self._failed.is_set():
+                raise _Aborted()
+            try:
+                if waited:
+                    target.put(item, timeout=0.1)
+                else:
+                    target.put_nowait(item)
+                break
+            except queue.Full:
+                waited = True
+        self.metrics.queues[name].observe(target.qsize(), waited)
+
+    def _get(self, source: queue.Queue, timeout: Optional[float] = None) -> Any:
+        """Blocking get that gives up when another stage fails; raises queue.Empty after timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._failed.is_set():
+                raise _Aborted()
+            wait = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+            if wait <= 0:
+                raise queue.Empty()
+            try:
+                return source.get(timeout=wait)
+            except queue.Empty:
+                continue
+
+    def _parse_worker(self, parse_queue: queue.Queue, inference_queue: queue.Queue):
+        try:
+            while True:
+                item = self._get(parse_queue)
+                if item is _DONE:
+                    self._put(inference_queue, 'inference', _DONE)
+                    return
+                started = time.perf_counter()
+                try:
+                    parsed = self.parse_fn(item)
+                    errors = 0
+                except Exception as e:
+                    logging.error(f"Error parsing pipeline item: {e}")
+                    parsed, errors = None, 1
+                self.metrics.stages['parse'].record(1, time.perf_counter() - started, errors)
+                if parsed is not None:
+                    self._put(inference_queue, 'inference', parsed)
+        except _Aborted:
+            return
+        except BaseException as e:
+            self._fail(e)
+
+    def _inference_worker(self, inference_queue: queue.Queue):
+        producers = self.parse_workers
+        limit = self.initial_batch_size
+        try:
+            while producers:
+                batch = []
+                deadline = None
+                while producers and len(batch) < limit:
+                    timeout = None if deadline is None else deadline - time.monotonic()
+                    if timeout is not None and timeout <= 0:
+                        break
+                    try:
+                        item = self._get(inference_queue, timeout)
+                    except queue.Empty:
+                        break
+                    if item is _DONE:
+                        producers -= 1
+                        continue
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.batch_timeout
+                if batch:
+                    self._infer(batch)
+                    limit = min(limit * 2, self.batch_size)
+        except _Aborted:
+            return
+        except BaseException as e:
+            self._fail(e)
+
+    def _infer(self, batch: List[Any]):
+        started = time.perf_counter()
+        results = self.infer_fn(batch)
+        self.metrics.stages['inference'].record(len(batch), time.perf_counter() - started)
+        self._results.extend(results)
+        if self.on_results:
+            self.on_results(results)
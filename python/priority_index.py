@@ -0,0 +1,133 @@
+import heapq
+import itertools
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+PriorityKey = Tuple[float, float]
+
+
+def priority_key(task: Any, now: datetime) -> PriorityKey:
+    """Sort key of process_tasks: combined priority/urgency score, then earliest deadline"""
+    if task.deadline:
+        days_until_deadline = (task.deadline - now).total_seconds() / (24 * 3600)
+        urgency_score = 1 / (1 + max(0, days_until_deadline))
+    else:
+        urgency_score = 0
+    combined_score = (task.priority_score * 0.7) + (urgency_score * 0.3)
+    deadline_timestamp = task.deadline.timestamp() if task.deadline else float('inf')
+    return (-combined_score, deadline_timestamp)
+
+
+def top_k(tasks: Iterable[Any], k: int, now: Optional[datetime] = None) -> List[Any]:
+    """The first k tasks of the full priority sort, in O(n log k)"""
+    now = now or datetime.now()
+    # nsmallest is stable, so ties keep their input order exactly like sorted()
+    return heapq.nsmallest(k, tasks, key=lambda task: priority_key(task, now))
+
+
+class _Entry:
+    __slots__ = ('task', 'task_id', 'added', 'removed')
+
+    def __init__(self, task: Any, task_id: Hashable, added: datetime):
+        self.task = task
+        self.task_id = task_id
+        self.added = added
+        self.removed = False
+
+
+class TaskPriorityIndex:
+    """Heap of tasks kept in process_tasks order as tasks arrive and expire.
+
+    Keys are computed once against a fixed reference time; call `rebase` to move
+    it forward, which re-keys and re-heapifies in O(n) instead of sorting.
+    Removal is lazy: entries are flagged and dropped when the heap is compacted.
+    """
+
+    def __init__(self, now: Optional[datetime] = None,
+                 key: Callable[[Any], Hashable] = lambda task: (task.sender, task.uid)):
+        self.now = now or datetime.now()
+        self.task_id = key
+        # (key, insertion sequence, entry): the sequence breaks ties in arrival order
+        self._heap: List[Tuple[PriorityKey, int, _Entry]] = []
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._arrivals: deque = deque()
+        self._seq = itertools.count()
+        self._removed = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, task_id: Hashable) -> bool:
+        return task_id in self._entries
+
+    def _item(self, task: Any, added: datetime) -> Tuple[PriorityKey, int, _Entry]:
+        task_id = self.task_id(task)
+        if task_id in self._entries:
+            self.remove(task_id)
+        entry = _Entry(task, task_id, added)
+        self._entries[task_id] = entry
+        self._arrivals.append(entry)
+        return priority_key(task, self.now), next(self._seq), entry
+
+    def add(self, task: Any, added: Optional[datetime] = None):
+        """Insert a task, replacing any task with the same id; O(log n)"""
+        heapq.heappush(self._heap, self._item(task, added or datetime.now()))
+
+    def extend(self, tasks: Iterable[Any], added: Optional[datetime] = None):
+        """Insert many tasks; large batches are heapified in O(n) rather than pushed one by one"""
+        added = added or datetime.now()
+        items = [self._item(task, added) for task in tasks]
+        if len(items) * 8 > len(self._heap):
+            self._heap.extend(items)
+            heapq.heapify(self._heap)
+        else:
+            for item in items:
+                heapq.heappush(self._heap, item)
+
+    def remove(self, task_id: Hashable) -> bool:
+        entry = self._entries.pop(task_id, None)
+        if entry is None:
+            return False
+        entry.removed = True
+        self._removed += 1
+        if self._removed > len(self._heap) // 2:
+            self._compact()
+        return True
+
+    def expire(self, added_before: datetime) -> int:
+        """Drop tasks added before the cutoff; O(expired) since arrivals are in time order"""
+        expired = 0
+        while self._arrivals and self._arrivals[0].added < added_before:
+            entry = self._arrivals.popleft()
+            if not entry.removed and self.remove(entry.task_id):
+                expired += 1
+        return expired
+
+    def top(self, k: int) -> List[Any]:
+        """The k highest priority tasks without popping them, in O(k log k) plus removed entries"""
+        result = []
+        heap = self._heap
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier and len(result) < k:
+            (_, _, entry), index = heapq.heappop(frontier)
+            if not entry.removed:
+                result.append(entry.task)
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+        return result
+
+    def rebase(self, now: Optional[datetime] = None):
+        """Re-key every task against a new reference time"""
+        self.now = now or datetime.now()
+        self._heap = [
+            (priority_key(entry.task, self.now), seq, entry) for _, seq, entry in self._heap if not entry.removed
+        ]
+        self._compact()
+
+    def _compact(self):
+        self._heap = [item for item in self._heap if not item[2].removed]
+        heapq.heapify(self._heap)
+        self._arrivals = deque(entry for entry in self._arrivals if not entry.removed)
+        self._removed = 0
@@ -0,0 +1,72 @@
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Optional, Set
+
+# Opt-in: sampling adds overhead to every thread and exposes code paths
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', '0') == '1'
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 0.005))
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples Python stacks on a background thread and aggregates them as folded stacks.
+
+    Only the thread that starts the profiler and threads created while it runs
+    are sampled, which for a request covers its pipeline workers but not the
+    rest of the server. The output is the `frame;frame;frame count` format read
+    by flamegraph.pl, speedscope and most other flame graph tools.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._excluded: Set[int] = set()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> 'SamplingProfiler':
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        current = threading.get_ident()
+        self._excluded = {ident for ident in sys._current_frames() if ident != current}
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stopped.wait(self.interval):
+            names.update((thread.ident, thread.name) for thread in threading.enumerate())
+            for ident, frame in sys._current_frames().items():
+                if ident == own or ident in self._excluded:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> dict:
+        return {'samples': self.samples, 'interval_seconds': self.interval, 'stacks': len(self.stacks)}
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+SCORE_CACHE_SIZE = 10000
+
+_MISSING = object()
+
+
+def content_key(*parts) -> str:
+    """Stable hash of the inputs a cached result depends on"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8', errors='replace'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Bounded in-memory LRU in front of an optional SQLite tier that survives restarts"""
+
+    def __init__(self, namespace: str, max_entries: int = SCORE_CACHE_SIZE, path: Optional[str] = None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0}
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            with self._db:
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS cache '
+                    '(namespace TEXT, key TEXT, value TEXT, PRIMARY KEY (namespace, key))'
+                )
+
+    def _remember(self, key: str, value: Any):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is not _MISSING:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return value
+            if self._db is not None:
+                row = self._db.execute(
+                    'SELECT value FROM cache WHERE namespace = ? AND key = ?', (self.namespace, key)
+                ).fetchone()
+                if row:
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+                    self.stats['disk_hits'] += 1
+                    return value
+            self.stats['misses'] += 1
+            return default
+
+    def put(self, key: str, value: Any):
+        """Store a JSON-serializable value"""
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                with self._db:
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO cache (namespace, key, value) VALUES (?, ?, ?)',
+                        (self.namespace, key, json.dumps(value))
+                    )
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries,
+                    'persistent': self._db is not None, **self.stats}
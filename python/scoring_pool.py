@@ -0,0 +1,81 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+SCORING_PROCESSES = int(os.getenv('SCORING_PROCESSES', min(4, os.cpu_count() or 1)))
+
+# Per-process scorer, created once by the pool initializer
+_worker_scorer = None
+
+
+def _init_worker(scorer_factory: Callable[[], Any], torch_threads: int):
+    """Build the scorer once per worker; its models load on the first batch and stay resident"""
+    global _worker_scorer
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    _worker_scorer = scorer_factory()
+
+
+def _score_in_worker(parsed_emails: List[Tuple[str, str, str]]) -> List[dict]:
+    return [task.to_dict() for task in _worker_scorer.score(parsed_emails)]
+
+
+def _deadlines_in_worker(parsed_emails: List[Tuple[str, str, str]]) -> List[Any]:
+    return _worker_scorer.deadlines(parsed_emails)
+
+
+class ScoringPool:
+    """Scores batches of parsed emails in worker processes, sidestepping the GIL.
+
+    Workers are spawned on first use. Each one builds its scorer with `scorer_factory`
+    and loads the models exactly once; tasks come back as dicts and are rebuilt with
+    `decode`.
+    """
+
+    def __init__(self, scorer_factory: Callable[[], Any], decode: Callable[[dict], Any],
+                 processes: int = SCORING_PROCESSES):
+        self.scorer_factory = scorer_factory
+        self.decode = decode
+        self.processes = processes
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Share the CPU between workers instead of every worker using all cores
+                torch_threads = max(1, (os.cpu_count() or 1) // self.processes)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    # Forking a process with live threads and torch state is unsafe
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.scorer_factory, torch_threads),
+                )
+                logging.info(f"Started scoring pool with {self.processes} processes")
+            return self._executor
+
+    def score(self, parsed_emails: List[Tuple[str, str, str]]) -> List[Any]:
+        """Score a batch in a worker process; blocks the calling thread until it is done"""
+        if not parsed_emails:
+            return []
+        results = self._pool().submit(_score_in_worker, parsed_emails).result()
+        return [self.decode(data) for data in results]
+
+    def deadlines(self, parsed_emails: List[Tuple[str, str, str]]) -> List[Any]:
+        """Only the deadlines of a batch, e.g. for duplicates that reuse an earlier score"""
+        if not parsed_emails:
+            return []
+        return self._pool().submit(_deadlines_in_worker, parsed_emails).result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,102 @@
+import json
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+SYNC_STATE_PATH = 'mail_sync_state.db'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mailboxes (
+    mailbox TEXT PRIMARY KEY,
+    uidvalidity INTEGER,
+    high_water_uid INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS senders (
+    mailbox TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    last_uid INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (mailbox, sender)
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    mailbox TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    uid INTEGER NOT NULL,
+    task TEXT NOT NULL,
+    PRIMARY KEY (mailbox, sender, uid)
+);
+"""
+
+
+class SyncStateStore:
+    """SQLite record of what has already been synced and scored, per (mailbox, sender)"""
+
+    def __init__(self, path: str = SYNC_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.executescript(_SCHEMA)
+
+    @staticmethod
+    def mailbox_key(config: dict, mailbox: str = 'inbox') -> str:
+        return f"{config['username']}@{config['server']}/{mailbox}"
+
+    def mailbox_state(self, mailbox: str) -> Optional[Tuple[Optional[int], int]]:
+        """Return (uidvalidity, high-water UID) recorded for a mailbox, or None if never synced"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT uidvalidity, high_water_uid FROM mailboxes WHERE mailbox = ?', (mailbox,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def reset_mailbox(self, mailbox: str, uidvalidity: Optional[int]):
+        """Forget everything about a mailbox, e.g. after UIDVALIDITY changed"""
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM senders WHERE mailbox = ?', (mailbox,))
+            self._db.execute('DELETE FROM tasks WHERE mailbox = ?', (mailbox,))
+            self._db.execute(
+                'INSERT OR REPLACE INTO mailboxes (mailbox, uidvalidity, high_water_uid) VALUES (?, ?, 0)',
+                (mailbox, uidvalidity)
+            )
+
+    def set_high_water(self, mailbox: str, uid: int):
+        """Raise the highest UID searched for any sender, which new senders are searched up to"""
+        with self._lock, self._db:
+            self._db.execute(
+                'UPDATE mailboxes SET high_water_uid = MAX(high_water_uid, ?) WHERE mailbox = ?',
+                (uid, mailbox)
+            )
+
+    def known_senders(self, mailbox: str, senders: List[str]) -> Dict[str, int]:
+        """UID each sender that has been synced before was searched and processed up to"""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT sender, last_uid FROM senders WHERE mailbox = ?', (mailbox,)
+            ).fetchall()
+        wanted = set(senders)
+        return {sender: last_uid for sender, last_uid in rows if sender in wanted}
+
+    def cached_tasks(self, mailbox: str, sender: str) -> Dict[int, dict]:
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT uid, task FROM tasks WHERE mailbox = ? AND sender = ?', (mailbox, sender)
+            ).fetchall()
+        return {uid: json.loads(task) for uid, task in rows}
+
+    def record_sender(self, mailbox: str, sender: str, tasks: Dict[int, dict], synced_uid: int, keep: int = 5):
+        """Store newly processed tasks, keep only the newest `keep` per sender and set the
+        UID the sender is synced up to, which may move back to retry failed messages"""
+        with self._lock, self._db:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO tasks (mailbox, sender, uid, task) VALUES (?, ?, ?, ?)',
+                [(mailbox, sender, uid, json.dumps(task)) for uid, task in tasks.items()]
+            )
+            self._db.execute(
+                'DELETE FROM tasks WHERE mailbox = ? AND sender = ? AND uid NOT IN '
+                '(SELECT uid FROM tasks WHERE mailbox = ? AND sender = ? ORDER BY uid DESC LIMIT ?)',
+                (mailbox, sender, mailbox, sender, keep)
+            )
+            self._db.execute(
+                'INSERT OR REPLACE INTO senders (mailbox, sender, last_uid) VALUES (?, ?, ?)',
+                (mailbox, sender, synced_uid)
+            )
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Bump when the on-disk layout changes; it is part of every index hash
+INDEX_FORMAT_VERSION = 1
+TEMPLATE_INDEX_DIR = os.getenv('TEMPLATE_INDEX_DIR', 'template_index')
+# Optional JSON file of {"critical": [...], "high": [...], "medium": [...]} extending the defaults
+PRIORITY_TEMPLATES_PATH = os.getenv('PRIORITY_TEMPLATES_PATH')
+
+DEFAULT_TEMPLATES = {
+    'critical': [
+        "server down", "server crash", "system crash", "outage", "downtime",
+        "service unavailable", "critical error", "system failure",
+        "data loss", "data corruption", "database corruption", "data breach",
+        "severe performance", "extreme latency", "system overload",
+        "urgent customer", "production blocked", "revenue impact"
+    ],
+    'high': [
+        "high priority", "urgent", "important", "asap", "time sensitive",
+        "needs immediate", "critical bug", "performance issue", "customer impact"
+    ],
+    'medium': [
+        "please review", "update needed", "follow up", "needs attention",
+        "check this", "minor issue", "small bug", "low impact"
+    ]
+}
+
+
+def load_templates(path: Optional[str] = PRIORITY_TEMPLATES_PATH) -> Dict[str, List[str]]:
+    """Default templates plus any extra phrases from a JSON file, without duplicates"""
+    templates = {tier: list(phrases) for tier, phrases in DEFAULT_TEMPLATES.items()}
+    if path:
+        with open(path) as f:
+            extra = json.load(f)
+        for tier, phrases in extra.items():
+            if tier not in templates:
+                raise ValueError(f"Unknown priority tier {tier!r} in {path}")
+            templates[tier] = list(dict.fromkeys(templates[tier] + list(phrases)))
+    return templates
+
+
+def template_hash(model_key: str, templates: Dict[str, List[str]], tiers: Sequence[str]) -> str:
+    payload = json.dumps(
+        [INDEX_FORMAT_VERSION, model_key, [[tier, templates[tier]] for tier in tiers]], ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class TemplateIndex:
+    """L2-normalized template embeddings for all tiers, stacked in tier order.
+
+    Stored transposed (dim x templates) and C-contiguous, which is the layout
+    `embeddings @ matrix_t` reads fastest; `matrix` is the row-per-template view.
+    """
+
+    def __init__(self, matrix_t: np.ndarray, tier_slices: Dict[str, slice], version: str):
+        self.matrix_t = matrix_t
+        self.tier_slices = tier_slices
+        self.version = version
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self.matrix_t.T
+
+    def __len__(self) -> int:
+        return self.matrix_t.shape[1]
+
+    @classmethod
+    def load_or_build(cls, model_key: str, templates: Dict[str, List[str]], tiers: Sequence[str],
+                      encode: Callable[[List[str]], np.ndarray],
+                      directory: str = TEMPLATE_INDEX_DIR) -> 'TemplateIndex':
+        """Memory-map the saved index for this model and template set, encoding it only if missing"""
+        version = template_hash(model_key, templates, tiers)
+        tier_slices = {}
+        offset = 0
+        for tier in tiers:
+            tier_slices[tier] = slice(offset, offset + len(templates[tier]))
+            offset += len(templates[tier])
+
+        prefix = re.sub(r'[^A-Za-z0-9_.-]', '_', model_key)
+        path = os.path.join(directory, f"{prefix}-{version[:16]}.npy")
+        if os.path.exists(path):
+            try:
+                # Copy-on-write mapping: pages are shared and read lazily, torch can wrap it directly
+                matrix_t = np.load(path, mmap_mode='c')
+                if matrix_t.ndim == 2 and matrix_t.shape[1] == offset:
+                    logging.info(f"Loaded {offset} template embeddings from {path}")
+                    return cls(matrix_t, tier_slices, version)
+                logging.warning(f"Template index {path} has the wrong shape, rebuilding")
+            except (OSError, ValueError) as e:
+                logging.warning(f"Could not load template index {path}: {e}")
+
+        phrases = [phrase for tier in tiers for phrase in templates[tier]]
+        embeddings = np.asarray(encode(phrases), dtype=np.float32)
+        embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        cls._save(np.ascontiguousarray(embeddings.T), path, prefix)
+        logging.info(f"Encoded {offset} template embeddings into {path}")
+        return cls(np.load(path, mmap_mode='c'), tier_slices, version)
+
+    @staticmethod
+    def _save(matrix_t: np.ndarray, path: str, prefix: str):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write then rename, so concurrent workers never map a half-written file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.npy.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, matrix_t)
+        os.replace(tmp_path, path)
+        for name in os.listdir(directory):
+            stale = os.path.join(directory, name)
+            if name.startswith(f"{prefix}-") and name.endswith('.npy') and stale != path:
+                os.remove(stale)  # Indexes for older template sets of this model
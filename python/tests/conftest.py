@@ -0,0 +1,85 @@
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime
+from email.message import EmailMessage
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep test runs from writing template indexes or sync state into the working tree
+os.environ.setdefault('TEMPLATE_INDEX_DIR', tempfile.mkdtemp(prefix='test-templates-'))
+os.environ.setdefault('WARM_UP_MODELS', '0')
+
+
+class StubScorer:
+    """Stands in for TaskScorer without loading any model; can be told to fail"""
+
+    def __init__(self):
+        self.scored = []
+        self.failures = 0
+
+    def score(self, parsed_emails):
+        from access import Task
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError('scoring failed')
+        self.scored.extend(subject for _, subject, _ in parsed_emails)
+        return [
+            Task(subject=subject, body=body, priority_score=9.0 if 'down' in subject.lower() else 3.0,
+                 deadline=deadline, sender=sender, critical_matches=set())
+            for (sender, subject, body), deadline in zip(parsed_emails, self.deadlines(parsed_emails))
+        ]
+
+    def deadlines(self, parsed_emails):
+        # "due 2024-10-09" stands in for the dates spaCy would find
+        return [
+            datetime.fromisoformat(match.group(1)) if (match := re.search(r'due (\S+)', body)) else None
+            for _, _, body in parsed_emails
+        ]
+
+
+def message(index: int, sender: str = 'alerts@example.com', subject: str = None, body: str = None,
+            date: str = None, **headers) -> bytes:
+    email = EmailMessage()
+    email['From'] = f"Sender <{sender}>"
+    email['To'] = 'user@example.com'
+    email['Subject'] = subject or f"Message {index}"
+    email['Date'] = date or f"Mon, 07 Oct 2024 10:{index % 60:02d}:00 +0000"
+    email['Message-ID'] = f"<{index}@example.com>"
+    for name, value in headers.items():
+        email[name.replace('_', '-')] = value
+    email.set_content(body or f"Body of message {index}")
+    return bytes(email)
+
+
+@pytest.fixture
+def make_message():
+    return message
+
+
+@pytest.fixture
+def stub_scorer():
+    return StubScorer()
+
+
+@pytest.fixture
+def imap_server():
+    from fake_imap import FakeIMAPServer
+    servers = []
+
+    def start(messages=()):
+        server = FakeIMAPServer(messages).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def state(tmp_path):
+    from sync_state import SyncStateStore
+    return SyncStateStore(str(tmp_path / 'sync_state.db'))
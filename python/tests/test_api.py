@@ -0,0 +1,38 @@
+import pytest
+
+import access
+from imap_pool import IMAPConnectionPool
+
+HEADERS = {'X-API-Key': 'your-api-key-here'}
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    # EmailProcessor keeps its sync state in the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(access, 'email_processor', None)
+    return access.app.test_client()
+
+
+def test_account_config_keeps_plain_imap_settings(imap_server):
+    server = imap_server()
+    config = access._account_config({**server.email_config(), 'senders': ['a@example.com']}, [])
+    assert config['ssl'] is False
+    pool = IMAPConnectionPool()
+    try:
+        with pool.connection({key: value for key, value in config.items() if key != 'senders'}) as mail:
+            assert mail.noop()[0] == 'OK'
+    finally:
+        pool.close_all()
+
+
+def test_initialize_passes_ssl_through(client, imap_server):
+    server = imap_server()
+    response = client.post('/api/initialize', json=server.email_config(), headers=HEADERS)
+    assert response.status_code == 200
+    assert access.email_processor.config['ssl'] is False
+    assert access.email_processor.config['port'] == server.server_address[1]
+
+
+def test_ssl_defaults_to_on():
+    assert access._account_config({'username': 'u', 'senders': ['a@example.com']}, [])['ssl'] is True
@@ -0,0 +1,65 @@
+import threading
+import pytest
+
+from access import CalendarManager, Task, CALENDAR_BATCH_SIZE
+from fake_calendar import FakeCalendarServer
+
+
+@pytest.fixture
+def calendar():
+    server = FakeCalendarServer().start()
+    yield server, server.attach(CalendarManager(token_path='missing-token.pickle'))
+    server.stop()
+
+
+def tasks(count: int, prefix: str = 'task'):
+    return [
+        Task(subject=f"{prefix} {i}", body='body', priority_score=float(i % 10 + 1), deadline=None,
+             sender='alerts@example.com', critical_matches=set(), message_id=f"<{prefix}-{i}@example.com>")
+        for i in range(count)
+    ]
+
+
+def test_events_are_inserted_in_batches(calendar):
+    server, manager = calendar
+    results = manager.create_events(tasks(120))
+    assert all(result.get('success') for result in results)
+    assert server.stats['batches'] == 3 == -(-120 // CALENDAR_BATCH_SIZE)
+    assert server.stats['http_requests'] == 3
+    assert len(server.events()) == 120
+
+
+def test_second_run_updates_instead_of_duplicating(calendar):
+    server, manager = calendar
+    manager.create_events(tasks(120))
+    results = manager.create_events(tasks(120))
+    assert all(result.get('updated') for result in results)
+    assert server.stats['conflicts'] == 120
+    assert server.stats['updates'] == 120
+    assert len(server.events()) == 120
+
+
+def test_concurrent_jobs_share_one_service(calendar):
+    server, manager = calendar
+    errors = []
+
+    def run(prefix):
+        results = manager.create_events(tasks(60, prefix))
+        errors.extend(result for result in results if not result.get('success'))
+
+    threads = [threading.Thread(target=run, args=(f"job{i}",), daemon=True) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+    # Interleaved batches on one httplib2 connection deadlock or mix up responses
+    assert not any(thread.is_alive() for thread in threads)
+    assert errors == []
+    assert len(server.events()) == 240
+
+
+def test_event_ids_are_stable_and_valid():
+    task = tasks(1)[0]
+    event_id = CalendarManager.event_id(task)
+    assert event_id == CalendarManager.event_id(tasks(1)[0])
+    assert set(event_id) <= set('0123456789abcdefghijklmnopqrstuv')
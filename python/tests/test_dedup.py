@@ -0,0 +1,87 @@
+from datetime import datetime
+
+
+SENDERS = ['alerts@example.com', 'bob@example.com', 'carol@example.com']
+
+
+def processor(server, state, scorer):
+    from access import EmailProcessor
+    from imap_pool import IMAPConnectionPool
+    return EmailProcessor(server.email_config(), pool=IMAPConnectionPool(), state=state, scorer=scorer)
+
+
+def test_reply_chain_collapses(imap_server, state, stub_scorer, make_message):
+    server = imap_server([
+        make_message(0, subject='Deploy plan', body='Rolling out tonight.'),
+        make_message(1, sender='bob@example.com', subject='Re: Deploy plan', body='Sounds good to me.',
+                     In_Reply_To='<0@example.com>', References='<0@example.com>'),
+        make_message(2, sender='carol@example.com', subject='Re: Deploy plan', body='Count me in.',
+                     In_Reply_To='<1@example.com>', References='<0@example.com> <1@example.com>'),
+    ])
+    tasks = processor(server, state, stub_scorer).fetch_tasks(SENDERS)
+
+    assert len(tasks) == 1
+    assert tasks[0].thread_id == '<0@example.com>'
+    assert tasks[0].duplicates == 2
+    assert len(stub_scorer.scored) == 1
+
+
+def test_newest_email_represents_its_group(imap_server, state, stub_scorer, make_message):
+    server = imap_server([make_message(i, subject='Server down') for i in range(3)])
+    published = []
+    tasks = processor(server, state, stub_scorer).fetch_tasks(SENDERS, on_tasks=published.extend)
+
+    assert [(task.uid, task.duplicates) for task in tasks] == [(3, 2)]
+    assert (published[-1].uid, published[-1].duplicates) == (3, 2)
+    assert stub_scorer.scored == ['Server down']
+
+
+def test_repeat_of_cached_alert_is_published(imap_server, state, stub_scorer, make_message):
+    server = imap_server([make_message(0, subject='Server down')])
+    processor(server, state, stub_scorer).fetch_tasks(SENDERS)
+
+    server.inbox.append(make_message(1, subject='Server down'))
+    published = []
+    processor(server, state, stub_scorer).fetch_tasks(SENDERS, on_tasks=published.extend, include_cached=False)
+
+    assert [(task.uid, task.duplicates) for task in published] == [(2, 1)]
+    assert stub_scorer.scored == ['Server down']
+
+
+def test_repeats_of_an_alert_update_one_calendar_event(imap_server, state, stub_scorer, make_message):
+    from access import CalendarManager
+    from fake_calendar import FakeCalendarServer
+    server = imap_server([make_message(0, subject='Server down')])
+    calendar = FakeCalendarServer().start()
+    try:
+        manager = calendar.attach(CalendarManager(token_path='missing-token.pickle'))
+        for i in range(1, 4):
+            tasks = processor(server, state, stub_scorer).fetch_tasks(SENDERS)
+            assert [task.duplicates for task in tasks] == [i - 1]
+            manager.create_events(tasks)
+            server.inbox.append(make_message(i, subject='Server down'))
+        assert len(calendar.events()) == 1
+    finally:
+        calendar.stop()
+
+
+def test_same_subject_outside_the_window_is_not_a_duplicate(imap_server, state, stub_scorer, make_message):
+    server = imap_server([
+        make_message(0, subject='Weekly report', body='Numbers for week 40.'),
+        make_message(1, subject='Weekly report', body='Numbers for week 41.', date='Mon, 14 Oct 2024 10:00:00 +0000'),
+    ])
+    tasks = processor(server, state, stub_scorer).fetch_tasks(SENDERS)
+
+    assert [task.duplicates for task in tasks] == [0, 0]
+    assert stub_scorer.scored == ['Weekly report', 'Weekly report']
+
+
+def test_duplicate_keeps_its_own_deadline(imap_server, state, stub_scorer, make_message):
+    server = imap_server([
+        make_message(0, subject='Server down', body='Fix due 2024-10-08'),
+        make_message(1, subject='Server down', body='Still down, fix due 2024-10-09'),
+    ])
+    tasks = processor(server, state, stub_scorer).fetch_tasks(SENDERS)
+
+    assert [(task.uid, task.duplicates, task.deadline) for task in tasks] == [(2, 1, datetime(2024, 10, 9))]
+    assert stub_scorer.scored == ['Server down']
@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from imap_pool import IMAPConnectionPool
+
+
+@pytest.fixture
+def pool():
+    pool = IMAPConnectionPool()
+    yield pool
+    pool.close_all()
+
+
+def test_sessions_are_reused(imap_server, pool, make_message):
+    server = imap_server([make_message(0)])
+    config = server.email_config()
+    for _ in range(3):
+        with pool.connection(config) as mail:
+            assert mail.uid('SEARCH', None, 'ALL')[0] == 'OK'
+    assert pool.stats['created'] == 1
+    assert pool.stats['reused'] == 2
+    assert server.stats['LOGIN'] == 1
+    assert server.stats['SELECT'] == 1
+
+
+def test_dead_session_is_reauthenticated(imap_server, make_message):
+    server = imap_server([make_message(0)])
+    config = server.email_config()
+    pool = IMAPConnectionPool(validate_after=0)
+    try:
+        with pool.connection(config):
+            pass
+        server.disconnect_all()
+        with pool.connection(config) as mail:
+            assert mail.uid('SEARCH', None, 'ALL')[0] == 'OK'
+        assert pool.stats['reconnects'] == 1
+        assert server.stats['LOGIN'] == 2
+    finally:
+        pool.close_all()
+
+
+def test_idle_sessions_get_keepalive_noops(imap_server):
+    server = imap_server()
+    pool = IMAPConnectionPool(keepalive_interval=0.05)
+    try:
+        with pool.connection(server.email_config()):
+            pass
+        deadline = time.monotonic() + 5
+        while server.stats['NOOP'] < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert server.stats['NOOP'] >= 2
+        assert pool.stats['discarded'] == 0
+    finally:
+        pool.close_all()
+
+
+def test_changed_password_drops_idle_session(imap_server, pool):
+    server = imap_server()
+    config = server.email_config()
+    with pool.connection(config):
+        pass
+    with pytest.raises(Exception):
+        with pool.connection({**config, 'password': 'wrong'}):
+            pass
+    assert pool.stats['discarded'] == 1
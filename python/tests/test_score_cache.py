@@ -0,0 +1,13 @@
+from access import EmailPriorityAnalyzer
+from score_cache import ResultCache
+from template_index import load_templates
+
+
+def test_score_cache_key_follows_the_template_set():
+    cache = ResultCache('test', max_entries=16)
+    templates = load_templates(None)
+    extended = {**templates, 'critical': templates['critical'] + ['pager storm']}
+
+    key = EmailPriorityAnalyzer(cache=cache, templates=templates)._cache_key('Server down', 'body')
+    assert EmailPriorityAnalyzer(cache=cache, templates=load_templates(None))._cache_key('Server down', 'body') == key
+    assert EmailPriorityAnalyzer(cache=cache, templates=extended)._cache_key('Server down', 'body') != key
@@ -0,0 +1,69 @@
+import pytest
+
+
+def fetch(server, state, scorer, senders, **kwargs):
+    from access import EmailProcessor
+    from imap_pool import IMAPConnectionPool
+    processor = EmailProcessor(server.email_config(), pool=IMAPConnectionPool(), state=state,
+                               scorer=scorer, **kwargs)
+    return processor.fetch_tasks(senders)
+
+
+def test_second_run_only_fetches_new_mail(imap_server, state, stub_scorer, make_message):
+    server = imap_server([make_message(i) for i in range(3)])
+    assert len(fetch(server, state, stub_scorer, ['alerts@example.com'])) == 3
+
+    server.inbox.append(make_message(3, subject='Server down now'))
+    tasks = fetch(server, state, stub_scorer, ['alerts@example.com'])
+    assert [task.subject for task in tasks][-1] == 'Server down now'
+    assert stub_scorer.scored[3:] == ['Server down now']
+
+
+def test_failed_run_does_not_skip_new_mail(imap_server, state, stub_scorer, make_message):
+    server = imap_server([make_message(i) for i in range(2)])
+    fetch(server, state, stub_scorer, ['alerts@example.com'])
+
+    server.inbox.append(make_message(2, subject='Server down now'))
+    stub_scorer.failures = 1
+    with pytest.raises(RuntimeError):
+        fetch(server, state, stub_scorer, ['alerts@example.com'])
+
+    tasks = fetch(server, state, stub_scorer, ['alerts@example.com'])
+    assert 'Server down now' in [task.subject for task in tasks]
+
+
+def test_unparsed_message_is_retried(imap_server, state, stub_scorer, make_message, monkeypatch):
+    from access import EmailProcessor
+    server = imap_server([make_message(0)])
+    fetch(server, state, stub_scorer, ['alerts@example.com'])
+
+    server.inbox.append(make_message(1, subject='Server down now'))
+    monkeypatch.setattr(EmailProcessor, '_parse_fetched', lambda self, item: None)
+    assert [task.subject for task in fetch(server, state, stub_scorer, ['alerts@example.com'])] == ['Message 0']
+
+    monkeypatch.undo()
+    tasks = fetch(server, state, stub_scorer, ['alerts@example.com'])
+    assert [task.subject for task in tasks] == ['Message 0', 'Server down now']
+
+
+def test_other_senders_runs_do_not_skip_mail(imap_server, state, stub_scorer, make_message):
+    server = imap_server([make_message(0), make_message(1, sender='b@example.com')])
+    fetch(server, state, stub_scorer, ['alerts@example.com'])
+    fetch(server, state, stub_scorer, ['b@example.com'])
+
+    server.inbox.append(make_message(2, subject='Server down A'))
+    assert [task.subject for task in fetch(server, state, stub_scorer, ['b@example.com'])] == ['Message 1']
+    tasks = fetch(server, state, stub_scorer, ['alerts@example.com'])
+    assert [task.subject for task in tasks] == ['Message 0', 'Server down A']
+
+
+def test_unparsed_message_of_new_sender_is_retried(imap_server, state, stub_scorer, make_message, monkeypatch):
+    from access import EmailProcessor
+    server = imap_server([make_message(0), make_message(1, sender='b@example.com', subject='Server down B')])
+    fetch(server, state, stub_scorer, ['alerts@example.com'])
+
+    monkeypatch.setattr(EmailProcessor, '_parse_fetched', lambda self, item: None)
+    assert fetch(server, state, stub_scorer, ['b@example.com']) == []
+
+    monkeypatch.undo()
+    assert [task.subject for task in fetch(server, state, stub_scorer, ['b@example.com'])] == ['Server down B']
@@ -0,0 +1,49 @@
+def watch(server, state, scorer, senders):
+    from access import EmailProcessor, MailWatcher
+    from imap_pool import IMAPConnectionPool
+    pool = IMAPConnectionPool()
+    watcher = MailWatcher([], scorer=scorer, state=state, pool=pool)
+    processor = EmailProcessor(server.email_config(), pool=pool, state=state, scorer=scorer)
+    watcher._process(processor, 'user@example.com', senders)
+    return watcher
+
+
+def test_take_returns_highest_priority_first(imap_server, state, stub_scorer, make_message):
+    server = imap_server([
+        make_message(0), make_message(1, subject='Server down'), make_message(2), make_message(3, subject='DB down'),
+    ])
+    watcher = watch(server, state, stub_scorer, ['alerts@example.com'])
+    assert watcher.status()['pending'] == 4
+
+    assert [task.subject for task in watcher.take(2)] == ['Server down', 'DB down']
+    assert [task.subject for task in watcher.take(5)] == ['Message 0', 'Message 2']
+    assert watcher.take(5) == []
+    assert watcher.status()['published'] == 4
+
+
+def test_watch_route_pages_by_limit(imap_server, state, stub_scorer, make_message, monkeypatch):
+    import access
+    server = imap_server([make_message(0), make_message(1, subject='Server down'), make_message(2)])
+    monkeypatch.setattr(access, 'mail_watcher', watch(server, state, stub_scorer, ['alerts@example.com']))
+    client = access.app.test_client()
+    headers = {'X-API-Key': 'your-api-key-here'}
+
+    first = client.get('/api/watch?limit=1', headers=headers).get_json()
+    assert [task['subject'] for task in first['tasks']] == ['Server down']
+    assert first['watcher']['pending'] == 2
+    rest = client.get('/api/watch', headers=headers).get_json()
+    assert [task['subject'] for task in rest['tasks']] == ['Message 0', 'Message 2']
+
+
+def test_newer_duplicate_replaces_pending_task(imap_server, state, stub_scorer, make_message):
+    from access import EmailProcessor
+    from imap_pool import IMAPConnectionPool
+    server = imap_server([make_message(0, subject='Server down'), make_message(1)])
+    watcher = watch(server, state, stub_scorer, ['alerts@example.com'])
+
+    server.inbox.append(make_message(2, subject='Server down'))
+    processor = EmailProcessor(server.email_config(), pool=IMAPConnectionPool(), state=state, scorer=stub_scorer)
+    watcher._process(processor, 'user@example.com', ['alerts@example.com'])
+
+    assert watcher.status()['pending'] == 2
+    assert [(task.uid, task.duplicates) for task in watcher.take(5)] == [(3, 1), (2, 0)]